@@ -1,4 +1,4 @@
-from typing import NewType, TypeVar, Union, Tuple
+from typing import Dict, NewType, Optional, TypeVar, Union, Tuple
 import numpy
 import dlib
 import dataclasses
@@ -72,6 +72,8 @@ class ExitCode():
 
 Error = NewType('Error', str)
 Cv2Image = numpy.ndarray
+# (194, 2) float64 array. Row 'i' is '[x, y]' of landmark 'i'
+LandmarkArray = numpy.ndarray
 S = TypeVar('S')
 Num = Union[int, float]
 # }}}
@@ -82,6 +84,9 @@ class Coord:
     """Base class to express Coordinates
         This is made to be converted from dlib.dpoint
     """
+    # '__slots__' are used for all face types, as a lot of them
+    # are created on each frame
+    __slots__ = ("x", "y")
     x: float
     y: float
 
@@ -131,6 +136,8 @@ class Coord:
 
 
 class AbsoluteCoord(Coord):
+    __slots__ = ()
+
     def __repr__(self):
         return f"AbsoluteCoord({self.x}, {self.y})"
 
@@ -139,6 +146,8 @@ class AbsoluteCoord(Coord):
 
 
 class RelativeCoord(Coord):
+    __slots__ = ()
+
     def __repr__(self):
         return f"RelativeCoord({self.x}, {self.y})"
 
@@ -149,6 +158,7 @@ class RelativeCoord(Coord):
 
 # Each face parts {{{
 class Part():
+    __slots__ = ("bottom", "top", "leftSide", "rightSide")
     bottom: Coord
     top: Coord
     leftSide: Coord
@@ -216,18 +226,24 @@ class Part():
 
 
 class Eye(Part):
+    __slots__ = ()
+
     def __repr__(self):
         return f"Eye({self.bottom}, {self.top}"\
                f", {self.leftSide}, {self.rightSide})"
 
 
 class Mouth(Part):
+    __slots__ = ()
+
     def __repr__(self):
         return f"Mouth({self.bottom}, {self.top},"\
                f"{self.leftSide}, {self.rightSide})"
 
 
 class Nose(Part):
+    __slots__ = ()
+
     def __repr__(self):
         return f"Nose({self.bottom}, {self.top}"\
                f", {self.leftSide}, {self.rightSide})"
@@ -270,6 +286,8 @@ class Nose(Part):
 
 
 class EyeBrow(Part):
+    __slots__ = ()
+
     def __repr__(self):
         return f"EyeBrow({self.bottom}, {self.top}"\
                f", {self.leftSide}, {self.rightSide})"
@@ -278,6 +296,9 @@ class EyeBrow(Part):
 
 # Face {{{
 class Face:
+    __slots__ = ("center", "leftTemple", "rightTemple", "chinCenter"
+                , "leftEye", "rightEye", "mouth", "nose"
+                , "leftEyeBrow", "rightEyeBrow")
     center: AbsoluteCoord
     leftTemple: RelativeCoord
     rightTemple: RelativeCoord
@@ -351,71 +372,49 @@ class Face:
                   , EyeBrow.default())
 
     @classmethod
-    def fromDPointsWithRatio(cls: S, points: dlib.dpoints) -> Tuple[S, float]: # noqa
+    def fromDPointsWithRatio(cls: S, points: Union[dlib.dpoints, LandmarkArray] # noqa
+                            , landmarkNum: Dict[str, int] = LANDMARK_NUM
+                             ) -> Tuple[S, float]:
         """ Return '<Face y length> / <Face x length>' ratio
             along with 'fromDPoints' result
         """
-        xLength = abs(points[LANDMARK_NUM["TEMPLE_LEFT"]].x
-                        - points[LANDMARK_NUM["TEMPLE_RIGHT"]].x)
-        yLength = abs(points[LANDMARK_NUM["EYEBROW_LEFT_TOP"]].x
-                        - points[LANDMARK_NUM["CHIN_CENTER"]].x)
+        xLength = abs(_pointX(points, landmarkNum["TEMPLE_LEFT"])
+                        - _pointX(points, landmarkNum["TEMPLE_RIGHT"]))
+        yLength = abs(_pointX(points, landmarkNum["EYEBROW_LEFT_TOP"])
+                        - _pointX(points, landmarkNum["CHIN_CENTER"]))
         ratio = yLength / xLength
-        return (Face.fromDPoints(points), ratio)
+        return (Face.fromDPoints(points, landmarkNum), ratio)
 
     @classmethod
-    def fromDPoints(cls: S, points: dlib.dpoints) -> S:
-        """return 'Face' object based on given 'facemark'"""
-
-        def _normalize(smallest: float, biggest: float, current: float) -> float: # noqa
-            # move smallest to be 0
-            movedCurrent = (-smallest) + current
-            movedBiggest = (-smallest) + biggest
-            between0to1  = movedCurrent / movedBiggest
-            # make it between -100 to 100
-            return (200 * between0to1) - 100
-
-        def _normalizePoint(p: dlib.dpoint) -> dlib.dpoint:
-            smallestX = points[LANDMARK_NUM["TEMPLE_LEFT"]].x
-            biggestX  = points[LANDMARK_NUM["TEMPLE_RIGHT"]].x
-            smallestY = points[LANDMARK_NUM["CHIN_CENTER"]].y
-            biggestY  = points[LANDMARK_NUM["EYEBROW_LEFT_TOP"]].y
-            return dlib.dpoint(_normalize(smallestX, biggestX, p.x)
-                              , _normalize(smallestY, biggestY, p.y)
-                               )
-
-        def _point(name: str) -> dlib.dpoint:
-            return _normalizePoint(points[LANDMARK_NUM[name]])
-
-        _c     = AbsoluteCoord.fromDPoint(_point("NOSE_BOTTOM"))
-        _ltmp  = RelativeCoord.fromDPoint(_point("TEMPLE_LEFT"))
-        _rtmp  = RelativeCoord.fromDPoint(_point("TEMPLE_RIGHT"))
-        _chin  = RelativeCoord.fromDPoint(_point("CHIN_CENTER"))
-        _leye  = Eye(_point("LEFT_EYE_BOTTOM")
-                    , _point("LEFT_EYE_TOP")
-                    , _point("LEFT_EYE_L")
-                    , _point("LEFT_EYE_R"))
-        _reye  = Eye(_point("RIGHT_EYE_BOTTOM")
-                    , _point("RIGHT_EYE_TOP")
-                    , _point("RIGHT_EYE_L")
-                    , _point("RIGHT_EYE_R"))
-        _mouth = Mouth(_point("MOUSE_BOTTOM")
-                      , _point("MOUSE_TOP")
-                      , _point("MOUSE_L")
-                      , _point("MOUSE_R"))
-        _nose  = Nose(_point("NOSE_BOTTOM")
-                     , _point("NOSE_L")
-                     , _point("NOSE_R"))
-        _leb   = EyeBrow(_point("EYEBROW_LEFT_BOTTOM")
-                        , _point("EYEBROW_LEFT_TOP")
-                        , _point("EYEBROW_LEFT_L")
-                        , _point("EYEBROW_LEFT_R"))
-        _reb   = EyeBrow(_point("EYEBROW_RIGHT_BOTTOM")
-                        , _point("EYEBROW_RIGHT_TOP")
-                        , _point("EYEBROW_RIGHT_L")
-                        , _point("EYEBROW_RIGHT_R"))
-
-        return cls(_c, _ltmp, _rtmp, _chin, _leye, _reye
-                  , _mouth, _nose, _leb, _reb)
+    def fromDPoints(cls: S, points: Union[dlib.dpoints, LandmarkArray]
+                   , landmarkNum: Dict[str, int] = LANDMARK_NUM) -> S:
+        """return 'Face' object based on given 'facemark'
+            or 'facemarkArray' result
+
+            'landmarkNum' is index of each landmark in 'points'.
+            (See 'landmarkLayout.LandmarkLayout')
+        """
+        p = _gather(points, [landmarkNum[n] for n in _FACE_LANDMARKS])
+
+        # Normalize all points at once, so that each of them
+        # is between -100 to 100.
+        # x: TEMPLE_LEFT to TEMPLE_RIGHT
+        # y: CHIN_CENTER to EYEBROW_LEFT_TOP
+        smallest = p[[_at("TEMPLE_LEFT"), _at("CHIN_CENTER")], [0, 1]]
+        biggest  = p[[_at("TEMPLE_RIGHT"), _at("EYEBROW_LEFT_TOP")], [0, 1]]
+        # move smallest to be 0
+        movedBiggest = (-smallest) + biggest
+        if not movedBiggest.all():
+            raise ZeroDivisionError("face has no width or height")
+        between0to1 = ((-smallest) + p) / movedBiggest
+        n = ((200 * between0to1) - 100).tolist()
+        c = [Coord(x, y) for x, y in n]
+
+        return cls(AbsoluteCoord(*n[0]), RelativeCoord(*n[1])
+                  , RelativeCoord(*n[2]), RelativeCoord(*n[3])
+                  , Eye(*c[4:8]), Eye(*c[8:12]), Mouth(*c[12:16])
+                  , Nose(c[0], *c[16:18])
+                  , EyeBrow(*c[18:22]), EyeBrow(*c[22:26]))
 
     def fixWithRatio(self: S, init: float, current: float):
         """ Fix Face values along with ratio
@@ -435,12 +434,45 @@ class Face:
         self.leftTemple.y   /= ratioMagnif
         self.rightTemple.y  /= ratioMagnif
         self.chinCenter.y   /= ratioMagnif
-        self.leftEye        = self.leftEye.map(surplus)
-        self.rightEye.y     = self.rightEye.map(surplus)
-        self.mouth.y        = self.mouth.map(surplus)
-        self.nose.y         = self.nose.map(surplus)
-        self.leftEyeBrow.y  = self.leftEyeBrow.map(surplus)
-        self.rightEyeBrow.y = self.rightEyeBrow.map(surplus)
+        self.leftEye.map(surplus)
+        self.rightEye.map(surplus)
+        self.mouth.map(surplus)
+        self.nose.map(surplus)
+        self.leftEyeBrow.map(surplus)
+        self.rightEyeBrow.map(surplus)
+
+
+# Landmarks used by 'Face.fromDPoints', in order of 'Face' arguments.
+# 'NOSE_BOTTOM' is used for both center and nose.
+_FACE_LANDMARKS = ("NOSE_BOTTOM", "TEMPLE_LEFT", "TEMPLE_RIGHT", "CHIN_CENTER"
+                  , "LEFT_EYE_BOTTOM", "LEFT_EYE_TOP"
+                  , "LEFT_EYE_L", "LEFT_EYE_R"
+                  , "RIGHT_EYE_BOTTOM", "RIGHT_EYE_TOP"
+                  , "RIGHT_EYE_L", "RIGHT_EYE_R"
+                  , "MOUSE_BOTTOM", "MOUSE_TOP", "MOUSE_L", "MOUSE_R"
+                  , "NOSE_L", "NOSE_R"
+                  , "EYEBROW_LEFT_BOTTOM", "EYEBROW_LEFT_TOP"
+                  , "EYEBROW_LEFT_L", "EYEBROW_LEFT_R"
+                  , "EYEBROW_RIGHT_BOTTOM", "EYEBROW_RIGHT_TOP"
+                  , "EYEBROW_RIGHT_L", "EYEBROW_RIGHT_R")
+_at = _FACE_LANDMARKS.index
+
+
+def _gather(points: Union[dlib.dpoints, LandmarkArray], indices
+            ) -> LandmarkArray:
+    """Return (len(indices), 2) float64 array of given points.
+        FOR INTERNAL USE
+    """
+    if isinstance(points, numpy.ndarray):
+        return points[indices].astype(numpy.float64, copy=False)
+    return numpy.array([(points[i].x, points[i].y) for i in indices]
+                      , numpy.float64)
+
+
+def _pointX(points: Union[dlib.dpoints, LandmarkArray], i: int) -> float:
+    """Return x of i-th point. FOR INTERNAL USE"""
+    return float(points[i, 0]) if isinstance(points, numpy.ndarray)\
+                               else points[i].x
 # }}}
 
 
@@ -517,12 +549,48 @@ class CapHasClosedError(FaceDetectionError):
 
     def __str__(self):
         return "The camera connection has been closed. Please try again"
+
+
+class CalibrationTimeoutError(FaceDetectionError):
+    """Exception raised when not enough frontal faces are found
+        to calibrate in time
+    """
+    def __init__(self, found: int, needed: int) -> None:
+        self.found = found
+        self.needed = needed
+
+    def __str__(self):
+        return f"Only {self.found} of {self.needed} frontal faces"\
+               " are found to calibrate. Please face front"
+
+
+class SourceOpenError(FaceDetectionError):
+    """Exception raised when video file or image directory can't be opened"""
+    exitCode = ExitCode.ERR_IO
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __str__(self):
+        return f"Could not open '{self.path}' as video or image directory"
+
+
+class WorkerDiedError(FaceDetectionError):
+    """Exception raised when a worker process of 'InferencePool' has died"""
+    def __init__(self, exitcode: Optional[int]) -> None:
+        self.exitcode = exitcode
+
+    def __str__(self):
+        return f"Inference worker has died (exit code {self.exitcode})"
 # }}}
 
 
 class FaceData:
     """ contains FaceData
     """
+    __slots__ = ("face_x_radian", "face_y_radian", "face_z_radian"
+                , "mouth_height_percent", "mouth_width_percent"
+                , "left_eye_percent", "right_eye_percent")
     face_x_radian: float
     face_y_radian: float
     face_z_radian: float
@@ -583,22 +651,286 @@ class FaceData:
                   , clamp(rEyePercent, 0, 150)
                    )
 
-    def toBinary(s):
+    @classmethod
+    def getBatch(cls: S, landmarks: numpy.ndarray, calib: RawFaceData
+                , initialRatio: Optional[float] = None
+                , landmarkNum: Dict[str, int] = LANDMARK_NUM
+                 ) -> numpy.ndarray:
+        """ 'get' for many frames at once
+
+            landmarks: (N, P, 2) array of 'facemarkArray' results.
+                       Frames which contain NaN are treated as
+                       'no face', and become 'FaceData.default()'
+            initialRatio: If given, each face is fixed with
+                          'Face.fixWithRatio' as main loop does
+
+            Return (N, 7) float64 array. Columns are in the same order
+            as '__init__' arguments (See 'fromRow').
+            Unlike 'get', division by 0 doesn't raise but results in
+            clamped value, so that one broken frame doesn't stop the batch.
+        """
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return cls._getBatch(numpy.asarray(landmarks, numpy.float64)
+                                , calib, initialRatio, landmarkNum)
+
+    @classmethod
+    def _getBatch(cls: S, landmarks: numpy.ndarray, calib: RawFaceData
+                 , initialRatio: Optional[float]
+                 , landmarkNum: Dict[str, int]) -> numpy.ndarray:
+        # The same as 'Face.fromDPoints', but for all frames
+        p = landmarks[:, [landmarkNum[n] for n in _FACE_LANDMARKS]]
+        smallest = p[:, [_at("TEMPLE_LEFT"), _at("CHIN_CENTER")], [0, 1]]
+        biggest  = p[:, [_at("TEMPLE_RIGHT"), _at("EYEBROW_LEFT_TOP")], [0, 1]]
+        movedBiggest = ((-smallest) + biggest)[:, None]
+        n = (200 * (((-smallest[:, None]) + p) / movedBiggest)) - 100
+
+        def _point(name: str) -> numpy.ndarray:
+            return n[:, _at(name)]
+
+        # 'Face.fixWithRatio' divides y of center and chin by 'magnif',
+        # and multiplies parts by it.
+        magnif = numpy.ones(len(n))
+        if initialRatio is not None:
+            xLength = numpy.abs(landmarks[:, landmarkNum["TEMPLE_LEFT"], 0]
+                                - landmarks[:, landmarkNum["TEMPLE_RIGHT"], 0])
+            yLength = numpy.abs(
+                landmarks[:, landmarkNum["EYEBROW_LEFT_TOP"], 0]
+                - landmarks[:, landmarkNum["CHIN_CENTER"], 0])
+            magnif = (yLength / xLength) / initialRatio
+
+        def _part(name: str) -> numpy.ndarray:
+            return _point(name) * magnif[:, None] \
+                if initialRatio is not None else _point(name)
+
+        centerY = _point("NOSE_BOTTOM")[:, 1] / magnif
+        centerX = _point("NOSE_BOTTOM")[:, 0]
+        chin = _point("CHIN_CENTER") / numpy.stack([numpy.ones(len(n))
+                                                    , magnif], axis=1)
+
+        # The same as 'RawFaceData.get' and 'thresholded'
+        eyeVector = _part("LEFT_EYE_R") - _part("RIGHT_EYE_L")
+        eyeLength = numpy.sqrt(eyeVector[:, 0] ** 2 + eyeVector[:, 1] ** 2)
+        eyeDistance = numpy.minimum(numpy.round(eyeLength, 15)
+                                   , calib.eyeDistance)
+        middleForehead = (_part("EYEBROW_LEFT_R")
+                          + _part("EYEBROW_RIGHT_L")) / 2
+        faceHeighVector = middleForehead - chin
+        faceHeighLength = numpy.sqrt(faceHeighVector[:, 0] ** 2
+                                     + faceHeighVector[:, 1] ** 2)
+        faceHeigh = numpy.minimum(numpy.round(faceHeighLength, 15)
+                                 , calib.faceHeigh)
+        mouthHeight = _part("MOUSE_TOP")[:, 1] - _part("MOUSE_BOTTOM")[:, 1]
+        mouthWidth = numpy.abs(_part("MOUSE_L")[:, 0] - _part("MOUSE_R")[:, 0])
+        leftEyeHeight = _part("LEFT_EYE_TOP")[:, 1]\
+                        - _part("LEFT_EYE_BOTTOM")[:, 1]
+        rightEyeHeight = _part("RIGHT_EYE_TOP")[:, 1]\
+                         - _part("RIGHT_EYE_BOTTOM")[:, 1]
+
+        # The same as 'get'
+        eyeLineVector = _part("RIGHT_EYE_BOTTOM") - _part("LEFT_EYE_BOTTOM")
+        degreeY = numpy.arccos(numpy.round(eyeDistance / calib.eyeDistance
+                                          , 15))
+        degreeX = numpy.arccos(numpy.round(faceHeigh / calib.faceHeigh, 15))
+        degreeZ = numpy.arctan(numpy.round(eyeLineVector[:, 1]
+                                           / eyeLineVector[:, 0], 15))
+
+        rotateX = numpy.where(centerY > calib.faceCenter.y
+                             , degreeX, -1 * degreeX)
+        rotateY = numpy.where(centerX > calib.faceCenter.x
+                             , degreeY, -1 * degreeY)
+
+        def _percent(a: numpy.ndarray, c: float) -> numpy.ndarray:
+            return numpy.round((a / c) * 100)
+
+        result = numpy.stack([clamp(rotateX, -1 / pi, 1 / pi)
+                            , clamp(rotateY, -1 / pi, 1 / pi)
+                            , clamp(degreeZ, -1 / pi, 1 / pi)
+                            , clamp(_percent(mouthHeight, calib.mouthHeight)
+                                   , 0, 150)
+                            , clamp(_percent(mouthWidth, calib.mouthWidth)
+                                   , 0, 150)
+                            , clamp(_percent(leftEyeHeight
+                                            , calib.leftEyeHeight), 0, 150)
+                            , clamp(_percent(rightEyeHeight
+                                            , calib.rightEyeHeight), 0, 150)]
+                           , axis=1)
+
+        noFace = numpy.isnan(landmarks).any(axis=(1, 2))
+        result[noFace] = FaceData.default().toRow()
+        return result
+
+    @classmethod
+    def fromRow(cls: S, row: numpy.ndarray) -> S:
+        """ Return FaceData from a row of 'getBatch' result
+        """
+        x, y, z, mh, mw, le, re = row.tolist()
+        return cls(x, y, z, int(mh), int(mw), int(le), int(re))
+
+    def toRow(s) -> numpy.ndarray:
+        return numpy.array([s.face_x_radian, s.face_y_radian
+                           , s.face_z_radian
+                           , s.mouth_height_percent, s.mouth_width_percent
+                           , s.left_eye_percent, s.right_eye_percent]
+                          , numpy.float64)
+
+    def toBinary(s, compact: bool = False) -> bytes:
         """ convert FaceData into binary format
+
+            'compact' uses version 1.2, whose angles are 16-bit fixed-point
         """
-        return struct.pack('!BdddBBBB'
-                          , (majorVersionNum << 4) + minorVersionNum
-                          , s.face_x_radian
-                          , s.face_y_radian
-                          , s.face_z_radian
-                          , s.mouth_height_percent
-                          , s.mouth_width_percent
-                          , s.left_eye_percent
-                          , s.right_eye_percent
-                           )
+        minor = compactMinorVersionNum if compact else minorVersionNum
+        return struct.pack('!B', (majorVersionNum << 4) + minor)\
+               + _packSample(s, compact)
+
+    @classmethod
+    def fromBinary(cls: S, b: bytes) -> S:
+        """ inverse of 'toBinary'. Raise ValueError if 'b' isn't
+            version 1.0 nor 1.2
+        """
+        compact = len(b) > 0\
+                  and b[0] == (majorVersionNum << 4) + compactMinorVersionNum
+        sample = _COMPACT_SAMPLE if compact else _SAMPLE
+        if len(b) != 1 + sample.size\
+           or (not compact
+               and b[0] != (majorVersionNum << 4) + minorVersionNum):
+            raise ValueError("not a version 1.0 nor 1.2 packet")
+        return _unpackSample(b, 1, compact)
+
+    def _fields(s) -> tuple:
+        """ FOR INTERNAL USE
+        """
+        return (s.face_x_radian, s.face_y_radian, s.face_z_radian
+               , s.mouth_height_percent, s.mouth_width_percent
+               , s.left_eye_percent, s.right_eye_percent)
+
+
+# Packet {{{
+# Version 1.0 datagram is one FaceData:
+#   version(B) sample
+# Version 1.1 datagram carries several consecutive samples:
+#   version(B) flags(B) seq(I) timestamp(d) count(B) sample * count
+# Version 1.2 and 1.3 are the same as 1.0 and 1.1 respectively,
+# but with compact samples.
+# version is '(majorVersionNum << 4) + minor version', and sample is
+# 'dddBBBB' (compact one is 'hhhBBBB') in the same order as FaceData.
+# All in network byte order.
+# 'seq' and 'timestamp' are of the newest sample, which is the last one.
+# See docs/en/spec/packet.md for details.
+batchMinorVersionNum = 1
+# Packet.flags: the last sample is predicted, not measured
+FLAG_PREDICTED = 0x01
+# Packet.flags: there's no face in the frame of the last sample
+FLAG_NO_FACE = 0x02
+compactMinorVersionNum = 2
+compactBatchMinorVersionNum = 3
+_SAMPLE = struct.Struct('!dddBBBB')
+_COMPACT_SAMPLE = struct.Struct('!hhhBBBB')
+_BATCH_HEADER = struct.Struct('!BBIdB')
+MAX_SAMPLES = 255
+# size of the biggest packet of any version (1.1 with MAX_SAMPLES)
+MAX_PACKET_SIZE = _BATCH_HEADER.size + MAX_SAMPLES * _SAMPLE.size
+# Compact samples have angles in [-pi/2, pi/2] as int16 of
+# 'round(radian * ANGLE_SCALE)'. Angles out of the range are saturated.
+# Quantization error is at most '0.5 / ANGLE_SCALE' (about 2.4e-5 radian).
+ANGLE_SCALE = 32767 / (pi / 2)
+
+
+def _packSample(d: FaceData, compact: bool) -> bytes:
+    """ FOR INTERNAL USE
+    """
+    if not compact:
+        return _SAMPLE.pack(*d._fields())
+    return _COMPACT_SAMPLE.pack(_toFixed(d.face_x_radian)
+                               , _toFixed(d.face_y_radian)
+                               , _toFixed(d.face_z_radian)
+                               , *d._fields()[3:])
+
+
+def _unpackSample(b: bytes, offset: int, compact: bool) -> FaceData:
+    """ FOR INTERNAL USE
+    """
+    if not compact:
+        return FaceData(*_SAMPLE.unpack_from(b, offset))
+    x, y, z, *percents = _COMPACT_SAMPLE.unpack_from(b, offset)
+    return FaceData(x / ANGLE_SCALE, y / ANGLE_SCALE, z / ANGLE_SCALE
+                   , *percents)
+
+
+def _toFixed(radian: float) -> int:
+    """ FOR INTERNAL USE
+    """
+    return round(clamp(radian, -pi / 2, pi / 2) * ANGLE_SCALE)
+
+
+@dataclasses.dataclass(frozen=True)
+class Packet:
+    """ Several consecutive FaceData in one datagram (version 1.1 or 1.3)
+
+        seq: sequence number of the last sample. It wraps around at 2**32,
+             and sample 'i' has 'seq - len(samples) + 1 + i'.
+             None for version 1.0 and 1.2 packets
+        timestamp: UNIX time when the frame of the last sample was captured.
+                   None for version 1.0 and 1.2 packets
+        samples: oldest first
+        flags: bit flags of 'FLAG_PREDICTED' and 'FLAG_NO_FACE'
+        compact: use compact samples (version 1.3)
+    """
+    seq: Optional[int]
+    timestamp: Optional[float]
+    samples: Tuple[FaceData, ...]
+    flags: int = 0
+    compact: bool = False
+
+    def toBinary(s) -> bytes:
+        if not 0 < len(s.samples) <= MAX_SAMPLES:
+            raise ValueError(f"a packet has 1 to {MAX_SAMPLES} samples,"
+                             f" not {len(s.samples)}")
+        if s.seq is None or s.timestamp is None:
+            raise ValueError("batched packet needs seq and timestamp")
+        minor = compactBatchMinorVersionNum if s.compact\
+                else batchMinorVersionNum
+        return _BATCH_HEADER.pack((majorVersionNum << 4) + minor
+                                 , s.flags
+                                 , s.seq % (1 << 32)
+                                 , s.timestamp
+                                 , len(s.samples))\
+               + b"".join(_packSample(d, s.compact) for d in s.samples)
+
+    @classmethod
+    def fromBinary(cls, b: bytes) -> "Packet":
+        """ Decode packet of any version above.
+
+            Raise ValueError if 'b' is other version or broken.
+        """
+        if len(b) == 0:
+            raise ValueError("empty packet")
+        major, minor = b[0] >> 4, b[0] & 0xf
+        if major == majorVersionNum\
+           and minor in (minorVersionNum, compactMinorVersionNum):
+            return cls(None, None, (FaceData.fromBinary(b),)
+                      , compact=minor == compactMinorVersionNum)
+        if major != majorVersionNum\
+           or minor not in (batchMinorVersionNum
+                           , compactBatchMinorVersionNum):
+            raise ValueError(f"unsupported packet version {major}.{minor}")
+        compact = minor == compactBatchMinorVersionNum
+        sample = _COMPACT_SAMPLE if compact else _SAMPLE
+        if len(b) < _BATCH_HEADER.size:
+            raise ValueError("packet is too short")
+        _, flags, seq, timestamp, count = _BATCH_HEADER.unpack_from(b)
+        if count == 0 or len(b) != _BATCH_HEADER.size + count * sample.size:
+            raise ValueError(f"packet size {len(b)} doesn't match"
+                             f" sample count {count}")
+        samples = tuple(_unpackSample(b, _BATCH_HEADER.size + i * sample.size
+                                     , compact)
+                        for i in range(count))
+        return cls(seq, timestamp, samples, flags, compact)
+# }}}
 
 
 def clamp(a, _min, _max):
+    if isinstance(a, numpy.ndarray):
+        return numpy.where(a <= _min, _min, numpy.where(_max <= a, _max, a))
     if a <= _min:
         return _min
     elif _max <= a:
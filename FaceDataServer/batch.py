@@ -0,0 +1,250 @@
+# module batch
+# (BatchSetting, BatchSummary, runBatch, CsvWriter, BinaryWriter, WRITERS)
+# where
+import dataclasses
+import time
+import numpy
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Type
+from .faceDetection import (FaceTracker, DetectionSetting, autoCalibration
+                           , currentLayout)
+from .inferencePool import InferencePool
+from .source import ImageDirSource, frames
+from .stats import LatencyStats
+from .Types import Cv2Image, FaceData, LandmarkArray, RawFaceData
+
+
+# BatchSetting {{{
+@dataclasses.dataclass(frozen=True)
+class BatchSetting:
+    """Setting for 'runBatch'
+
+        calibrationFrames: Calibrate from this number of
+                           frames which have face
+        chunkSize: Number of frames converted into FaceData at once
+        workers: Run inference on this number of worker processes.
+                 0 runs it on the calling thread with tracking
+    """
+    calibrationFrames: int = 30
+    chunkSize: int = 256
+    workers: int = 0
+# }}}
+
+
+# BatchSummary {{{
+class BatchSummary:
+    """Result of 'runBatch'
+
+        Latencies of 'read' and 'inference' are per frame,
+        and those of 'convert' and 'write' are per chunk.
+        All of them are kept, so percentiles are of the whole run.
+        'skipped' is the number of images which couldn't be read.
+    """
+    frames: int
+    noFace: int
+    skipped: int
+    elapsed: float
+    stats: Dict[str, LatencyStats]
+
+    STAGES = ("read", "inference", "convert", "write")
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.noFace = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+        self.stats = {name: LatencyStats(None) for name in self.STAGES}
+
+    def report(self) -> str:
+        fps = self.frames / self.elapsed if self.elapsed != 0 else 0.0
+        stages = " | ".join(f"{name}: {s.summary()}"
+                            for name, s in self.stats.items())
+        return f"frames: {self.frames}, no face: {self.noFace}"\
+               f", skipped: {self.skipped}"\
+               f", {self.elapsed:.2f}s ({fps:.1f} fps) | {stages}"
+# }}}
+
+
+# Writers {{{
+class CsvWriter:
+    """Write FaceData as CSV, with frame number and
+        whether face was found on that frame
+    """
+    def __init__(self, out: IO) -> None:
+        self.out = out
+        out.write(",".join(("frame", "face") + FaceData.__slots__) + "\n")
+
+    def write(self, first: int, rows: numpy.ndarray
+             , hasFace: numpy.ndarray) -> None:
+        for i, (row, face) in enumerate(zip(rows.tolist(), hasFace)):
+            x, y, z, *percents = row
+            self.out.write(f"{first + i},{int(face)},{x},{y},{z},"
+                           + ",".join(str(int(p)) for p in percents)
+                           + "\n")
+
+
+class BinaryWriter:
+    """Write FaceData in the same format as they are sent.
+        Frames without face are written as 'FaceData.default()'
+    """
+    def __init__(self, out: IO) -> None:
+        self.out = out
+
+    def write(self, first: int, rows: numpy.ndarray
+             , hasFace: numpy.ndarray) -> None:
+        self.out.write(b"".join(FaceData.fromRow(row).toBinary()
+                                for row in rows))
+
+
+WRITERS: Dict[str, Type] = {"csv": CsvWriter, "binary": BinaryWriter}
+# }}}
+
+
+# runBatch(source, writer, setting, tracker) -> BatchSummary {{{
+def runBatch(source, writer, setting: BatchSetting = BatchSetting()
+            , tracker: Optional[FaceTracker] = None) -> BatchSummary:
+    """Process all frames of 'source' as fast as possible,
+        and write FaceData of each frame with 'writer'.
+
+        source: 'cv2.VideoCapture' or 'source.ImageDirSource'
+        writer: One of 'WRITERS'
+
+        Unlike main loop, no frame is dropped.
+        Calibration is done automatically with the first
+        'setting.calibrationFrames' frames which have face.
+        Frames read until then are kept and written after calibration.
+        Images which can't be read are skipped (See 'ImageDirSource').
+    """
+    summary = BatchSummary()
+    tracker = tracker or FaceTracker()
+    pending: List[Optional[LandmarkArray]] = []
+    calibFaces: List[LandmarkArray] = []
+    calib: Optional[Tuple[RawFaceData, float]] = None
+    written = 0
+    start = time.perf_counter()
+
+    frameIter = _timed(frames(source), summary.stats["read"])
+    landmarks = _poolLandmarks(frameIter, setting.workers, tracker.detection
+                              , summary.stats["inference"])\
+                    if setting.workers > 0\
+                    else _landmarks(frameIter, tracker
+                                   , summary.stats["inference"])
+
+    for landmark in landmarks:
+        summary.frames += 1
+        if landmark is None:
+            summary.noFace += 1
+        pending.append(landmark)
+
+        if calib is None:
+            if landmark is not None:
+                calibFaces.append(landmark)
+            if len(calibFaces) < setting.calibrationFrames:
+                continue
+            calib = autoCalibration(calibFaces)
+
+        if len(pending) >= setting.chunkSize:
+            _flush(pending, calib, writer, written, summary)
+            written += len(pending)
+            pending = []
+
+    if calib is None and len(calibFaces) != 0:
+        # source is shorter than calibration
+        calib = autoCalibration(calibFaces)
+    if len(pending) != 0:
+        _flush(pending, calib, writer, written, summary)
+
+    summary.elapsed = time.perf_counter() - start
+    if isinstance(source, ImageDirSource):
+        summary.skipped = source.skipped
+    return summary
+# }}}
+
+
+# _flush(pending, calib, writer, first, summary) -> None {{{
+def _flush(pending: List[Optional[LandmarkArray]]
+          , calib: Optional[Tuple[RawFaceData, float]]
+          , writer, first: int, summary: BatchSummary) -> None:
+    """Convert landmarks into FaceData and write them. FOR INTERNAL USE"""
+    t = time.perf_counter()
+    hasFace = numpy.array([lm is not None for lm in pending])
+    if calib is None:
+        # No face was found in whole source
+        rows = numpy.tile(FaceData.default().toRow(), (len(pending), 1))
+    else:
+        array = numpy.full((len(pending), currentLayout().pointNum, 2)
+                          , numpy.nan)
+        for i, lm in enumerate(pending):
+            if lm is not None:
+                array[i] = lm
+        rows = FaceData.getBatch(array, calib[0], calib[1]
+                                , currentLayout().landmarkNum)
+    summary.stats["convert"].add(time.perf_counter() - t)
+
+    t = time.perf_counter()
+    writer.write(first, rows, hasFace)
+    summary.stats["write"].add(time.perf_counter() - t)
+# }}}
+
+
+# _timed(it, stats) -> Iterator {{{
+def _timed(it: Iterator, stats: LatencyStats) -> Iterator:
+    """Record time taken to get each item of 'it'. FOR INTERNAL USE"""
+    while True:
+        t = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        stats.add(time.perf_counter() - t)
+        yield item
+# }}}
+
+
+# _landmarks(frames, tracker, stats) -> Iterator[Optional[LandmarkArray]] {{{
+def _landmarks(frameIter: Iterator[Cv2Image], tracker: FaceTracker
+              , stats: LatencyStats) -> Iterator[Optional[LandmarkArray]]:
+    """Run inference on the calling thread. FOR INTERNAL USE"""
+    for frame in frameIter:
+        t = time.perf_counter()
+        landmark = tracker.facemarkArray(frame)
+        stats.add(time.perf_counter() - t)
+        yield landmark
+# }}}
+
+
+# _poolLandmarks(frames, workers, detection, stats) {{{
+def _poolLandmarks(frameIter: Iterator[Cv2Image], workers: int
+                  , detection: DetectionSetting, stats: LatencyStats
+                   ) -> Iterator[Optional[LandmarkArray]]:
+    """Run inference on 'InferencePool'. FOR INTERNAL USE
+
+        Frames are never dropped: when all slots are in use,
+        it waits for the oldest result before submitting next frame.
+        'stats' records time spent on waiting for results.
+    """
+    pool: Optional[InferencePool] = None
+    inFlight = 0
+
+    def _get() -> Optional[LandmarkArray]:
+        t = time.perf_counter()
+        _, landmark = pool.get()
+        stats.add(time.perf_counter() - t)
+        return landmark
+
+    try:
+        for frame in frameIter:
+            if pool is None:
+                pool = InferencePool(workers, frame.shape, detection)
+            if inFlight == pool.slots:
+                yield _get()
+                inFlight -= 1
+            pool.submit(frame)
+            inFlight += 1
+
+        while inFlight != 0:
+            yield _get()
+            inFlight -= 1
+    finally:
+        if pool is not None:
+            pool.close()
+# }}}
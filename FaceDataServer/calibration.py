@@ -0,0 +1,189 @@
+# module calibration
+# (CalibrationSetting, isFrontal, robustCalibration, collectCalibration
+#  , CalibrationStore) where
+import dataclasses
+import json
+import math
+import os
+import time
+import cv2
+import numpy
+from typing import Dict, List, Optional, Sequence, Tuple
+from .faceDetection import FaceTracker, autoCalibration, currentLayout
+from .landmarkLayout import LandmarkLayout
+from .Types import (LandmarkArray, RawFaceData, Face, AbsoluteCoord
+                   , CapHasClosedError, CalibrationTimeoutError, ExitCode)
+
+
+# CalibrationSetting {{{
+@dataclasses.dataclass(frozen=True)
+class CalibrationSetting:
+    """Setting for 'collectCalibration'
+
+        frames: number of frontal faces to calibrate from
+        timeout: give up if they aren't collected in this seconds
+        maxRoll: faces whose line between eyes leans more than
+                 this radian aren't frontal
+        maxYaw: faces whose nose is off the middle of temples by
+                more than this ratio of face width aren't frontal
+        outlierThreshold: frames which have any value farther than
+                          this times of (normalized) MAD from median
+                          are rejected
+    """
+    frames: int = 30
+    timeout: float = 10.0
+    maxRoll: float = 0.15
+    maxYaw: float = 0.1
+    outlierThreshold: float = 3.5
+# }}}
+
+
+# isFrontal(landmark, setting, layout) -> bool {{{
+def isFrontal(landmark: LandmarkArray
+             , setting: CalibrationSetting = CalibrationSetting()
+             , layout: Optional[LandmarkLayout] = None) -> bool:
+    """True if face of 'landmark' looks straight at the camera
+
+        'landmark' is 'facemarkArray' style, i.e. relative to nose bottom.
+        Only roll (eye line) and yaw (nose between temples) are
+        checked, as pitch can't be told without calibration.
+    """
+    n = (layout or currentLayout()).landmarkNum
+    eyes = landmark[n["RIGHT_EYE_BOTTOM"]] - landmark[n["LEFT_EYE_BOTTOM"]]
+    # which eye is on the left depends on layout
+    roll = math.atan2(eyes[1], abs(eyes[0]))
+    left, right = landmark[n["TEMPLE_LEFT"]], landmark[n["TEMPLE_RIGHT"]]
+    width = abs(right[0] - left[0])
+    if width == 0:
+        return False
+    # temples are relative to the nose, which is at the origin
+    yaw = abs((left[0] + right[0]) / 2) / width
+    return abs(roll) <= setting.maxRoll and yaw <= setting.maxYaw
+# }}}
+
+
+# robustCalibration(landmarks, layout, threshold) -> (RawFaceData, float) {{{
+def robustCalibration(landmarks: Sequence[LandmarkArray]
+                     , layout: Optional[LandmarkLayout] = None
+                     , threshold: float = 3.5
+                      ) -> Tuple[RawFaceData, float]:
+    """'autoCalibration' of frames which aren't outliers
+
+        Each frame is turned into 'RawFaceData' and ratio, and a frame
+        is rejected if any of them is farther than 'threshold' times
+        of MAD (scaled to standard deviation) from median of all frames.
+        The rest are averaged by 'autoCalibration'.
+
+        Raise Exception:
+            ValueError: 'landmarks' is empty
+    """
+    if len(landmarks) == 0:
+        raise ValueError("at least one landmark is needed to calibrate")
+    landmarkNum = (layout or currentLayout()).landmarkNum
+    rows = []
+    for lm in landmarks:
+        face, ratio = Face.fromDPointsWithRatio(lm, landmarkNum)
+        r = RawFaceData.get(face)
+        rows.append((r.eyeDistance, r.faceHeigh, r.faceCenter.x
+                    , r.faceCenter.y, r.mouthHeight, r.mouthWidth
+                    , r.leftEyeHeight, r.rightEyeHeight, ratio))
+    values = numpy.array(rows, dtype=numpy.float64)
+
+    median = numpy.median(values, axis=0)
+    mad = 1.4826 * numpy.median(numpy.abs(values - median), axis=0)
+    # columns all frames agree on can't reject anything
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        score = numpy.where(mad > 0, numpy.abs(values - median) / mad, 0)
+    inliers = [lm for lm, s in zip(landmarks, score)
+               if numpy.all(s <= threshold)]
+    return autoCalibration(inliers or landmarks, layout)
+# }}}
+
+
+# collectCalibration(cap, tracker, setting, layout) -> (RawFaceData, float) {{{
+def collectCalibration(cap: cv2.VideoCapture, tracker: FaceTracker
+                      , setting: CalibrationSetting = CalibrationSetting()
+                      , layout: Optional[LandmarkLayout] = None
+                       ) -> Tuple[RawFaceData, float]:
+    """Calibrate from frontal faces in frames of 'cap' without asking user
+
+        Faces are found by 'tracker', so each frame is detected once,
+        and tracking has started when this returns.
+
+        Raise Exception:
+            CapHasClosedError: 'cap' has been closed
+            CalibrationTimeoutError: 'setting.frames' frontal faces
+                                     aren't found in 'setting.timeout'
+    """
+    landmarks: List[LandmarkArray] = []
+    deadline = time.monotonic() + setting.timeout
+    while len(landmarks) < setting.frames:
+        if not cap.isOpened():
+            raise CapHasClosedError(ExitCode.FILE_FACEDETECTION)
+        if time.monotonic() > deadline:
+            raise CalibrationTimeoutError(len(landmarks), setting.frames)
+        ok, frame = cap.read()
+        if not ok:
+            continue
+        landmark = tracker.facemarkArray(frame)
+        if landmark is not None and isFrontal(landmark, setting, layout):
+            landmarks.append(landmark)
+    return robustCalibration(landmarks, layout, setting.outlierThreshold)
+# }}}
+
+
+# CalibrationStore {{{
+class CalibrationStore:
+    """Calibration results of each profile (e.g. user name) in JSON file
+
+        Results are stored with the name of landmark layout,
+        and ones of other layouts aren't loaded.
+    """
+    path: str
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _read(self) -> Dict[str, dict]:
+        """FOR INTERNAL USE"""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def load(self, profile: str, layoutName: str
+             ) -> Optional[Tuple[RawFaceData, float]]:
+        """Return saved result of 'profile', or None if there isn't"""
+        d = self._read().get(profile)
+        if d is None or d["layout"] != layoutName:
+            return None
+        r = d["raw"]
+        return (RawFaceData(r["eyeDistance"], r["faceHeigh"]
+                           , AbsoluteCoord(*r["faceCenter"])
+                           , r["mouthHeight"], r["mouthWidth"]
+                           , r["leftEyeHeight"], r["rightEyeHeight"])
+               , d["ratio"])
+
+    def save(self, profile: str, layoutName: str, calib: RawFaceData
+            , ratio: float) -> None:
+        """Save result of 'profile'. Other profiles are kept"""
+        profiles = self._read()
+        c = calib
+        raw = {"eyeDistance": float(c.eyeDistance)
+              , "faceHeigh": float(c.faceHeigh)
+              , "faceCenter": [float(c.faceCenter.x), float(c.faceCenter.y)]
+              , "mouthHeight": float(c.mouthHeight)
+              , "mouthWidth": float(c.mouthWidth)
+              , "leftEyeHeight": float(c.leftEyeHeight)
+              , "rightEyeHeight": float(c.rightEyeHeight)}
+        profiles[profile] = {"layout": layoutName, "ratio": float(ratio)
+                            , "raw": raw}
+        directory = os.path.dirname(self.path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        # never leave half-written file
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp, self.path)
+# }}}
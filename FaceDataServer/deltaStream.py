@@ -0,0 +1,223 @@
+# module deltaStream
+# (DeltaEncoder, DeltaDecoder) where
+import struct
+from math import pi
+from typing import List, Optional, Tuple
+from .Types import FaceData, ANGLE_SCALE, majorVersionNum, clamp
+
+# Delta stream sends a keyframe, which is the whole FaceData, and then
+# only fields which have changed since the last packet.
+#
+#   keyframe (version 1.4): version(B) seq(I) timestamp(d) sample
+#   delta    (version 1.5): version(B) seq(I) elapsed(H) mask(B) diff * n
+#
+# sample is the compact one ('hhhBBBB'). Values are quantized in the
+# same way, so that deltas never accumulate rounding errors.
+# 'seq' increases by one for each packet, and 'elapsed' is milliseconds
+# since the keyframe. Bit 'i' of 'mask' is set if field 'i' of FaceData
+# has changed, and diff of it follows in field order: int16 ('h')
+# for angles, int8 ('b') for percentages.
+# See docs/en/spec/packet.md for details.
+keyframeMinorVersionNum = 4
+deltaMinorVersionNum = 5
+_KEYFRAME = struct.Struct('!BIdhhhBBBB')
+_DELTA_HEADER = struct.Struct('!BIHB')
+_ANGLE_FIELDS = 3
+_FIELDS = 7
+_SEQ_MOD = 1 << 32
+
+Quantized = Tuple[int, ...]
+
+
+def _quantize(data: FaceData) -> Quantized:
+    """Return fields of 'data' as integers. FOR INTERNAL USE"""
+    fields = data._fields()
+    return tuple([round(clamp(a, -pi / 2, pi / 2) * ANGLE_SCALE)
+                  for a in fields[:_ANGLE_FIELDS]]
+                 + [int(clamp(round(p), 0, 255))
+                    for p in fields[_ANGLE_FIELDS:]])
+
+
+def _dequantize(q: Quantized) -> FaceData:
+    """FOR INTERNAL USE"""
+    return FaceData(*[a / ANGLE_SCALE for a in q[:_ANGLE_FIELDS]]
+                   , *q[_ANGLE_FIELDS:])
+
+
+def _diffFormat(i: int) -> str:
+    """FOR INTERNAL USE"""
+    return 'h' if i < _ANGLE_FIELDS else 'b'
+
+
+# DeltaEncoder {{{
+class DeltaEncoder:
+    """Encode FaceData stream into keyframes and deltas
+
+        keyframeInterval: send keyframe at least every this seconds,
+                          even if nothing has changed, so that new
+                          or lost receivers can catch up
+        angleEpsilon: angles (radian) changed no more than this
+                      are not sent
+        percentEpsilon: same as angleEpsilon, for percentages
+
+        Changes are always compared with values receivers have,
+        so their error never exceeds epsilons.
+
+        Usage:
+            encoder = DeltaEncoder()
+            packet = encoder.encode(data, time.time())
+            if packet is not None:
+                transport.send(packet)
+    """
+    keyframeInterval: float
+    seq: int
+    keyframes: int
+    deltas: int
+    skipped: int
+
+    def __init__(self, keyframeInterval: float = 1.0
+                , angleEpsilon: float = 0.001
+                , percentEpsilon: int = 0) -> None:
+        self.keyframeInterval = keyframeInterval
+        self._epsilons = (angleEpsilon * ANGLE_SCALE,) * _ANGLE_FIELDS\
+                         + (percentEpsilon,) * (_FIELDS - _ANGLE_FIELDS)
+        self.seq = -1
+        self.keyframes = 0
+        self.deltas = 0
+        self.skipped = 0
+        self._state: Optional[List[int]] = None
+        self._keyTime = 0.0
+
+    def encode(self, data: FaceData, timestamp: float) -> Optional[bytes]:
+        """Return packet for 'data', or None if nothing has changed
+
+            'timestamp' is UNIX time when the frame was captured.
+        """
+        q = _quantize(data)
+        elapsed = round((timestamp - self._keyTime) * 1000)
+        if self._state is None\
+           or timestamp - self._keyTime >= self.keyframeInterval\
+           or not 0 <= elapsed <= 0xffff:
+            return self._keyframe(q, timestamp)
+
+        mask = 0
+        diffs: List[int] = []
+        for i, (new, old, eps) in enumerate(zip(q, self._state
+                                               , self._epsilons)):
+            if abs(new - old) > eps:
+                mask |= 1 << i
+                diffs.append(new - old)
+        if mask == 0:
+            self.skipped += 1
+            return None
+        fmt = '!' + ''.join(_diffFormat(i) for i in range(_FIELDS)
+                            if mask & (1 << i))
+        try:
+            body = struct.pack(fmt, *diffs)
+        except struct.error:
+            # too big to be a delta
+            return self._keyframe(q, timestamp)
+
+        for i in range(_FIELDS):
+            if mask & (1 << i):
+                self._state[i] = q[i]
+        self.seq = (self.seq + 1) % _SEQ_MOD
+        self.deltas += 1
+        return _DELTA_HEADER.pack((majorVersionNum << 4)
+                                  + deltaMinorVersionNum
+                                 , self.seq, elapsed, mask) + body
+
+    def _keyframe(self, q: Quantized, timestamp: float) -> bytes:
+        """FOR INTERNAL USE"""
+        self._state = list(q)
+        self._keyTime = timestamp
+        self.seq = (self.seq + 1) % _SEQ_MOD
+        self.keyframes += 1
+        return _KEYFRAME.pack((majorVersionNum << 4)
+                              + keyframeMinorVersionNum
+                             , self.seq, timestamp, *q)
+
+    def report(self) -> str:
+        return f"keyframes {self.keyframes}, deltas {self.deltas}"\
+               f", skipped {self.skipped}"
+# }}}
+
+
+# DeltaDecoder {{{
+class DeltaDecoder:
+    """Reference decoder of delta stream
+
+        Deltas after lost packets are ignored until the next keyframe.
+        Duplicated or reordered old deltas are ignored too.
+        Lost packets are counted in 'lost'.
+
+        Usage:
+            decoder = DeltaDecoder()
+            result = decoder.decode(sock.recv(64))
+            if result is not None:
+                seq, timestamp, data = result
+    """
+    seq: Optional[int]
+    lost: int
+
+    def __init__(self) -> None:
+        self.seq = None
+        self.lost = 0
+        self._state: Optional[List[int]] = None
+        self._keyTime = 0.0
+        self._synced = False
+
+    def current(self) -> Optional[FaceData]:
+        """Return the latest FaceData. None before the first keyframe"""
+        return None if self._state is None else _dequantize(self._state)
+
+    def decode(self, b: bytes) -> Optional[Tuple[int, float, FaceData]]:
+        """Return '(seq, timestamp, FaceData)' after applying packet 'b'
+
+            None if 'b' can't be applied.
+            Raise ValueError if 'b' isn't keyframe nor delta, or broken.
+        """
+        if len(b) == 0 or b[0] >> 4 != majorVersionNum\
+           or b[0] & 0xf not in (keyframeMinorVersionNum
+                                , deltaMinorVersionNum):
+            raise ValueError("not a keyframe nor delta packet")
+        isKeyframe = b[0] & 0xf == keyframeMinorVersionNum
+        if isKeyframe:
+            if len(b) != _KEYFRAME.size:
+                raise ValueError("broken keyframe")
+            _, seq, timestamp, *q = _KEYFRAME.unpack(b)
+        else:
+            if len(b) < _DELTA_HEADER.size:
+                raise ValueError("broken delta")
+            _, seq, elapsed, mask = _DELTA_HEADER.unpack_from(b)
+            fmt = '!' + ''.join(_diffFormat(i) for i in range(_FIELDS)
+                                if mask & (1 << i))
+            if mask >> _FIELDS != 0\
+               or len(b) != _DELTA_HEADER.size + struct.calcsize(fmt):
+                raise ValueError("broken delta")
+
+        if self.seq is not None:
+            gap = (seq - self.seq) % _SEQ_MOD
+            if gap == 0 or (gap >= _SEQ_MOD // 2 and not isKeyframe):
+                # duplicated or older than the last one.
+                # Old keyframe is taken as the encoder has restarted
+                return None
+            if 1 < gap < _SEQ_MOD // 2:
+                self.lost += gap - 1
+                self._synced = False
+        self.seq = seq
+
+        if isKeyframe:
+            self._state = list(q)
+            self._keyTime = timestamp
+            self._synced = True
+        elif not self._synced:
+            return None
+        else:
+            diffs = iter(struct.unpack_from(fmt, b, _DELTA_HEADER.size))
+            for i in range(_FIELDS):
+                if mask & (1 << i):
+                    self._state[i] += next(diffs)
+            timestamp = self._keyTime + elapsed / 1000
+        return (seq, timestamp, _dequantize(self._state))
+# }}}
@@ -1,47 +1,324 @@
 # module faceDetection
-# (faceCalibration, facemark) where
+# (faceCalibration, autoCalibration, facemark, facemarkArray
+#  , FaceTracker, TrackingSetting, DetectionSetting
+#  , FaceSelector, BiggestFace, ClosestFace, LockedFace, FACE_SELECTORS
+#  , useLayout, currentLayout)
+# where
 import os
 import cv2
 import dlib
-from typing import List, Optional
-from .Types import (Cv2Image, CapHasClosedError,
-                    RawFaceData, Face, ExitCode, Tuple)
-from functools import reduce
+import dataclasses
+import numpy
+from typing import Dict, Optional, Sequence, Type
+from .Types import (Cv2Image, CapHasClosedError, LandmarkArray,
+                    RawFaceData, Face, ExitCode, Tuple, AbsoluteCoord)
+from .landmarkLayout import LandmarkLayout, HELEN
 
 
 # -- Variables
 
 # Cascade files directory path
 _SRC_PATH = os.path.dirname(os.path.abspath(__file__)) + "/../src"
-_predictor = dlib.shape_predictor(_SRC_PATH + '/helen-dataset.dat')
+_layout: LandmarkLayout = HELEN
+_predictor = dlib.shape_predictor(os.path.join(_SRC_PATH, _layout.modelFile))
 _detector = dlib.get_frontal_face_detector()
 
 
-# faceCalibration(cap: cv2.VideoCapture) -> RawFaceData {{{
-def faceCalibration(cap: cv2.VideoCapture) -> Tuple[RawFaceData, float]:
+# useLayout(layout: LandmarkLayout) -> None {{{
+def useLayout(layout: LandmarkLayout) -> None:
+    """Switch shape predictor model to the one 'layout' describes.
+        Landmarks are sorted into 'layout' thereafter.
+    """
+    global _layout, _predictor
+    _predictor = dlib.shape_predictor(os.path.join(_SRC_PATH
+                                                  , layout.modelFile))
+    _layout = layout
+# }}}
+
+
+# currentLayout() -> LandmarkLayout {{{
+def currentLayout() -> LandmarkLayout:
+    """Return layout of landmarks 'facemark' returns"""
+    return _layout
+# }}}
+
+
+# TrackingSetting {{{
+@dataclasses.dataclass(frozen=True)
+class TrackingSetting:
+    """Settings for 'FaceTracker'
+
+        redetectInterval: run '_detector' at least once in this frames.
+                          1 (or smaller) means 'detect every frame',
+                          which is the same as plain 'facemark'
+        minConfidence: tracking is treated as lost when
+                       'dlib.correlation_tracker.update' returns
+                       smaller value than this
+    """
+    redetectInterval: int = 30
+    minConfidence: float = 7.0
+# }}}
+
+
+# DetectionSetting {{{
+@dataclasses.dataclass(frozen=True)
+class DetectionSetting:
+    """Settings for detection pipeline of 'FaceTracker'
+
+        scale: '_detector' runs on grayscale copy resized by this.
+               Found rectangles are mapped back to full resolution
+        roiPadding: once face is found, only the region around it
+                    padded by 'roiPadding * face size' is searched
+        upsample: '_detector' upsamples image this times before
+                  detection. Larger finds smaller faces, but is slower
+    """
+    scale: float = 0.5
+    roiPadding: float = 0.5
+    upsample: int = 1
+# }}}
+
+
+# Face selection policies {{{
+class FaceSelector:
+    """Base class of policies that pick the target face
+        from '_detector' result.
+
+        This is done before '_predictor' runs, so that the most
+        expensive step runs only once per frame however many
+        faces are in it.
+    """
+    def select(self, rects: dlib.rectangles
+              , previous: Optional[dlib.rectangle]
+               ) -> Optional[dlib.rectangle]:
+        """Return target face in 'rects', or None if there isn't.
+            'previous' is the target face of the last frame, if known.
+        """
+        raise NotImplementedError
+
+
+class BiggestFace(FaceSelector):
+    """Select the widest face"""
+    def select(self, rects, previous=None):
+        if len(rects) == 0:
+            return None
+        return max(rects, key=lambda r: r.width())
+
+
+class ClosestFace(FaceSelector):
+    """Select the face closest to previous one.
+        The widest face is selected if previous face isn't known.
+    """
+    def select(self, rects, previous=None):
+        if previous is None:
+            return BiggestFace().select(rects)
+        return min(rects, key=lambda r: _distance(r, previous)
+                  , default=None)
+
+
+class LockedFace(FaceSelector):
+    """Lock onto the first selected face, and never switch to others.
+
+        Once locked, only faces whose center is within
+        'maxDistance * <width of locked face>' from the last known
+        position are selected. Lock is kept even while the face is lost,
+        so it won't jump to another person. Call 'unlock' to release it.
+    """
+    maxDistance: float
+
+    def __init__(self, maxDistance: float = 0.5) -> None:
+        self.maxDistance = maxDistance
+        self._locked: Optional[dlib.rectangle] = None
+
+    def unlock(self) -> None:
+        self._locked = None
+
+    def select(self, rects, previous=None):
+        anchor = previous if previous is not None else self._locked
+        if anchor is None:
+            selected = BiggestFace().select(rects)
+        else:
+            limit = self.maxDistance * anchor.width()
+            selected = min((r for r in rects
+                            if _distance(r, anchor) <= limit)
+                          , key=lambda r: _distance(r, anchor)
+                          , default=None)
+        if selected is not None:
+            self._locked = selected
+        return selected
+
+
+FACE_SELECTORS: Dict[str, Type[FaceSelector]] = {"biggest": BiggestFace
+                                                , "closest": ClosestFace
+                                                , "locked": LockedFace}
+# }}}
+
+
+# FaceTracker {{{
+class FaceTracker:
+    """Detect face once, and track it thereafter.
+
+        '_detector' is only called on the first frame, after tracking
+        is lost, or every 'redetectInterval' frames.
+        On other frames, '_predictor' is seeded with the rectangle
+        'dlib.correlation_tracker' reports.
+
+        Detection itself is done by '_detectFaces' with 'detection'
+        setting, while '_predictor' always runs on full resolution frame.
+        Which face to track is decided by 'selector'.
+    """
+    setting: TrackingSetting
+    detection: DetectionSetting
+    selector: FaceSelector
+    detectCount: int
+    trackCount: int
+
+    def __init__(self, setting: TrackingSetting = TrackingSetting()
+                , detection: DetectionSetting = DetectionSetting()
+                , selector: Optional[FaceSelector] = None) -> None:
+        self.setting = setting
+        self.detection = detection
+        self.selector = selector or BiggestFace()
+        self.detectCount = 0
+        self.trackCount = 0
+        self._tracker: Optional[dlib.correlation_tracker] = None
+        self._sinceDetect = 0
+        self._lastRect: Optional[dlib.rectangle] = None
+
+    def reset(self) -> None:
+        """Forget tracking face. Next frame will be detected"""
+        self._tracker = None
+        self._lastRect = None
+
+    def facemark(self, img: Cv2Image) -> Optional[dlib.dpoints]:
+        """The same as 'facemark', but use tracking result if possible
+        """
+        landmark = self.facemarkArray(img)
+        return None if landmark is None else _array2dpoints(landmark)
+
+    def facemarkArray(self, img: Cv2Image) -> Optional[LandmarkArray]:
+        """The same as 'facemarkArray', but use tracking result if possible
+        """
+        rect = self._track(img)
+        if rect is None:
+            rect = self._detect(img)
+        if rect is None:
+            return None
+        self._lastRect = rect
+        return _landmarkArray(img, rect)
+
+    def _detect(self, img: Cv2Image) -> Optional[dlib.rectangle]:
+        """ Run '_detector' and start tracking selected face
+
+            Region around last known face is searched first, and
+            whole frame is searched only if nothing is found there.
+        """
+        self.detectCount += 1
+        self._sinceDetect = 0
+        rect: Optional[dlib.rectangle] = None
+        if self._lastRect is not None:
+            rect = self.selector.select(_detectFaces(img, self.detection
+                                                    , self._lastRect)
+                                       , self._lastRect)
+        if rect is None:
+            rect = self.selector.select(_detectFaces(img, self.detection)
+                                       , self._lastRect)
+        if rect is None:
+            self._tracker = None
+            self._lastRect = None
+            return None
+
+        if self.setting.redetectInterval > 1:
+            self._tracker = dlib.correlation_tracker()
+            self._tracker.start_track(img, rect)
+        return rect
+
+    def _track(self, img: Cv2Image) -> Optional[dlib.rectangle]:
+        """ Return tracked rectangle, or None if we should detect """
+        if self._tracker is None:
+            return None
+
+        self._sinceDetect += 1
+        if self._sinceDetect >= self.setting.redetectInterval:
+            return None
+
+        confidence = self._tracker.update(img)
+        if confidence < self.setting.minConfidence:
+            self._tracker = None
+            return None
+
+        self.trackCount += 1
+        return _toRectangle(self._tracker.get_position())
+# }}}
+
+
+# faceCalibration(cap, detection) -> RawFaceData {{{
+def faceCalibration(cap: cv2.VideoCapture
+                   , detection: Optional[DetectionSetting] = None
+                    ) -> Tuple[RawFaceData, float]:
     """Calibrate individuals' differences.
 
     What this function does are:
         1. Get distance between eyes
+
+    Faces are detected with 'detection' (See 'facemarkArray').
+    See 'calibration.collectCalibration' for the one which doesn't
+    ask user.
     """
     print("=========== Face calibration ===========")
     input("Please face front and press enter:")
-    frame = _waitUntilFaceDetect(cap)
+    landmark = _waitUntilFacemark(cap, detection)
     print("got your face... wait for a second...")
-    face, ratio = Face.fromDPointsWithRatio(facemark(frame))
+    face, ratio = Face.fromDPointsWithRatio(landmark, _layout.landmarkNum)
     print("done :)")
     return (RawFaceData.get(face), ratio)
 # }}}
 
 
-# facemark(gray_img: Cv2Image) -> Optional[dlib.dpoints] {{{
-def facemark(gray_img: Cv2Image) -> Optional[dlib.dpoints]:
+# autoCalibration(landmarks, layout) -> Tuple[RawFaceData, float] {{{
+def autoCalibration(landmarks: Sequence[LandmarkArray]
+                   , layout: Optional[LandmarkLayout] = None
+                    ) -> Tuple[RawFaceData, float]:
+    """Calibrate from landmarks of some frames without asking user.
+
+        Each value is the mean of all frames.
+        This is used where nobody can face front and press enter,
+        e.g. processing recorded video.
+        'layout' is layout of 'landmarks'. 'currentLayout()' by default.
+
+        Raise Exception:
+            ValueError: 'landmarks' is empty
+    """
+    if len(landmarks) == 0:
+        raise ValueError("at least one landmark is needed to calibrate")
+
+    landmarkNum = (layout or _layout).landmarkNum
+    faces, ratios = zip(*[Face.fromDPointsWithRatio(lm, landmarkNum)
+                          for lm in landmarks])
+    raws = [RawFaceData.get(f) for f in faces]
+
+    def _mean(name: str) -> float:
+        return float(numpy.mean([getattr(r, name) for r in raws]))
+
+    center = AbsoluteCoord(float(numpy.mean([r.faceCenter.x for r in raws]))
+                          , float(numpy.mean([r.faceCenter.y for r in raws])))
+    return (RawFaceData(_mean("eyeDistance"), _mean("faceHeigh"), center
+                       , _mean("mouthHeight"), _mean("mouthWidth")
+                       , _mean("leftEyeHeight"), _mean("rightEyeHeight"))
+           , float(numpy.mean(ratios)))
+# }}}
+
+
+# facemark(gray_img, selector, detection) -> Optional[dlib.dpoints] {{{
+def facemark(gray_img: Cv2Image, selector: Optional[FaceSelector] = None
+            , detection: Optional[DetectionSetting] = None
+             ) -> Optional[dlib.dpoints]:
     """Recoginize face landmark position by i-bug 300-w dataset
-        This will return biggest face from recognized faces list
+        This will return the face 'selector' selects from recognized faces
+        ('BiggestFace' by default)
 
         If no faces are found, it'll return None
 
-    Return:
+    Return (for 'helen' layout. See 'currentLayout()'):
         randmarks = [
         [x, y],
         [x, y],
@@ -56,168 +333,144 @@ def facemark(gray_img: Cv2Image) -> Optional[dlib.dpoints]:
         [154-173]: right eyebrows
         [174-193]: left eyebrows
     """
-    rects: dlib.rectangles = _detector(gray_img, 1)
-    wholeFace: List[dlib.dpoints] = []
-    for rect in rects:
-        parts: dlib.dpoints =\
-            _points2dpoints(_predictor(gray_img, rect).parts())
-        wholeFace.append(parts)
-
-    if len(wholeFace) == 0:
-        return None
-
-    absolute_coord = _sortDpoints(_getBiggestFace(wholeFace))
-    center = absolute_coord[49]
-    return _toRelative(absolute_coord, center)
+    landmark = facemarkArray(gray_img, selector, detection)
+    return None if landmark is None else _array2dpoints(landmark)
 # }}}
 
 
-# _waitUntilFaceDetect(cap: cv2.VideoCapture) -> Cv2Image {{{
-def _waitUntilFaceDetect(cap: cv2.VideoCapture) -> Cv2Image:
-    """Wait until face(s) is detected. Return frame if it contains faces.
+# facemarkArray(gray_img, selector, detection) -> Optional[LandmarkArray] {{{
+def facemarkArray(gray_img: Cv2Image
+                 , selector: Optional[FaceSelector] = None
+                 , detection: Optional[DetectionSetting] = None
+                  ) -> Optional[LandmarkArray]:
+    """The same as 'facemark', but return (N, 2) float64 numpy array
+        instead of dlib.dpoints. Row 'i' is '[x, y]' of landmark 'i'.
+        N is 'currentLayout().pointNum' (194 for 'helen' layout)
 
-        Raise Exception:
-            CapHasClosedError : this exception might be raised
-                                when 'cap' has been closed by some reason
+        Faces are detected by '_detectFaces' with 'detection',
+        as 'FaceTracker' does. If it's None, whole 'gray_img' is
+        searched with upsampling once.
     """
-    while cap.isOpened():
-        _, frame = cap.read()
-        if _isFaceExist(frame):
-            return frame
+    rects: dlib.rectangles = _detector(gray_img, 1) if detection is None\
+                             else _detectFaces(gray_img, detection)
+    rect = (selector or BiggestFace()).select(rects, None)
+    if rect is None:
+        return None
 
-    raise CapHasClosedError(ExitCode.FILE_FACEDETECTION)
+    return _landmarkArray(gray_img, rect)
 # }}}
 
 
-# _isFaceExist(gray_img: Cv2Image) -> bool {{{
-def _isFaceExist(gray_img: Cv2Image) -> bool:
-    """True if faces are exist in image """
-    faces: dlib.rectangles = _detector(gray_img, 1)
-    return len(faces) != 0
+# _detectFaces(img, setting, around) -> dlib.rectangles {{{
+def _detectFaces(img: Cv2Image, setting: DetectionSetting
+                , around: Optional[dlib.rectangle] = None
+                 ) -> dlib.rectangles:
+    """Run '_detector' on downscaled grayscale copy of 'img'
 
+        If 'around' is given, only the region around it
+        (padded by 'setting.roiPadding') is searched.
+        Returned rectangles are mapped back to 'img' coordinates.
+    """
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    offsetX, offsetY = 0, 0
+    if around is not None:
+        h, w = gray.shape
+        padX = round(around.width() * setting.roiPadding)
+        padY = round(around.height() * setting.roiPadding)
+        offsetX = max(0, around.left() - padX)
+        offsetY = max(0, around.top() - padY)
+        gray = gray[offsetY:min(h, around.bottom() + padY + 1)
+                   , offsetX:min(w, around.right() + padX + 1)]
+        if gray.size == 0:
+            return dlib.rectangles()
+
+    small = gray if setting.scale == 1.0\
+                 else cv2.resize(gray, None, fx=setting.scale
+                                , fy=setting.scale
+                                , interpolation=cv2.INTER_AREA)
+    if small.size == 0:
+        return dlib.rectangles()
+    # use actual ratio, as resized size is rounded
+    ratioX = gray.shape[1] / small.shape[1]
+    ratioY = gray.shape[0] / small.shape[0]
+
+    return dlib.rectangles([dlib.rectangle(round(r.left() * ratioX) + offsetX
+                                          , round(r.top() * ratioY) + offsetY
+                                          , round(r.right() * ratioX) + offsetX
+                                          , round(r.bottom() * ratioY)
+                                            + offsetY)
+                            for r in _detector(small, setting.upsample)])
 # }}}
 
 
-# _getBiggestFace(faces: List[dlib.dpoints]) -> dlib.dpoints: {{{
-def _getBiggestFace(faces: List[dlib.dpoints]) -> dlib.dpoints:
-    """ Return biggest face in given list
-       'biggest face' is one that has biggest width
-
+# _landmarkArray(img: Cv2Image, rect: dlib.rectangle) -> LandmarkArray {{{
+def _landmarkArray(img: Cv2Image, rect: dlib.rectangle) -> LandmarkArray:
+    """Run '_predictor' for one face and return 'facemarkArray' style
+        result
     """
-    def ln(p: dlib.dpoints) -> float:
-        return abs((p[40] - p[0]).x)
-
-    return reduce(lambda p, q: p if ln(p) > ln(q) else q,
-                  faces, dlib.dpoints(194))
+    parts = _predictor(img, rect).parts()
+    # filled in place, without building list of points
+    face = numpy.fromiter((v for p in parts for v in (p.x, p.y))
+                         , dtype=numpy.float64, count=2 * len(parts))
+    return _normalizeArray(face.reshape(-1, 2))
 # }}}
 
 
-# _sortDpoints(face: dlib.dpoints) -> dlib.dpoints {{{
-def _sortDpoints(face: dlib.dpoints) -> dlib.dpoints:
-    """Sort facemark result. FOR INTERNAL USE
-        Please refer to [this image]() [WIP]
-
-        This code was written by @kekeho(Qiita), refer to:
-            https://qiita.com/kekeho/items/0b2d4ed5192a4c90a0ac
-
+# _normalizeArray(face: LandmarkArray) -> LandmarkArray {{{
+def _normalizeArray(face: LandmarkArray) -> LandmarkArray:
+    """Sort '_predictor' result and make it relative to nose bottom.
+        Only the nose bottom (row 49 in helen layout) holds
+        absolute coordinate
     """
-    # nose
-    nose = list(range(130, 147 + 1))
-    nose.remove(139)
-
-    # right eyebrows
-    right_eyebrow = list(range(62, 83 + 1))
-    right_eyebrow.remove(68)
-    right_eyebrow.remove(79)
-
-    # left eyebrows
-    left_eyebrow = list(range(84, 105 + 1))
-    left_eyebrow.remove(90)
-    left_eyebrow.remove(101)
-
-    # right eye
-    right_eye = list(range(18, 39 + 1))
-    right_eye.remove(24)
-    right_eye.remove(35)
-
-    # left_eye
-    left_eye = list(range(40, 61 + 1))
-    left_eye.remove(46)
-    left_eye.remove(57)
-
-    # outside lips
-    outside_lips = list(range(148, 178 + 1))
-    outside_lips.remove(150)
-    outside_lips.remove(161)
-    outside_lips.remove(172)
-
-    # inside lips
-    inside_lips = list(range(3, 17 + 1))
-    inside_lips.remove(13)
-    add_list_lips = list(range(179, 193 + 1))
-    add_list_lips.remove(183)
-    inside_lips += add_list_lips
-
-    # chin
-    chin = [0, 1, 106, 117, 128, 139, 150, 161, 172,
-            183, 2, 13, 24, 35, 46, 57, 68, 79, 90, 101]
-    add_list = list(range(107, 129 + 1))
-    add_list.remove(117)
-    add_list.remove(128)
-    chin += add_list
-
-    for nose_i, fm_i in enumerate(nose):
-        nose[nose_i] = face[fm_i]
-
-    for reb_i, fm_i in enumerate(right_eyebrow):
-        right_eyebrow[reb_i] = face[fm_i]
-
-    for leb_i, fm_i in enumerate(left_eyebrow):
-        left_eyebrow[leb_i] = face[fm_i]
+    absolute_coord = _layout.sort(face)
+    center = absolute_coord[_layout.centerIndex].copy()
+    absolute_coord -= center
+    absolute_coord[_layout.centerIndex] = center
+    return absolute_coord
+# }}}
 
-    for re_i, fm_i in enumerate(right_eye):
-        right_eye[re_i] = face[fm_i]
 
-    for le_i, fm_i in enumerate(left_eye):
-        left_eye[le_i] = face[fm_i]
+# _array2dpoints(landmark: LandmarkArray) -> dlib.dpoints {{{
+def _array2dpoints(landmark: LandmarkArray) -> dlib.dpoints:
+    """convert 'facemarkArray' result to 'facemark' one"""
+    return dlib.dpoints([dlib.dpoint(x, y) for x, y in landmark.tolist()])
+# }}}
 
-    for ol_i, fm_i in enumerate(outside_lips):
-        outside_lips[ol_i] = face[fm_i]
 
-    for il_i, fm_i in enumerate(inside_lips):
-        inside_lips[il_i] = face[fm_i]
+# _waitUntilFacemark(cap, detection) -> LandmarkArray {{{
+def _waitUntilFacemark(cap: cv2.VideoCapture
+                      , detection: Optional[DetectionSetting] = None
+                       ) -> LandmarkArray:
+    """Wait until face is found in a frame of 'cap', and return
+        its landmarks, so that the frame isn't detected twice.
+        Faces are detected with 'detection' (See 'facemarkArray').
 
-    for chin_i, fm_i in enumerate(chin):
-        chin[chin_i] = face[fm_i]
+        Raise Exception:
+            CapHasClosedError : this exception might be raised
+                                when 'cap' has been closed by some reason
+    """
+    while cap.isOpened():
+        _, frame = cap.read()
+        landmark = facemarkArray(frame, detection=detection)
+        if landmark is not None:
+            return landmark
 
-    return dlib.dpoints(chin + nose + outside_lips + inside_lips
-                        + right_eye + left_eye
-                        + right_eyebrow + left_eyebrow)
+    raise CapHasClosedError(ExitCode.FILE_FACEDETECTION)
 # }}}
 
 
-# _points2dpoints(ps: dlib.points) -> dlib.dpoints: {{{
-def _points2dpoints(ps: dlib.points) -> dlib.dpoints:
-    """convert dlib.points object to dlib.dpoints object.
-        All points() are should be converted to dpoints,
-        as we use float values
-    """
-    ret = dlib.dpoints()
-    for p in ps:
-        ret.append(dlib.dpoint(float(p.x), float(p.y)))
-
-    return ret
+# _distance(a: dlib.rectangle, b: dlib.rectangle) -> float: {{{
+def _distance(a: dlib.rectangle, b: dlib.rectangle) -> float:
+    """ Distance between centers of two rectangles """
+    return float(dlib.length(a.dcenter() - b.dcenter()))
 # }}}
 
 
-# _toRelative(target: dlib.dpoints, center: dlib.dpoint) -> dlib.dpoints: {{{
-def _toRelative(target: dlib.dpoints, center: dlib.dpoint) -> dlib.dpoints:
-    """ convert target into relative coordinates
-        Only Center will be left as is.
+# _toRectangle(rect: dlib.drectangle) -> dlib.rectangle: {{{
+def _toRectangle(rect: dlib.drectangle) -> dlib.rectangle:
+    """ convert dlib.drectangle to dlib.rectangle,
+        as '_predictor' only accepts the latter
     """
-    # convert all points to relative
-    converted = list(map(lambda p: p - center, target))
-    # center position holds absolute coordinate
-    converted[49] = center
-    return dlib.dpoints(converted)
+    return dlib.rectangle(round(rect.left()), round(rect.top())
+                         , round(rect.right()), round(rect.bottom()))
 # }}}
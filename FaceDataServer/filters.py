@@ -0,0 +1,233 @@
+# module filters
+# (LandmarkFilter, NoFilter, OneEuroFilter, KalmanFilter, FILTERS
+#  , makeFilter) where
+import math
+import numpy
+from typing import Dict, Optional, Tuple, Type
+from .Types import LandmarkArray
+
+
+# LandmarkFilter {{{
+class LandmarkFilter:
+    """Base class of temporal filters which smooth landmarks
+        between 'facemarkArray' and 'Face.fromDPointsWithRatio'.
+
+        All landmarks are filtered at once with numpy, and each
+        landmark is filtered independently.
+        'timestamp' is seconds of monotonic clock when the frame
+        is captured.
+        'predict' is the motion model used to extrapolate between
+        frames (See 'scheduler.Extrapolator'), and may be called on
+        other thread than 'filter'. So state read by it is replaced
+        at once, never modified in place.
+    """
+    def filter(self, landmark: LandmarkArray, timestamp: float
+               ) -> LandmarkArray:
+        """Return smoothed 'landmark'. 'landmark' isn't modified"""
+        raise NotImplementedError
+
+    def predict(self, timestamp: float) -> Optional[LandmarkArray]:
+        """Return landmarks estimated at 'timestamp' without new
+            measurement. None if nothing has been filtered yet.
+        """
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Forget the past, e.g. when face is lost"""
+        raise NotImplementedError
+
+
+class NoFilter(LandmarkFilter):
+    """Pass landmarks as they are.
+        'predict' extrapolates the last two of them linearly
+    """
+    def __init__(self) -> None:
+        self.reset()
+
+    def filter(self, landmark, timestamp):
+        velocity = None
+        if self._state is not None:
+            last, velocity, t = self._state
+            if timestamp > t:
+                velocity = (landmark - last) / (timestamp - t)
+        self._state = (landmark, velocity, timestamp)
+        return landmark
+
+    def predict(self, timestamp):
+        state = self._state
+        if state is None:
+            return None
+        last, velocity, t = state
+        if velocity is None:
+            return last.copy()
+        return last + velocity * max(0.0, timestamp - t)
+
+    def reset(self):
+        # (landmark, velocity, timestamp)
+        self._state: Optional[Tuple[LandmarkArray, Optional[LandmarkArray]
+                                   , float]] = None
+# }}}
+
+
+# OneEuroFilter {{{
+class OneEuroFilter(LandmarkFilter):
+    """One Euro filter (Casiez et al. 2012)
+
+        Low-pass filter whose cutoff frequency rises with speed,
+        so that slow motion (jitter) is smoothed much while fast
+        motion has little lag.
+
+        minCutoff: cutoff frequency (Hz) when landmark stays still.
+                   Smaller is smoother
+        beta: increase of cutoff frequency per speed (pixel/s).
+              Larger has less lag
+        dCutoff: cutoff frequency (Hz) of speed itself
+    """
+    minCutoff: float
+    beta: float
+    dCutoff: float
+
+    def __init__(self, minCutoff: float = 1.0, beta: float = 0.05
+                , dCutoff: float = 1.0) -> None:
+        self.minCutoff = minCutoff
+        self.beta = beta
+        self.dCutoff = dCutoff
+        self.reset()
+
+    def reset(self):
+        # (landmark, speed, timestamp)
+        self._state: Optional[Tuple[LandmarkArray, LandmarkArray, float]]\
+            = None
+
+    @staticmethod
+    def _alpha(cutoff, dt: float):
+        """FOR INTERNAL USE"""
+        return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+    def filter(self, landmark, timestamp):
+        if self._state is None:
+            x = numpy.array(landmark, dtype=numpy.float64)
+            self._state = (x, numpy.zeros_like(x), timestamp)
+            return x.copy()
+        x, dx, t = self._state
+        dt = timestamp - t
+        if dt <= 0:
+            return x.copy()
+
+        dx = dx + self._alpha(self.dCutoff, dt) * ((landmark - x) / dt - dx)
+        # speed of each point, shared by x and y
+        speed = numpy.hypot(dx[:, 0], dx[:, 1])[:, None]
+        x = x + self._alpha(self.minCutoff + self.beta * speed, dt)\
+            * (landmark - x)
+        self._state = (x, dx, timestamp)
+        return x.copy()
+
+    def predict(self, timestamp):
+        state = self._state
+        if state is None:
+            return None
+        x, dx, t = state
+        return x + dx * max(0.0, timestamp - t)
+# }}}
+
+
+# KalmanFilter {{{
+class KalmanFilter(LandmarkFilter):
+    """Kalman filter with constant velocity model
+
+        Each coordinate has state (position, velocity), and the
+        velocity changes by white noise acceleration.
+        Covariance doesn't depend on measurements, so it's shared
+        by all coordinates and updated as scalars.
+
+        processNoise: variance of acceleration (pixel^2/s^4).
+                      Larger follows motion faster
+        measurementNoise: variance of landmark error (pixel^2).
+                          Larger is smoother
+    """
+    processNoise: float
+    measurementNoise: float
+
+    def __init__(self, processNoise: float = 1e5
+                , measurementNoise: float = 4.0) -> None:
+        self.processNoise = processNoise
+        self.measurementNoise = measurementNoise
+        self.reset()
+
+    def reset(self):
+        # (position, velocity, timestamp)
+        self._state: Optional[Tuple[LandmarkArray, LandmarkArray, float]]\
+            = None
+        # covariance [[p00, p01], [p01, p11]]
+        self._p00 = self.measurementNoise
+        self._p01 = 0.0
+        self._p11 = 0.0
+
+    def filter(self, landmark, timestamp):
+        if self._state is None:
+            x = numpy.array(landmark, dtype=numpy.float64)
+            self._state = (x, numpy.zeros_like(x), timestamp)
+            # velocity is unknown
+            self._p11 = self.processNoise
+            return x.copy()
+        x, v, t = self._state
+        dt = max(0.0, timestamp - t)
+
+        # predict
+        q = self.processNoise
+        x = x + v * dt
+        p00 = self._p00 + 2 * dt * self._p01 + dt * dt * self._p11\
+              + q * dt ** 4 / 4
+        p01 = self._p01 + dt * self._p11 + q * dt ** 3 / 2
+        p11 = self._p11 + q * dt * dt
+
+        # update
+        s = p00 + self.measurementNoise
+        k0, k1 = p00 / s, p01 / s
+        residual = landmark - x
+        x += k0 * residual
+        v = v + k1 * residual
+        self._p00 = (1 - k0) * p00
+        self._p01 = (1 - k0) * p01
+        self._p11 = p11 - k1 * p01
+        self._state = (x, v, timestamp)
+        return x.copy()
+
+    def predict(self, timestamp):
+        state = self._state
+        if state is None:
+            return None
+        x, v, t = state
+        return x + v * max(0.0, timestamp - t)
+# }}}
+
+
+FILTERS: Dict[str, Type[LandmarkFilter]] = {"none": NoFilter
+                                           , "oneeuro": OneEuroFilter
+                                           , "kalman": KalmanFilter}
+
+
+# makeFilter(spec: str) -> LandmarkFilter {{{
+def makeFilter(spec: str) -> LandmarkFilter:
+    """Make filter from 'name[:param=value,...]'
+
+        e.g. "oneeuro:minCutoff=0.5,beta=0.1"
+        Raise ValueError if name or parameters are unknown.
+    """
+    name, _, params = spec.partition(":")
+    if name not in FILTERS:
+        raise ValueError(f"unknown filter '{name}'."
+                         f" One of {', '.join(FILTERS)}")
+    kwargs: Dict[str, float] = {}
+    for item in params.split(","):
+        if item.strip() == "":
+            continue
+        key, sep, value = item.partition("=")
+        if sep == "":
+            raise ValueError(f"filter parameter '{item}' isn't 'key=value'")
+        kwargs[key.strip()] = float(value)
+    try:
+        return FILTERS[name](**kwargs)
+    except TypeError as e:
+        raise ValueError(f"bad parameters for filter '{name}': {e}")
+# }}}
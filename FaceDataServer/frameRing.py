@@ -0,0 +1,176 @@
+# module frameRing
+# (FrameRing, RingReader) where
+import numpy
+from multiprocessing import shared_memory
+from typing import Callable, Optional, Tuple
+from .Types import Cv2Image
+
+# Sequence number of a slot which is being written
+_WRITING = -1
+
+
+# FrameRing {{{
+class FrameRing:
+    """Ring buffer of fixed size frame slots on shared memory
+
+        Frame 'seq' is written to slot 'seq % slots', and each slot
+        remembers sequence number of the frame in it.
+        Readers get numpy views of slots, so frames are never copied
+        after they are written. As the writer never waits for readers,
+        a slot can be overwritten while it's read. Readers should
+        check 'isValid(seq)' after using a view, and discard
+        what they made from it if it's no longer valid.
+
+        Only one writer (process or thread) is allowed.
+        FrameRing can be passed to other processes. It attaches
+        to the same shared memory there.
+    """
+    slots: int
+    frameShape: Tuple[int, ...]
+
+    def __init__(self, slots: int, frameShape: Tuple[int, ...]
+                , name: Optional[str] = None) -> None:
+        """Create new ring, or attach to existing one if 'name' is given"""
+        self.slots = slots
+        self.frameShape = tuple(frameShape)
+        frameSize = int(numpy.prod(self.frameShape))
+        # header: [head, seq of slot 0, seq of slot 1, ...]
+        headerSize = (slots + 1) * 8
+        self._owner = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner
+                                              , size=headerSize
+                                                + slots * frameSize)
+        self._header = numpy.ndarray((slots + 1,), numpy.int64
+                                    , buffer=self._shm.buf)
+        self._frames = numpy.ndarray((slots,) + self.frameShape, numpy.uint8
+                                    , buffer=self._shm.buf
+                                    , offset=headerSize)
+        if self._owner:
+            self._header[0] = 0
+            self._header[1:] = _WRITING
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __getstate__(self) -> tuple:
+        return (self.slots, self.frameShape, self.name)
+
+    def __setstate__(self, state: tuple) -> None:
+        self.__init__(*state)
+
+    # writer {{{
+    def claim(self) -> Tuple[int, Cv2Image]:
+        """Return next sequence number and view of its slot.
+
+            The frame becomes readable after 'commit'.
+        """
+        seq = int(self._header[0])
+        slot = seq % self.slots
+        self._header[1 + slot] = _WRITING
+        return (seq, self._frames[slot])
+
+    def commit(self, seq: int) -> None:
+        self._header[1 + seq % self.slots] = seq
+        self._header[0] = seq + 1
+
+    def write(self, frame: Cv2Image) -> int:
+        """Copy 'frame' into next slot and return its sequence number"""
+        if frame.shape != self.frameShape:
+            raise ValueError(f"frame shape {frame.shape} doesn't match"
+                             f" {self.frameShape}")
+        seq, view = self.claim()
+        view[...] = frame
+        self.commit(seq)
+        return seq
+
+    def writeFrom(self, read: Callable[[Cv2Image], tuple]) -> Optional[int]:
+        """Let 'read' write a frame into next slot directly.
+
+            'read' is something like 'cv2.VideoCapture.read', which
+            takes output array and returns '(ok, frame)'.
+            Return sequence number, or None if 'ok' is False.
+        """
+        seq, view = self.claim()
+        ok, frame = read(view)
+        if not ok:
+            return None
+        if not numpy.shares_memory(frame, view):
+            # 'read' didn't use given array
+            view[...] = frame
+        self.commit(seq)
+        return seq
+    # }}}
+
+    # reader {{{
+    def latest(self) -> int:
+        """Return sequence number of the newest frame. -1 if none"""
+        return int(self._header[0]) - 1
+
+    def isValid(self, seq: int) -> bool:
+        """Return True if frame 'seq' is still in the ring"""
+        return seq >= 0 and int(self._header[1 + seq % self.slots]) == seq
+
+    def view(self, seq: int) -> Optional[Cv2Image]:
+        """Return view of frame 'seq', or None if it's overwritten"""
+        return self._frames[seq % self.slots] if self.isValid(seq) else None
+
+    def copy(self, seq: int) -> Optional[Cv2Image]:
+        """Return copy of frame 'seq', or None if it's overwritten"""
+        frame = self.view(seq)
+        if frame is None:
+            return None
+        frame = frame.copy()
+        return frame if self.isValid(seq) else None
+
+    def reader(self) -> "RingReader":
+        return RingReader(self)
+    # }}}
+
+    def close(self) -> None:
+        """Detach from shared memory. It's released if this is the owner"""
+        del self._header
+        del self._frames
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+# }}}
+
+
+# RingReader {{{
+class RingReader:
+    """Cursor to read frames in 'FrameRing' in order
+
+        Each reader has its own cursor, so that any number of
+        consumers can read the same ring.
+        Frames overwritten before being read are skipped, and
+        counted in 'skipped'.
+    """
+    cursor: int
+    skipped: int
+
+    def __init__(self, ring: FrameRing) -> None:
+        self.ring = ring
+        self.cursor = ring.latest() + 1
+        self.skipped = 0
+
+    def next(self, latest: bool = False) -> Optional[Tuple[int, Cv2Image]]:
+        """Return '(seq, view)' of the next frame. None if there's no new one
+
+            If 'latest' is True, frames between cursor and the newest
+            one are skipped.
+        """
+        newest = self.ring.latest()
+        if self.cursor > newest:
+            return None
+        first = newest if latest else max(self.cursor
+                                         , newest - self.ring.slots + 1)
+        self.skipped += first - self.cursor
+        for seq in range(first, newest + 1):
+            self.cursor = seq + 1
+            frame = self.ring.view(seq)
+            if frame is not None:
+                return (seq, frame)
+            self.skipped += 1
+        return None
+# }}}
@@ -0,0 +1,172 @@
+# module governor
+# (GovernorSetting, Level, qualityLevels, Governor) where
+import dataclasses
+import numpy
+import time
+from typing import Callable, List, Optional
+from .faceDetection import FaceTracker, DetectionSetting, TrackingSetting
+from .presence import Presence, State
+
+
+# GovernorSetting {{{
+@dataclasses.dataclass(frozen=True)
+class GovernorSetting:
+    """Setting for 'Governor'
+
+        latencyBudget: p95 of seconds from capture to FaceData
+                       should be no more than this
+        cpuBudget: CPU seconds used per second (1.0 is one core)
+                   should be no more than this
+        minFps: FPS isn't lowered below this to meet budgets
+        maxFps: frames are captured at most this FPS
+        interval: budgets are checked every this seconds
+        headroom: quality and FPS are raised only if usage is below
+                  'budget * headroom', so that they don't flip
+    """
+    latencyBudget: float = 0.1
+    cpuBudget: float = 1.0
+    minFps: float = 5.0
+    maxFps: float = 30.0
+    interval: float = 2.0
+    headroom: float = 0.7
+# }}}
+
+
+# Level {{{
+@dataclasses.dataclass(frozen=True)
+class Level:
+    """Settings of FaceTracker at one quality level"""
+    detection: DetectionSetting
+    tracking: TrackingSetting
+# }}}
+
+
+# qualityLevels(detection, tracking) -> List[Level] {{{
+def qualityLevels(detection: DetectionSetting, tracking: TrackingSetting
+                  ) -> List[Level]:
+    """Return quality levels from the given (the best) one to cheapest
+
+        Each level is cheaper than the previous one by:
+        less upsample, smaller detection scale, longer redetect interval
+        (only if tracking is enabled), and even smaller scale.
+    """
+    replace = dataclasses.replace
+    steps = [lambda d, t: (replace(d, upsample=max(0, d.upsample - 1)), t)
+            , lambda d, t: (replace(d, scale=d.scale * 0.75), t)
+            , lambda d, t: (d, t if t.redetectInterval <= 1
+                               else replace(t, redetectInterval=t
+                                            .redetectInterval * 2))
+            , lambda d, t: (replace(d, scale=d.scale * 0.75), t)]
+    levels = [Level(detection, tracking)]
+    for step in steps:
+        level = Level(*step(levels[-1].detection, levels[-1].tracking))
+        if level != levels[-1]:
+            levels.append(level)
+    return levels
+# }}}
+
+
+# Governor {{{
+class Governor:
+    """Keep latency and CPU usage inside budgets
+
+        'frame' is called for each processed frame, and every
+        'setting.interval' seconds p95 latency and CPU usage of the
+        process are compared with budgets.
+        Over budget lowers quality level of 'tracker' first, then FPS.
+        Under 'budget * headroom' raises FPS first, then quality.
+        Frames should be captured at 'currentFps()' (See 'Pacer').
+
+        'tracker' is None if it runs on worker processes,
+        where only FPS is governed.
+        While 'presence' is idle, budgets aren't checked,
+        and 'currentFps' is limited to its scan FPS.
+
+        Usage:
+            g = Governor(GovernorSetting(), tracker)
+            pacer = Pacer(g.currentFps)
+            # capture stage
+            pacer.pace()
+            frame = cap.read()
+            # after processing
+            g.frame(time.monotonic() - captured)
+    """
+    setting: GovernorSetting
+    levels: List[Level]
+    level: int
+    fps: float
+    cpu: float
+    latency: float
+
+    def __init__(self, setting: GovernorSetting = GovernorSetting()
+                , tracker: Optional[FaceTracker] = None
+                , presence: Optional[Presence] = None
+                , cpuTime: Callable[[], float] = time.process_time) -> None:
+        self.setting = setting
+        self.tracker = tracker
+        self.levels = [] if tracker is None\
+                         else qualityLevels(tracker.detection
+                                           , tracker.setting)
+        self.level = 0
+        self.fps = setting.maxFps
+        self.presence = presence
+        self.cpu = 0.0
+        self.latency = 0.0
+        self._cpuTime = cpuTime
+        self._latencies: List[float] = []
+        self._lastCheck = (time.monotonic(), cpuTime())
+
+    @property
+    def idle(self) -> bool:
+        return self.presence is not None \
+            and self.presence.state is State.IDLE
+
+    def frame(self, latency: float, now: Optional[float] = None) -> None:
+        """Record one processed frame. Called on one thread only"""
+        now = time.monotonic() if now is None else now
+        self._latencies.append(latency)
+
+        checked, cpuTime = self._lastCheck
+        if now - checked < self.setting.interval:
+            return
+        cpu = self._cpuTime()
+        self.cpu = (cpu - cpuTime) / (now - checked)
+        self.latency = float(numpy.percentile(self._latencies, 95))
+        self._latencies.clear()
+        self._lastCheck = (now, cpu)
+        # idle scan costs differently
+        if not self.idle:
+            self._adjust()
+
+    def _adjust(self) -> None:
+        """Move one step toward budgets. FOR INTERNAL USE"""
+        s = self.setting
+        if self.latency > s.latencyBudget or self.cpu > s.cpuBudget:
+            if self.level < len(self.levels) - 1:
+                self._setLevel(self.level + 1)
+            else:
+                self.fps = max(s.minFps, self.fps * 0.8)
+        elif self.latency < s.latencyBudget * s.headroom\
+                and self.cpu < s.cpuBudget * s.headroom:
+            if self.fps < s.maxFps:
+                self.fps = min(s.maxFps, self.fps * 1.25)
+            elif self.level > 0:
+                self._setLevel(self.level - 1)
+
+    def _setLevel(self, level: int) -> None:
+        """FOR INTERNAL USE"""
+        self.level = level
+        # read by the tracker on each frame
+        self.tracker.detection = self.levels[level].detection
+        self.tracker.setting = self.levels[level].tracking
+
+    def currentFps(self) -> float:
+        """FPS frames should be captured at now"""
+        return self.fps if self.presence is None\
+                        else self.presence.limit(self.fps)
+
+    def report(self) -> str:
+        return f"level {self.level}, fps {self.currentFps():.1f}"\
+               f"{' (idle)' if self.idle else ''}, cpu {self.cpu:.2f}"\
+               f", latency p95 {self.latency * 1000:.1f}ms"
+# }}}
@@ -0,0 +1,203 @@
+# module inferencePool
+# (InferencePool) where
+import heapq
+import multiprocessing
+import queue
+import threading
+import time
+from logging import getLogger, Logger
+from typing import List, Optional, Tuple
+from .faceDetection import (DetectionSetting, FaceTracker, TrackingSetting
+                           , currentLayout, useLayout)
+from .frameRing import FrameRing
+from .landmarkLayout import LandmarkLayout
+from .Types import Cv2Image, LandmarkArray, WorkerDiedError
+
+logger: Logger = getLogger('inferencePool')
+
+# 'get' checks workers are alive at least every this seconds
+_POLL_INTERVAL = 0.5
+
+
+# InferencePool {{{
+class InferencePool:
+    """Run facemark on worker processes.
+
+        Frames are written into 'FrameRing' on shared memory instead
+        of being pickled, and workers read them without copying.
+        Each worker loads '_predictor' only once when it starts
+        ('layout' is passed to workers so that they use the same
+        model as the parent). Results are tagged with frame sequence
+        number, and 'get' returns them in the order frames were submitted.
+
+        When 'slots' frames are in process, 'submit' drops the frame
+        so that we never build backlog.
+        The ring has twice as many slots, but a frame can still be
+        overwritten while a slow worker is reading it. Such result is
+        discarded and counted in 'overwritten'.
+
+        If facemark raises on a frame, the worker logs it and the frame
+        is returned as one without face. If a worker process dies,
+        'get' raises 'WorkerDiedError' instead of waiting forever.
+    """
+    frameShape: Tuple[int, ...]
+    slots: int
+    dropped: int
+    overwritten: int
+    ring: FrameRing
+
+    def __init__(self, workers: int, frameShape: Tuple[int, ...]
+                , detection: DetectionSetting = DetectionSetting()
+                , slots: Optional[int] = None
+                , layout: Optional[LandmarkLayout] = None) -> None:
+        ctx = multiprocessing.get_context('spawn')
+        self.frameShape = tuple(frameShape)
+        self.slots = slots or workers * 2
+        self.dropped = 0
+        self.overwritten = 0
+        self.ring = FrameRing(self.slots * 2, self.frameShape)
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._inFlight = 0
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[int, Optional[LandmarkArray], bool]] = []
+        self._nextOut = 0
+        self._workers = [ctx.Process(target=_worker
+                                    , args=(self.ring, detection
+                                           , layout or currentLayout()
+                                           , self._tasks, self._results)
+                                    , daemon=True)
+                         for _ in range(workers)]
+        for w in self._workers:
+            w.start()
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self._inFlight >= self.slots:
+                self.dropped += 1
+                return False
+            self._inFlight += 1
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._inFlight -= 1
+
+    def submit(self, frame: Cv2Image) -> Optional[int]:
+        """Pass 'frame' to workers and return its sequence number.
+
+            None is returned if the frame is dropped.
+        """
+        if frame.shape != self.frameShape:
+            raise ValueError(f"frame shape {frame.shape} doesn't match"
+                             f" {self.frameShape}")
+        if not self._reserve():
+            return None
+        seq = self.ring.write(frame)
+        self._tasks.put(seq)
+        return seq
+
+    def captureFrom(self, cap) -> Optional[int]:
+        """Read a frame from 'cap' (e.g. cv2.VideoCapture) directly
+            into shared memory, and pass it to workers.
+
+            Return sequence number, or None if the frame is dropped
+            or 'cap' fails to read.
+        """
+        if not self._reserve():
+            # keep reading so that camera doesn't give us old frame later
+            cap.read()
+            return None
+        seq = self.ring.writeFrom(cap.read)
+        if seq is None:
+            self._release()
+            return None
+        self._tasks.put(seq)
+        return seq
+
+    def get(self, timeout: Optional[float] = None
+            ) -> Optional[Tuple[int, Optional[LandmarkArray]]]:
+        """Return '(seq, landmark)' of the next frame in order.
+
+            None is returned if it isn't ready before 'timeout'.
+
+            Raise Exception:
+                WorkerDiedError: a worker process has died
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            while len(self._pending) == 0\
+                    or self._pending[0][0] != self._nextOut:
+                remaining = _POLL_INTERVAL if deadline is None\
+                    else min(_POLL_INTERVAL
+                            , max(0, deadline - time.monotonic()))
+                try:
+                    result = self._results.get(timeout=remaining)
+                except queue.Empty:
+                    self._checkWorkers()
+                    if deadline is not None\
+                            and time.monotonic() >= deadline:
+                        return None
+                    continue
+                self._release()
+                heapq.heappush(self._pending, result)
+
+            seq, landmark, valid = heapq.heappop(self._pending)
+            self._nextOut += 1
+            if valid:
+                return (seq, landmark)
+            self.overwritten += 1
+
+    def _checkWorkers(self) -> None:
+        """FOR INTERNAL USE"""
+        for w in self._workers:
+            if not w.is_alive():
+                raise WorkerDiedError(w.exitcode)
+
+    def close(self) -> None:
+        """Stop all workers and release shared memory"""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for w in self._workers:
+            w.join(1)
+            if w.is_alive():
+                w.terminate()
+        self.ring.close()
+# }}}
+
+
+# _worker(ring, detection, layout, tasks, results) {{{
+def _worker(ring: FrameRing, detection: DetectionSetting
+           , layout: LandmarkLayout
+           , tasks: multiprocessing.Queue
+           , results: multiprocessing.Queue) -> None:
+    """Entry point of worker processes. FOR INTERNAL USE
+
+        '_predictor' has been loaded once when this module
+        is imported by the worker. It's reloaded only if
+        'layout' isn't the default one.
+    """
+    if layout != currentLayout():
+        useLayout(layout)
+    # Frames are distributed to workers in turn, so
+    # correlation tracking can't be used here.
+    tracker = FaceTracker(TrackingSetting(redetectInterval=1), detection)
+    try:
+        while True:
+            seq = tasks.get()
+            if seq is None:
+                break
+            frame = ring.view(seq)
+            try:
+                landmark = None if frame is None\
+                    else tracker.facemarkArray(frame)
+            except Exception:
+                # one bad frame shouldn't kill the worker,
+                # whose results 'get' waits for
+                logger.exception(f"facemark failed on frame {seq}")
+                landmark = None
+            # The frame might be overwritten while it's processed
+            results.put((seq, landmark, ring.isValid(seq)))
+    finally:
+        ring.close()
+# }}}
@@ -0,0 +1,180 @@
+# module landmarkLayout
+# (LandmarkLayout, HELEN, IBUG68, LAYOUTS, getLayout) where
+import dataclasses
+import json
+import os
+import numpy
+from typing import Dict, List, Tuple
+from .Types import LANDMARK_NUM, LandmarkArray
+
+
+# LandmarkLayout {{{
+@dataclasses.dataclass(frozen=True)
+class LandmarkLayout:
+    """How landmarks of a shape predictor model are laid out
+
+        name: name of this layout
+        modelFile: shape predictor model. Relative path is
+                   resolved from 'src' directory
+        order: 'order[i]' is index of model output which
+               should be placed at i-th of sorted landmark
+        landmarkNum: index of each named landmark in sorted landmark.
+                     Keys are the same as 'Types.LANDMARK_NUM'
+
+        'NOSE_BOTTOM' is used as center of the face.
+        Layouts other than built-in ones can be loaded from JSON file
+        with 'fromFile', so other models can be used without code changes.
+    """
+    name: str
+    modelFile: str
+    order: Tuple[int, ...]
+    landmarkNum: Dict[str, int]
+
+    def __post_init__(self) -> None:
+        # Computed only once, as it is used on every frame
+        object.__setattr__(self, "sortOrder"
+                          , numpy.array(self.order, dtype=numpy.intp))
+
+    @property
+    def pointNum(self) -> int:
+        return len(self.order)
+
+    @property
+    def centerIndex(self) -> int:
+        return self.landmarkNum["NOSE_BOTTOM"]
+
+    def sort(self, face: LandmarkArray) -> LandmarkArray:
+        """Sort shape predictor output into this layout"""
+        return face[self.sortOrder]
+
+    @classmethod
+    def fromFile(cls, path: str) -> "LandmarkLayout":
+        """Load layout from JSON file which has the same keys as fields"""
+        with open(path) as f:
+            d = json.load(f)
+        return cls(d["name"], d["modelFile"], tuple(d["order"])
+                  , dict(d["landmarkNum"]))
+
+    def toFile(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"name": self.name, "modelFile": self.modelFile
+                      , "order": list(self.order)
+                      , "landmarkNum": self.landmarkNum}, f, indent=2)
+# }}}
+
+
+# _helenOrder() -> List[int] {{{
+def _helenOrder() -> List[int]:
+    """Return indices which sort helen-dataset.dat result.
+        'sorted[i] = face[_helenOrder()[i]]'
+        Please refer to [this image]() [WIP]
+
+        This code was written by @kekeho(Qiita), refer to:
+            https://qiita.com/kekeho/items/0b2d4ed5192a4c90a0ac
+
+    """
+    # nose
+    nose = list(range(130, 147 + 1))
+    nose.remove(139)
+
+    # right eyebrows
+    right_eyebrow = list(range(62, 83 + 1))
+    right_eyebrow.remove(68)
+    right_eyebrow.remove(79)
+
+    # left eyebrows
+    left_eyebrow = list(range(84, 105 + 1))
+    left_eyebrow.remove(90)
+    left_eyebrow.remove(101)
+
+    # right eye
+    right_eye = list(range(18, 39 + 1))
+    right_eye.remove(24)
+    right_eye.remove(35)
+
+    # left_eye
+    left_eye = list(range(40, 61 + 1))
+    left_eye.remove(46)
+    left_eye.remove(57)
+
+    # outside lips
+    outside_lips = list(range(148, 178 + 1))
+    outside_lips.remove(150)
+    outside_lips.remove(161)
+    outside_lips.remove(172)
+
+    # inside lips
+    inside_lips = list(range(3, 17 + 1))
+    inside_lips.remove(13)
+    add_list_lips = list(range(179, 193 + 1))
+    add_list_lips.remove(183)
+    inside_lips += add_list_lips
+
+    # chin
+    chin = [0, 1, 106, 117, 128, 139, 150, 161, 172,
+            183, 2, 13, 24, 35, 46, 57, 68, 79, 90, 101]
+    add_list = list(range(107, 129 + 1))
+    add_list.remove(117)
+    add_list.remove(128)
+    chin += add_list
+
+    return chin + nose + outside_lips + inside_lips\
+        + right_eye + left_eye\
+        + right_eyebrow + left_eyebrow
+# }}}
+
+
+# iBUG 300-W 68 points. Model is distributed by dlib as
+# 'shape_predictor_68_face_landmarks.dat'
+# As helen, only temples are of the image. Other parts are of the subject:
+# 'LEFT_EYE' is the subject's left eye (on the image right),
+# and '*_L' is the end of parts on the subject's left
+IBUG68_LANDMARK_NUM = {"TEMPLE_LEFT": 0
+                      , "CHIN_CENTER": 8
+                      , "TEMPLE_RIGHT": 16
+                      , "NOSE_R": 31
+                      , "NOSE_BOTTOM": 33
+                      , "NOSE_L": 35
+                      , "MOUSE_R": 48
+                      , "MOUSE_TOP": 51
+                      , "MOUSE_L": 54
+                      , "MOUSE_BOTTOM": 57
+                      , "LEFT_EYE_R": 42
+                      , "LEFT_EYE_TOP": 44
+                      , "LEFT_EYE_L": 45
+                      , "LEFT_EYE_BOTTOM": 46
+                      , "RIGHT_EYE_L": 39
+                      , "RIGHT_EYE_TOP": 37
+                      , "RIGHT_EYE_R": 36
+                      , "RIGHT_EYE_BOTTOM": 41
+                      , "EYEBROW_LEFT_R": 22
+                      , "EYEBROW_LEFT_TOP": 24
+                      , "EYEBROW_LEFT_L": 26
+                      # iBUG doesn't have bottom line of eyebrows,
+                      # so inner end, which is lower than top, is used
+                      , "EYEBROW_LEFT_BOTTOM": 22
+                      , "EYEBROW_RIGHT_L": 21
+                      , "EYEBROW_RIGHT_TOP": 19
+                      , "EYEBROW_RIGHT_R": 17
+                      , "EYEBROW_RIGHT_BOTTOM": 21
+                       }
+
+
+HELEN = LandmarkLayout("helen", "helen-dataset.dat"
+                      , tuple(_helenOrder()), LANDMARK_NUM)
+IBUG68 = LandmarkLayout("ibug68", "shape_predictor_68_face_landmarks.dat"
+                       , tuple(range(68)), IBUG68_LANDMARK_NUM)
+LAYOUTS: Dict[str, LandmarkLayout] = {"helen": HELEN, "ibug68": IBUG68}
+
+
+# getLayout(nameOrPath: str) -> LandmarkLayout {{{
+def getLayout(nameOrPath: str) -> LandmarkLayout:
+    """Return built-in layout if 'nameOrPath' is its name,
+        otherwise load it from file
+    """
+    if nameOrPath in LAYOUTS:
+        return LAYOUTS[nameOrPath]
+    if os.path.isfile(nameOrPath):
+        return LandmarkLayout.fromFile(nameOrPath)
+    raise ValueError(f"Unknown landmark layout: {nameOrPath}")
+# }}}
@@ -0,0 +1,126 @@
+# module logSetting
+# (LogSetting, JsonFormatter, RateLimitFilter, setupLogging) where
+import dataclasses
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Dict, Tuple
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+# LogSetting {{{
+@dataclasses.dataclass(frozen=True)
+class LogSetting:
+    """Setting for 'setupLogging'
+
+        level: level of root logger
+        path: log file
+        maxBytes: rotate log file when it gets bigger than this.
+                  0 never rotates
+        backupCount: keep this number of rotated files
+        json: write each record as one line of JSON
+        debugRate: DEBUG records from each line of code are written
+                   at most this number per second. 0 doesn't limit
+    """
+    level: str = "DEBUG"
+    path: str = "faceDataServer.log"
+    maxBytes: int = 10 * 1024 * 1024
+    backupCount: int = 3
+    json: bool = False
+    debugRate: float = 10.0
+# }}}
+
+
+# JsonFormatter {{{
+class JsonFormatter(logging.Formatter):
+    """Format record as one line of JSON
+
+        Keys are 'time' (UNIX time), 'level', 'name', 'message',
+        'exception' if any, and 'suppressed' (See 'RateLimitFilter').
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        d = {"time": record.created
+            , "level": record.levelname
+            , "name": record.name
+            , "message": record.getMessage()}
+        if record.exc_info:
+            d["exception"] = self.formatException(record.exc_info)
+        if getattr(record, "suppressed", 0) > 0:
+            d["suppressed"] = record.suppressed
+        return json.dumps(d)
+# }}}
+
+
+# RateLimitFilter {{{
+class RateLimitFilter(logging.Filter):
+    """Let DEBUG records from each line of code pass at most
+        'rate' per second.
+
+        Records of other levels always pass. The number of records
+        dropped since the last one passed is set to 'suppressed'
+        attribute of the next record, and appended to its message.
+    """
+    rate: float
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+        # (name, pathname, lineno) -> [next time to pass, suppressed]
+        self._sites: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.rate <= 0:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.setdefault(key, [0.0, 0])
+            if now < site[0]:
+                site[1] += 1
+                return False
+            site[0] = now + 1 / self.rate
+            record.suppressed, site[1] = site[1], 0
+        if record.suppressed > 0:
+            record.msg = f"{record.msg} ({record.suppressed} suppressed)"
+        return True
+# }}}
+
+
+# setupLogging(setting) -> QueueListener {{{
+def setupLogging(setting: LogSetting = LogSetting()
+                 ) -> logging.handlers.QueueListener:
+    """Configure root logger to write into file on its own thread
+
+        Loggers only put records into a queue, and file I/O happens
+        on the listener thread, so logging never blocks callers.
+        Call 'stop' of returned listener to flush records at exit.
+    """
+    handler: logging.Handler
+    if setting.maxBytes > 0:
+        handler = logging.handlers.RotatingFileHandler(
+            setting.path, maxBytes=setting.maxBytes
+            , backupCount=setting.backupCount)
+    else:
+        handler = logging.FileHandler(setting.path)
+    handler.setFormatter(JsonFormatter() if setting.json
+                         else logging.Formatter(TEXT_FORMAT))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queueHandler = logging.handlers.QueueHandler(records)
+    queueHandler.addFilter(RateLimitFilter(setting.debugRate))
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(queueHandler)
+    root.setLevel(setting.level.upper())
+
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    return listener
+# }}}
@@ -0,0 +1,133 @@
+# module metrics
+# (Metrics, MetricsServer) where
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger, Logger
+from typing import Callable, Dict, List, Optional, Tuple
+from .stats import LatencyStats, LATENCY_BUCKETS
+
+logger: Logger = getLogger('metrics')
+
+Labels = Dict[str, str]
+
+
+def _labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format labels as '{a="b",...}'. FOR INTERNAL USE"""
+    items = list(labels.items()) + ([extra] if extra is not None else [])
+    if len(items) == 0:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+# Metrics {{{
+class Metrics:
+    """Metrics in Prometheus text format
+
+        Each metric is a function which reads a counter kept somewhere
+        else (e.g. 'Destination.sent'), or a LatencyStats.
+        They are read only when 'render' is called, so nothing is
+        done per frame for metrics.
+
+        Usage:
+            m = Metrics()
+            m.counter("fds_packets_sent_total", "Packets sent"
+                     , lambda: d.sent, {"destination": str(d)})
+            m.histogram("fds_stage_latency_seconds", "Stage latency"
+                       , stage.latency, {"stage": stage.name})
+            print(m.render())
+    """
+
+    def __init__(self) -> None:
+        # name -> (type, help, [(labels, value or LatencyStats)])
+        self._metrics: Dict[str, Tuple[str, str, List[tuple]]] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, kind: str, name: str, help: str, labels: Labels
+            , value) -> None:
+        """FOR INTERNAL USE"""
+        with self._lock:
+            _kind, _, values = self._metrics.setdefault(name
+                                                       , (kind, help, []))
+            if _kind != kind:
+                raise ValueError(f"{name} is already a {_kind}")
+            values.append((labels, value))
+
+    def counter(self, name: str, help: str, f: Callable[[], float]
+               , labels: Labels = {}) -> None:
+        self._add("counter", name, help, labels, f)
+
+    def gauge(self, name: str, help: str, f: Callable[[], float]
+             , labels: Labels = {}) -> None:
+        self._add("gauge", name, help, labels, f)
+
+    def histogram(self, name: str, help: str, stats: LatencyStats
+                 , labels: Labels = {}) -> None:
+        self._add("histogram", name, help, labels, stats)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = [(name, kind, help, list(values))
+                       for name, (kind, help, values)
+                       in self._metrics.items()]
+        for name, kind, help, values in metrics:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels(labels)} {value()}")
+                    continue
+                buckets, total, count = value.histogram()
+                for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+                    lines.append(f"{name}_bucket"
+                                 f"{_labels(labels, ('le', str(bound)))}"
+                                 f" {n}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+# }}}
+
+
+# MetricsServer {{{
+class MetricsServer(threading.Thread):
+    """Serve 'Metrics' at 'GET /metrics' on its own thread
+
+        Port 0 binds a free port, which is in 'address'.
+    """
+    metrics: Metrics
+
+    def __init__(self, metrics: Metrics, port: int
+                , host: str = "0.0.0.0") -> None:
+        super().__init__(name="metrics", daemon=True)
+        self.metrics = metrics
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(handler) -> None:
+                if handler.path.split("?")[0] != "/metrics":
+                    handler.send_error(404)
+                    return
+                body = metrics.render().encode()
+                handler.send_response(200)
+                handler.send_header("Content-Type"
+                                   , "text/plain; version=0.0.4")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format: str, *args) -> None:
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address
+
+    def run(self) -> None:
+        self._server.serve_forever()
+
+    def close(self) -> None:
+        if self.ident is not None:  # it has been started
+            self._server.shutdown()
+        self._server.server_close()
+# }}}
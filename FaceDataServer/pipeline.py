@@ -0,0 +1,264 @@
+# module pipeline
+# (DropOldestQueue, BlockingQueue, Stage, Pipeline, Pacer) where
+import collections
+import threading
+import time
+from logging import getLogger, Logger
+from typing import Any, Callable, Deque, List, Optional
+from .stats import LatencyStats
+
+logger: Logger = getLogger('pipeline')
+
+
+# DropOldestQueue {{{
+class DropOldestQueue:
+    """Bounded queue which drops the oldest item when it's full.
+
+        This lets consumers always process the freshest item,
+        and never build backlog.
+    """
+    maxsize: int
+    dropped: int
+
+    def __init__(self, maxsize: int = 1) -> None:
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items: Deque[Any] = collections.deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: Any) -> None:
+        with self._cond:
+            if len(self._items) == self.maxsize:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Return the oldest item in queue.
+
+            None is returned if nothing arrived before 'timeout',
+            or the queue is closed.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._items) != 0
+                                        or self._closed
+                               , timeout)
+            return self._items.popleft() if len(self._items) != 0\
+                                         else None
+
+    def close(self) -> None:
+        """Wake up all consumers waiting on 'get'"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+# }}}
+
+
+# BlockingQueue {{{
+class BlockingQueue(DropOldestQueue):
+    """Bounded queue which makes producers wait while it's full,
+        instead of dropping items.
+
+        For sources every item of which should be processed
+        (e.g. replaying recording as fast as possible).
+        'dropped' is always 0.
+        Items put before 'close' can still be taken by 'get'.
+    """
+    def put(self, item: Any) -> None:
+        """Wait until there is room for 'item'.
+            'item' is discarded if the queue is closed meanwhile
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._items) < self.maxsize
+                                        or self._closed)
+            if not self._closed:
+                self._items.append(item)
+                self._cond.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        with self._cond:
+            item = super().get(timeout)
+            # wake producers waiting for room
+            self._cond.notify_all()
+            return item
+# }}}
+
+
+# Stage {{{
+class Stage(threading.Thread):
+    """A thread which applies 'f' to each item from 'source'
+        and puts the result into 'sink'.
+
+        If 'source' is None, 'f' is called without argument repeatedly.
+        Returning None from 'f' means 'nothing to pass to next stage'.
+        Any exception raised in 'f' stops whole pipeline.
+        'StopIteration' does so too, but it isn't treated as error
+        (e.g. source comes to the end).
+        If 'sink' is 'BlockingQueue', it's closed instead, and
+        the next stage stops after processing the rest of it.
+    """
+    f: Callable
+    source: Optional[DropOldestQueue]
+    sink: Optional[DropOldestQueue]
+    latency: LatencyStats
+    error: Optional[BaseException]
+
+    def __init__(self, name: str, f: Callable
+                , source: Optional[DropOldestQueue]
+                , sink: Optional[DropOldestQueue]
+                , stopEvent: threading.Event) -> None:
+        super().__init__(name=name, daemon=True)
+        self.f = f
+        self.source = source
+        self.sink = sink
+        self.latency = LatencyStats()
+        self.error = None
+        self._stopEvent = stopEvent
+
+    def run(self) -> None:
+        finished = False
+        try:
+            while not self._stopEvent.is_set():
+                if self.source is None:
+                    start = time.perf_counter()
+                    result = self.f()
+                else:
+                    item = self.source.get(timeout=0.1)
+                    if item is None:
+                        if self.source.closed:
+                            raise StopIteration
+                        continue
+                    start = time.perf_counter()
+                    result = self.f(item)
+                self.latency.add(time.perf_counter() - start)
+
+                if result is not None and self.sink is not None:
+                    self.sink.put(result)
+        except StopIteration:
+            logger.info(f"stage '{self.name}' finished")
+            finished = True
+        except Exception as e:
+            self.error = e
+            logger.info(f"stage '{self.name}' stopped: {e}")
+        finally:
+            if finished and isinstance(self.sink, BlockingQueue):
+                self.sink.close()
+            else:
+                self._stopEvent.set()
+# }}}
+
+
+# Pipeline {{{
+class Pipeline:
+    """Chain of 'Stage's joined by 'DropOldestQueue's
+
+        Usage:
+            p = Pipeline()
+            p.stage("capture", readFrame)
+            p.stage("inference", facemark)
+            p.stage("send", send, sink=False)
+            p.start()
+    """
+    stages: List[Stage]
+    queues: List[DropOldestQueue]
+
+    def __init__(self, queueSize: int = 1) -> None:
+        self.stages = []
+        self.queues = []
+        self._queueSize = queueSize
+        self._stopEvent = threading.Event()
+
+    def stage(self, name: str, f: Callable, sink: bool = True
+             , source: bool = True, block: bool = False) -> Stage:
+        """Append new stage which consumes result of the last stage.
+
+            If 'sink' is False, results of this stage are discarded.
+            If 'source' is False, 'f' is called without argument
+            even if it isn't the first stage.
+            If 'block' is True, this stage waits for the next stage
+            instead of dropping its oldest result (See 'BlockingQueue').
+        """
+        source_ = self.queues[-1]\
+                    if source and len(self.stages) != 0 else None
+        queueType = BlockingQueue if block else DropOldestQueue
+        queue = queueType(self._queueSize) if sink else None
+        s = Stage(name, f, source_, queue, self._stopEvent)
+        self.stages.append(s)
+        if queue is not None:
+            self.queues.append(queue)
+        return s
+
+    def start(self) -> None:
+        for s in self.stages:
+            s.start()
+
+    def stop(self) -> None:
+        self._stopEvent.set()
+        for q in self.queues:
+            q.close()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        for s in self.stages:
+            if s.ident is not None:  # it has been started
+                s.join(timeout)
+
+    def isRunning(self) -> bool:
+        return not self._stopEvent.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until some stage stops. Return False on timeout"""
+        return self._stopEvent.wait(timeout)
+
+    def error(self) -> Optional[BaseException]:
+        """Return the first error raised in stages"""
+        return next((s.error for s in self.stages if s.error is not None)
+                   , None)
+
+    def report(self) -> str:
+        """Return per-stage latency (mean/p50/p99), queue depth
+            and the number of dropped items
+        """
+        def _stage(s: Stage) -> str:
+            q = "" if s.sink is None \
+                else f", queue {len(s.sink)}/{s.sink.maxsize}" \
+                     f", dropped {s.sink.dropped}"
+            return f"{s.name}: {s.latency.summary()}{q}"
+        return " | ".join(map(_stage, self.stages))
+# }}}
+
+
+# Pacer {{{
+class Pacer:
+    """Let 'pace' return at most 'fps()' times per second
+
+        'fps' is called each time, so that it can change any time.
+        0 (or smaller) doesn't limit.
+
+        Usage:
+            pacer = Pacer(lambda: 10)
+            pacer.pace()    # sleeps if called within 0.1s
+            frame = cap.read()
+    """
+    def __init__(self, fps: Callable[[], float]) -> None:
+        self._fps = fps
+        self._next = 0.0
+
+    def pace(self) -> None:
+        fps = self._fps()
+        now = time.monotonic()
+        if fps <= 0:
+            self._next = now
+            return
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + 1 / fps
+# }}}
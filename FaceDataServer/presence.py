@@ -0,0 +1,102 @@
+# module presence
+# (PresenceSetting, State, Presence) where
+import dataclasses
+import enum
+import time
+from logging import getLogger, Logger
+from typing import Optional
+
+logger: Logger = getLogger('presence')
+
+
+# PresenceSetting {{{
+@dataclasses.dataclass(frozen=True)
+class PresenceSetting:
+    """Setting for 'Presence'
+
+        grace: seconds without face before going idle.
+               Until then every frame is sent as before
+        heartbeat: while idle, a frame is sent every this seconds,
+                   so that receivers can tell 'no face'
+                   from 'server is dead'
+        scanFps: while idle, frames are captured at most this FPS
+    """
+    grace: float = 5.0
+    heartbeat: float = 1.0
+    scanFps: float = 2.0
+# }}}
+
+
+class State(enum.IntEnum):
+    FOUND = 0
+    LOST = 1
+    IDLE = 2
+
+
+# Presence {{{
+class Presence:
+    """State machine of whether the user is in front of the camera
+
+        FOUND --(no face)--> LOST --(no face for 'grace')--> IDLE
+          ^---------------------(face)--------------------------'
+
+        'update' is called for each processed frame, and tells
+        whether it should be sent. While idle, only heartbeats are.
+        It starts in LOST, as nothing has been processed yet.
+    """
+    setting: PresenceSetting
+    state: State
+    suppressed: int
+    heartbeats: int
+
+    def __init__(self, setting: PresenceSetting = PresenceSetting()
+                , now: Optional[float] = None) -> None:
+        self.setting = setting
+        self.state = State.LOST
+        self.suppressed = 0
+        self.heartbeats = 0
+        now = time.monotonic() if now is None else now
+        self._lostAt = now
+        self._lastSent = now
+
+    def update(self, hasFace: bool, now: Optional[float] = None) -> bool:
+        """Update state with a processed frame, and return True
+            if it should be sent. Called on one thread only
+        """
+        now = time.monotonic() if now is None else now
+        if hasFace:
+            self._setState(State.FOUND)
+        elif self.state is State.FOUND:
+            self._lostAt = now
+            self._setState(State.LOST)
+        elif self.state is State.LOST\
+                and now - self._lostAt >= self.setting.grace:
+            self._setState(State.IDLE)
+
+        if self.state is State.IDLE:
+            if now - self._lastSent < self.setting.heartbeat:
+                self.suppressed += 1
+                return False
+            self.heartbeats += 1
+        self._lastSent = now
+        return True
+
+    def _setState(self, state: State) -> None:
+        """FOR INTERNAL USE"""
+        if state is not self.state:
+            logger.info(f"{self.state.name} -> {state.name}")
+            self.state = state
+
+    def limit(self, fps: float) -> float:
+        """Return FPS to capture at, given 'fps' otherwise
+            (0 is unlimited)
+        """
+        if self.state is not State.IDLE:
+            return fps
+        return self.setting.scanFps if fps <= 0\
+                                    else min(fps, self.setting.scanFps)
+
+    def report(self) -> str:
+        return f"{self.state.name.lower()}, suppressed {self.suppressed}"\
+               f", heartbeats {self.heartbeats}"
+# }}}
@@ -0,0 +1,278 @@
+# module receiver
+# (Receiver, Sample) where
+import asyncio
+import collections
+import dataclasses
+import ipaddress
+import select
+import socket
+import struct
+import time
+from typing import Deque, List, Optional, Tuple
+from .Types import (FaceData, Packet, MAX_SAMPLES, MAX_PACKET_SIZE
+                   , majorVersionNum, minorVersionNum, defaultGroupAddr
+                   , defaultPortNumber, FLAG_PREDICTED, FLAG_NO_FACE)
+from .deltaStream import (DeltaDecoder, keyframeMinorVersionNum
+                         , deltaMinorVersionNum)
+
+# Version 1.0 packet, which is the most common one
+_V1_0 = struct.Struct('!BdddBBBB')
+_V1_0_HEADER = (majorVersionNum << 4) + minorVersionNum
+_SEQ_MOD = 1 << 32
+
+
+# Sample {{{
+@dataclasses.dataclass
+class Sample:
+    """ One FaceData received. Samples are reused by 'Receiver'
+        (See it), so 'copy' it to keep it
+
+        seq: sequence number. None if the packet doesn't have it
+        timestamp: UNIX time when the frame was captured.
+                   None if the packet doesn't have it
+        received: UNIX time when the packet was received
+        predicted: True if the server predicted it instead of measuring.
+                   None if the packet doesn't tell
+        hasFace: False if there was no face in the frame.
+                 None if the packet doesn't tell
+    """
+    data: FaceData
+    seq: Optional[int]
+    timestamp: Optional[float]
+    received: float
+    predicted: Optional[bool] = None
+    hasFace: Optional[bool] = None
+
+    def latency(self) -> Optional[float]:
+        """Seconds from capture to receive, if timestamp is known"""
+        return None if self.timestamp is None\
+                    else self.received - self.timestamp
+
+    def copy(self) -> "Sample":
+        """Return a copy which isn't overwritten by 'Receiver'"""
+        d = self.data
+        data = FaceData(d.face_x_radian, d.face_y_radian, d.face_z_radian
+                       , d.mouth_height_percent, d.mouth_width_percent
+                       , d.left_eye_percent, d.right_eye_percent)
+        return dataclasses.replace(self, data=data)
+# }}}
+
+
+# Receiver {{{
+class Receiver:
+    """Receive FaceData sent by the server
+
+        Every packet version is decoded. Packets are read into one
+        buffer allocated beforehand with 'recv_into', and version 1.0
+        packets are decoded from it with precompiled struct directly
+        into 'Sample's allocated beforehand too.
+        Those 'maxPending + 1' samples are reused in turn, so a sample
+        returned is overwritten after 'maxPending' more are received.
+        'Sample.copy' it to keep it longer.
+        Samples which appear in several packets (See 'PacketWindow')
+        are returned only once.
+
+        'group' is multicast group to join. Unicast address is bound
+        instead if it isn't multicast one. Port 0 binds a free port,
+        which is in 'address'.
+        Only the latest 'maxPending' samples are kept until they are read.
+
+        Usage:
+            with Receiver() as r:
+                sample = r.latest()     # non-blocking
+                sample = r.recv(1.0)    # blocking
+
+            async for sample in Receiver():
+                ...
+    """
+    received: int
+    invalid: int
+    lost: int
+
+    def __init__(self, group: str = defaultGroupAddr
+                , port: int = defaultPortNumber
+                , interface: str = "0.0.0.0"
+                , bufferSize: int = MAX_PACKET_SIZE
+                , maxPending: int = 1024) -> None:
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if ipaddress.ip_address(group).is_multicast:
+            self._sock.bind(("", port))
+            self._sock.setsockopt(socket.IPPROTO_IP
+                                 , socket.IP_ADD_MEMBERSHIP
+                                 , socket.inet_aton(group)
+                                   + socket.inet_aton(interface))
+        else:
+            self._sock.bind((group, port))
+        self._sock.setblocking(False)
+        self._buffer = bytearray(bufferSize)
+        self._view = memoryview(self._buffer)
+        self._pending: Deque[Sample] = collections.deque(maxlen=maxPending)
+        # one more than pending, not to overwrite the latest one
+        # which has just been taken
+        self._slots = [Sample(FaceData.default(), None, None, 0.0)
+                       for _ in range(maxPending + 1)]
+        self._nextSlot = 0
+        self._latest: Optional[Sample] = None
+        self._lastSeq: Optional[int] = None
+        self._delta = DeltaDecoder()
+        self.received = 0
+        self.invalid = 0
+        self.lost = 0
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._sock.getsockname()
+
+    def fileno(self) -> int:
+        return self._sock.fileno()
+
+    # sync API {{{
+    def poll(self) -> List[Sample]:
+        """Return all samples received so far, without blocking"""
+        self._readAll()
+        samples = list(self._pending)
+        self._pending.clear()
+        return samples
+
+    def latest(self) -> Optional[Sample]:
+        """Return the newest sample without blocking.
+            None if nothing has been received yet.
+
+            Samples older than it are discarded.
+        """
+        self._readAll()
+        self._pending.clear()
+        return self._latest
+
+    def recv(self, timeout: Optional[float] = None) -> Optional[Sample]:
+        """Return the next sample, waiting at most 'timeout' seconds.
+            None if it times out.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._pending) == 0:
+            wait = None if deadline is None\
+                else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._sock], [], [], wait)
+            if len(ready) == 0:
+                return None
+            self._readAll()
+        return self._pending.popleft()
+    # }}}
+
+    # async API {{{
+    def __aiter__(self) -> "Receiver":
+        return self
+
+    async def __anext__(self) -> Sample:
+        loop = asyncio.get_running_loop()
+        while len(self._pending) == 0:
+            if self._sock.fileno() == -1:
+                raise StopAsyncIteration
+            n = await loop.sock_recv_into(self._sock, self._buffer)
+            self._decode(n, time.time())
+        return self._pending.popleft()
+    # }}}
+
+    def _readAll(self) -> None:
+        """Read all datagrams in socket buffer. FOR INTERNAL USE"""
+        while True:
+            try:
+                n = self._sock.recv_into(self._buffer)
+            except BlockingIOError:
+                return
+            self._decode(n, time.time())
+
+    def _decode(self, n: int, received: float) -> None:
+        """Decode datagram of 'n' bytes in buffer. FOR INTERNAL USE"""
+        self.received += 1
+        try:
+            if n == _V1_0.size and self._buffer[0] == _V1_0_HEADER:
+                s = self._slot(None, None, received)
+                d = s.data
+                (_, d.face_x_radian, d.face_y_radian, d.face_z_radian
+                 , d.mouth_height_percent, d.mouth_width_percent
+                 , d.left_eye_percent, d.right_eye_percent)\
+                    = _V1_0.unpack_from(self._buffer)
+                self._push(s)
+                return
+            if n == 0 or self._buffer[0] >> 4 != majorVersionNum:
+                raise ValueError("unsupported packet version")
+            minor = self._buffer[0] & 0xf
+            if minor in (keyframeMinorVersionNum, deltaMinorVersionNum):
+                lost = self._delta.lost
+                result = self._delta.decode(self._view[:n])
+                self.lost += self._delta.lost - lost
+                if result is not None:
+                    seq, timestamp, data = result
+                    self._push(self._slot(seq, timestamp, received, data))
+                return
+            self._decodePacket(Packet.fromBinary(self._view[:n]), received)
+        except ValueError:
+            self.invalid += 1
+
+    def _decodePacket(self, packet: Packet, received: float) -> None:
+        """FOR INTERNAL USE"""
+        if packet.seq is None:
+            self._push(self._slot(None, None, received, packet.samples[0]))
+            return
+        count = len(packet.samples)
+        if self._lastSeq is not None:
+            # number of samples newer than what we have
+            new = (packet.seq - self._lastSeq) % _SEQ_MOD
+            if new >= _SEQ_MOD - MAX_SAMPLES:
+                # reordered or duplicated
+                return
+            if new < _SEQ_MOD // 2:
+                self.lost += max(0, new - count)
+                count = min(count, new)
+            # otherwise the server has restarted
+        newSamples = packet.samples[len(packet.samples) - count:]
+        for i, data in enumerate(newSamples):
+            seq = (packet.seq - count + 1 + i) % _SEQ_MOD
+            # only the last one has its own timestamp and flags
+            last = i == count - 1
+            self._push(self._slot(seq, packet.timestamp if last else None
+                                 , received, data
+                                 , bool(packet.flags & FLAG_PREDICTED)
+                                   if last else None
+                                 , not packet.flags & FLAG_NO_FACE
+                                   if last else None))
+        self._lastSeq = packet.seq
+
+    def _slot(self, seq: Optional[int], timestamp: Optional[float]
+             , received: float, data: Optional[FaceData] = None
+             , predicted: Optional[bool] = None
+             , hasFace: Optional[bool] = None) -> Sample:
+        """Fill the next reused sample. 'data' is copied into it
+            if given. FOR INTERNAL USE
+        """
+        s = self._slots[self._nextSlot]
+        self._nextSlot = (self._nextSlot + 1) % len(self._slots)
+        s.seq, s.timestamp, s.received = seq, timestamp, received
+        s.predicted, s.hasFace = predicted, hasFace
+        if data is not None:
+            d = s.data
+            d.face_x_radian = data.face_x_radian
+            d.face_y_radian = data.face_y_radian
+            d.face_z_radian = data.face_z_radian
+            d.mouth_height_percent = data.mouth_height_percent
+            d.mouth_width_percent = data.mouth_width_percent
+            d.left_eye_percent = data.left_eye_percent
+            d.right_eye_percent = data.right_eye_percent
+        return s
+
+    def _push(self, sample: Sample) -> None:
+        """FOR INTERNAL USE"""
+        self._pending.append(sample)
+        self._latest = sample
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self) -> "Receiver":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+# }}}
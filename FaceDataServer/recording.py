@@ -0,0 +1,161 @@
+# module recording
+# (LandmarkRecorder, Recording, replay, RECORDING_VERSION) where
+import struct
+import time
+import numpy
+from typing import Iterator, List, Optional, Tuple
+from .Types import LandmarkArray
+
+# File layout:
+#   header: magic, version, point number, frame height, frame width,
+#           length of landmark layout name, and the name (utf-8).
+#           The name is a file path for custom layouts, so it isn't
+#           fixed size
+#   records: fixed size records of 'recordDtype(pointNum)'.
+#            Landmarks of frames without face are NaN.
+# Records are fixed size so that the file can be memory mapped
+# and read as one array, however long it is.
+MAGIC = b"FDSL"
+RECORDING_VERSION = 2
+_HEADER = struct.Struct("<4sBHHHH")
+
+
+def recordDtype(pointNum: int) -> numpy.dtype:
+    """numpy dtype of one record. Landmarks are stored as float32
+        to keep recordings compact.
+    """
+    return numpy.dtype([("timestamp", "<f8")
+                       , ("landmark", "<f4", (pointNum, 2))])
+
+
+# LandmarkRecorder {{{
+class LandmarkRecorder:
+    """Record 'facemarkArray' results with timestamps
+
+        Timestamps are seconds from the first record.
+
+        Raise Exception:
+            ValueError: 'layoutName' is longer than 65535 bytes
+
+        Usage:
+            with LandmarkRecorder("session.fdsl", 194) as r:
+                r.write(facemarkArray(frame), captured)
+    """
+    count: int
+
+    def __init__(self, path: str, pointNum: int
+                , frameSize: Tuple[int, int] = (0, 0)
+                , layoutName: str = "helen") -> None:
+        name = layoutName.encode()
+        if len(name) > 0xffff:
+            raise ValueError(f"layout name is too long: {layoutName}")
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, RECORDING_VERSION, pointNum
+                                     , frameSize[0], frameSize[1]
+                                     , len(name))
+                         + name)
+        self._record = numpy.zeros((), recordDtype(pointNum))
+        self._start: Optional[float] = None
+        self.count = 0
+
+    def write(self, landmark: Optional[LandmarkArray]
+             , timestamp: Optional[float] = None) -> None:
+        """Append one frame. None means the frame has no face
+
+            'timestamp' is 'time.monotonic()' when it's written
+            if not given.
+        """
+        t = time.monotonic() if timestamp is None else timestamp
+        if self._start is None:
+            self._start = t
+        self._record["timestamp"] = t - self._start
+        self._record["landmark"] = numpy.nan if landmark is None\
+                                             else landmark
+        self._file.write(self._record.tobytes())
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "LandmarkRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+# }}}
+
+
+# Recording {{{
+class Recording:
+    """Recording written by 'LandmarkRecorder'
+
+        'timestamps' and 'landmarks' are memory mapped arrays,
+        so opening long recording is cheap.
+    """
+    pointNum: int
+    frameSize: Tuple[int, int]
+    layoutName: str
+    timestamps: numpy.ndarray
+    landmarks: numpy.ndarray
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError(f"{path} is not landmark recording")
+            magic, version, pointNum, h, w, nameLength\
+                = _HEADER.unpack(header)
+            name = f.read(nameLength)
+        if magic != MAGIC or version != RECORDING_VERSION\
+                or len(name) != nameLength:
+            raise ValueError(f"{path} is not landmark recording"
+                             f" (version {RECORDING_VERSION})")
+        self.pointNum = pointNum
+        self.frameSize = (h, w)
+        self.layoutName = name.decode()
+        records = numpy.memmap(path, recordDtype(pointNum), mode="r"
+                              , offset=_HEADER.size + nameLength)
+        self.timestamps = records["timestamp"]
+        self.landmarks = records["landmark"]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def landmark(self, i: int) -> Optional[LandmarkArray]:
+        """Return i-th landmark as float64 array, like 'facemarkArray'.
+            None if the frame has no face
+        """
+        lm = self.landmarks[i]
+        return None if numpy.isnan(lm).any()\
+                    else lm.astype(numpy.float64)
+
+    def faces(self, n: int) -> List[LandmarkArray]:
+        """Return the first 'n' landmarks which have face"""
+        result: List[LandmarkArray] = []
+        for i in range(len(self)):
+            if len(result) == n:
+                break
+            lm = self.landmark(i)
+            if lm is not None:
+                result.append(lm)
+        return result
+# }}}
+
+
+# replay(recording, speed) -> Iterator[(timestamp, landmark)] {{{
+def replay(recording: Recording, speed: Optional[float] = 1.0
+           ) -> Iterator[Tuple[float, Optional[LandmarkArray]]]:
+    """Yield '(timestamp, landmark)' of each frame
+
+        speed: 1.0 replays at real time, 2.0 twice as fast.
+               None replays as fast as possible.
+    """
+    start = time.monotonic()
+    for i in range(len(recording)):
+        timestamp = float(recording.timestamps[i])
+        if speed is not None:
+            wait = start + timestamp / speed - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        yield (timestamp, recording.landmark(i))
+# }}}
@@ -0,0 +1,136 @@
+# module scheduler
+# (Extrapolator, OutputScheduler) where
+import threading
+import time
+from typing import Callable, Optional, Tuple
+from .filters import LandmarkFilter
+from .Types import FaceData, LandmarkArray
+
+
+# Extrapolator {{{
+class Extrapolator:
+    """Predict FaceData with the motion model of 'landmarkFilter'
+
+        Landmarks are predicted by 'landmarkFilter.predict', and
+        turned into FaceData by 'convert', the same way as measured
+        ones. So measurements and predictions never disagree about
+        motion. 'landmarkFilter' is fed by its owner, not by this.
+        Predictions go at most 'maxHorizon' seconds ahead of
+        the last measurement, and stay there after that.
+        Nothing is predicted while there's no face.
+    """
+    maxHorizon: float
+
+    def __init__(self, landmarkFilter: LandmarkFilter
+                , convert: Callable[[LandmarkArray], FaceData]
+                , maxHorizon: float = 0.1) -> None:
+        self.landmarkFilter = landmarkFilter
+        self.maxHorizon = maxHorizon
+        self._convert = convert
+        self._t: Optional[float] = None
+
+    def add(self, timestamp: float, hasFace: bool = True) -> None:
+        """Tell that a measurement at 'timestamp' has been filtered"""
+        self._t = timestamp if hasFace else None
+
+    def predict(self, timestamp: float) -> Optional[FaceData]:
+        """Return FaceData at 'timestamp'. None if there's no face"""
+        t = self._t
+        if t is None:
+            return None
+        landmark = self.landmarkFilter.predict(
+            min(timestamp, t + self.maxHorizon))
+        return None if landmark is None else self._convert(landmark)
+# }}}
+
+
+# OutputScheduler {{{
+class OutputScheduler(threading.Thread):
+    """Emit FaceData at fixed rate, whatever rate measurements come in
+
+        Measurements given to 'update' are emitted as soon as possible.
+        When no measurement comes for a tick, a prediction of
+        'extrapolator' is emitted instead, if it's given and there's face.
+        'emit(data, timestamp, predicted, hasFace)' is called
+        on this thread.
+        'timestamp' is 'time.monotonic()' of capture for measurements,
+        and of the time predicted for predictions.
+
+        Usage:
+            s = OutputScheduler(120, emit)
+            s.start()
+            s.update(data, captured)
+            s.close()
+    """
+    period: float
+    extrapolator: Optional[Extrapolator]
+    measured: int
+    predicted: int
+    late: int
+
+    def __init__(self, rate: float
+                , emit: Callable[[FaceData, float, bool, bool], None]
+                , extrapolator: Optional[Extrapolator] = None) -> None:
+        super().__init__(name="scheduler", daemon=True)
+        self.period = 1 / rate
+        self.extrapolator = extrapolator
+        self.measured = 0
+        self.predicted = 0
+        self.late = 0
+        self._emit = emit
+        self._cond = threading.Condition()
+        self._pending: Optional[Tuple[FaceData, float, bool]] = None
+        self._closed = False
+
+    def update(self, data: FaceData, captured: float
+              , hasFace: bool = True) -> None:
+        """Give new measurement. Unemitted one is replaced"""
+        with self._cond:
+            self._pending = (data, captured, hasFace)
+            self._cond.notify()
+
+    def run(self) -> None:
+        nextTick = time.monotonic() + self.period
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    wait = nextTick - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+                pending, self._pending = self._pending, None
+
+            now = time.monotonic()
+            if pending is not None:
+                data, captured, hasFace = pending
+                if self.extrapolator is not None:
+                    self.extrapolator.add(captured, hasFace)
+                self._emit(data, captured, False, hasFace)
+                self.measured += 1
+            elif self.extrapolator is not None:
+                data = self.extrapolator.predict(now)
+                if data is not None:
+                    self._emit(data, now, True, True)
+                    self.predicted += 1
+            nextTick += self.period
+            if nextTick < now:
+                # emit took too long. Skip missed ticks
+                self.late += 1
+                nextTick = now + self.period
+            elif pending is not None:
+                # next prediction is one period after the measurement
+                nextTick = now + self.period
+
+    def close(self, timeout: Optional[float] = 1) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self.ident is not None:  # it has been started
+            self.join(timeout)
+
+    def report(self) -> str:
+        return f"measured {self.measured}, predicted {self.predicted}"\
+               f", late {self.late}"
+# }}}
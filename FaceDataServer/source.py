@@ -0,0 +1,84 @@
+# module source
+# (ImageDirSource, openSource, frames) where
+import os
+import cv2
+from typing import Iterator, List, Union
+from .Types import Cv2Image, SourceOpenError
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+# ImageDirSource {{{
+class ImageDirSource:
+    """Read images in a directory in name order.
+
+        This has the same interface as 'cv2.VideoCapture'
+        ('isOpened', 'read', 'release' and 'get'), so that
+        it can be used where camera is used.
+        Images which can't be read are skipped, and counted
+        in 'skipped'.
+    """
+    files: List[str]
+    skipped: int
+
+    def __init__(self, path: str) -> None:
+        self.files = sorted(os.path.join(path, f) for f in os.listdir(path)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        self._next = 0
+        self.skipped = 0
+
+    def isOpened(self) -> bool:
+        return self._next < len(self.files)
+
+    def read(self) -> tuple:
+        while self.isOpened():
+            frame = cv2.imread(self.files[self._next])
+            self._next += 1
+            if frame is not None:
+                return (True, frame)
+            self.skipped += 1
+        return (False, None)
+
+    def release(self) -> None:
+        self._next = len(self.files)
+
+    def get(self, prop: int) -> float:
+        """Only 'cv2.CAP_PROP_FRAME_COUNT' and 'cv2.CAP_PROP_POS_FRAMES'
+            are supported. Other properties return 0 as cv2 does
+        """
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._next)
+        return 0.0
+# }}}
+
+
+# openSource(path: str) -> Union[cv2.VideoCapture, ImageDirSource] {{{
+def openSource(path: str) -> Union[cv2.VideoCapture, ImageDirSource]:
+    """Open video file, or directory of images
+
+        Raise Exception:
+            SourceOpenError: 'path' can't be opened
+    """
+    if os.path.isdir(path):
+        source = ImageDirSource(path)
+    else:
+        source = cv2.VideoCapture(path)
+    if not source.isOpened():
+        source.release()
+        raise SourceOpenError(path)
+    return source
+# }}}
+
+
+# frames(source) -> Iterator[Cv2Image] {{{
+def frames(source: Union[cv2.VideoCapture, ImageDirSource]
+           ) -> Iterator[Cv2Image]:
+    """Yield frames until 'source' comes to the end"""
+    while source.isOpened():
+        ok, frame = source.read()
+        if not ok:
+            return
+        yield frame
+# }}}
@@ -0,0 +1,220 @@
+# module stats
+# (LatencyStats, RateMeter, Timings, Lap, LATENCY_BUCKETS) where
+import bisect
+import numpy
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (in seconds) of histogram buckets of LatencyStats
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05
+                  , 0.1, 0.25, 0.5, 1.0)
+
+
+# LatencyStats {{{
+class LatencyStats:
+    """Rolling window of latency samples (in seconds)
+
+        Only the latest 'size' samples are kept. The buffer is
+        allocated once, so 'add' doesn't allocate.
+        Histogram of all samples ever added is kept too
+        (See 'LATENCY_BUCKETS').
+        'size' None keeps all samples instead, doubling the buffer
+        when it's full, for summaries of whole runs.
+    """
+    count: int
+    total: float
+
+    def __init__(self, size: Optional[int] = 512) -> None:
+        self._unbounded = size is None
+        self._samples = numpy.zeros(512 if size is None else size)
+        self._buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, sec: float) -> None:
+        with self._lock:
+            if self._unbounded and self.count == len(self._samples):
+                self._samples = numpy.resize(self._samples
+                                            , 2 * len(self._samples))
+            self._samples[self.count % len(self._samples)] = sec
+            self._buckets[bisect.bisect_left(LATENCY_BUCKETS, sec)] += 1
+            self.count += 1
+            self.total += sec
+
+    def histogram(self) -> Tuple[List[int], float, int]:
+        """Return '(cumulative counts, sum, count)' of all samples.
+
+            i-th count is the number of samples not greater than
+            'LATENCY_BUCKETS[i]', and the last one is 'count'.
+        """
+        with self._lock:
+            buckets = list(self._buckets)
+            total, count = self.total, self.count
+        for i in range(1, len(buckets)):
+            buckets[i] += buckets[i - 1]
+        return (buckets, total, count)
+
+    def samples(self) -> numpy.ndarray:
+        """Return copy of samples in the window"""
+        with self._lock:
+            return self._samples[:min(self.count
+                                     , len(self._samples))].copy()
+
+    def percentile(self, p: float) -> float:
+        """Return p-th percentile in seconds. 0 if there's no sample"""
+        s = self.samples()
+        return float(numpy.percentile(s, p)) if len(s) != 0 else 0.0
+
+    def percentiles(self, ps: Sequence[float]) -> numpy.ndarray:
+        """Return percentiles of each 'ps' in seconds at once"""
+        s = self.samples()
+        return numpy.percentile(s, ps) if len(s) != 0\
+                                       else numpy.zeros(len(ps))
+
+    def mean(self) -> float:
+        s = self.samples()
+        return float(s.mean()) if len(s) != 0 else 0.0
+
+    def summary(self) -> str:
+        """ return 'mean/p50/p99' in milliseconds """
+        return f"{self.mean() * 1000:.2f}/{self.percentile(50) * 1000:.2f}"\
+               f"/{self.percentile(99) * 1000:.2f}ms"
+# }}}
+
+
+# RateMeter {{{
+class RateMeter:
+    """Events per second in the latest 'window' seconds
+
+        Owned by the producer of events, which calls 'tick'.
+        Events are counted into 'slots' buckets of 'window / slots'
+        seconds each, which are allocated once. Reading 'rate'
+        resets nothing, so it's the same whoever reads it how often.
+    """
+    window: float
+    count: int
+
+    def __init__(self, window: float = 5.0, slots: int = 10) -> None:
+        self.window = window
+        self.count = 0
+        self._width = window / slots
+        self._buckets = [0] * slots
+        self._slot = 0
+        self._start: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _advance(self, slot: int) -> None:
+        """Clear buckets which have left the window. FOR INTERNAL USE"""
+        for i in range(self._slot + 1
+                      , min(slot, self._slot + len(self._buckets)) + 1):
+            self._buckets[i % len(self._buckets)] = 0
+        self._slot = max(self._slot, slot)
+
+    def tick(self, n: int = 1, now: Optional[float] = None) -> None:
+        """Count 'n' events happened at 'now' (time.monotonic())"""
+        now = time.monotonic() if now is None else now
+        slot = int(now // self._width)
+        with self._lock:
+            if self._start is None:
+                self._start, self._slot = now, slot
+            self._advance(slot)
+            self._buckets[slot % len(self._buckets)] += n
+            self.count += n
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Events per second. 0 before the first event"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._start is None:
+                return 0.0
+            self._advance(int(now // self._width))
+            # the latest bucket is still filling
+            span = min(now - self._start
+                      , (len(self._buckets) - 1) * self._width
+                        + now % self._width)
+            return sum(self._buckets) / span if span > 0 else 0.0
+# }}}
+
+
+# Timings {{{
+class Timings:
+    """LatencyStats of each step of processing a frame
+
+        Disabled one records nothing, and costs only a function call
+        for each step.
+
+        Usage:
+            timings = Timings(["read", "facemark"])
+            lap = timings.lap()     # once for each thread
+            # for each frame
+            lap.start()
+            frame = cap.read()
+            lap("read")         # time since 'lap.start()'
+            facemark(frame)
+            lap("facemark")     # time since 'lap("read")'
+    """
+    enabled: bool
+    stats: Dict[str, LatencyStats]
+
+    def __init__(self, names: Sequence[str], size: int = 512
+                , enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.stats = {name: LatencyStats(size) for name in names}\
+                     if enabled else {}
+
+    def lap(self) -> "Lap":
+        """Return new 'Lap' which records into these.
+            It's reused for every frame, but not shared between threads
+        """
+        return Lap(self.stats) if self.enabled else _noLap
+
+    def add(self, name: str, sec: float) -> None:
+        if self.enabled:
+            self.stats[name].add(sec)
+
+    def report(self) -> str:
+        """ return 'name p50/p95/p99' of each step in milliseconds """
+        def _summary(s: LatencyStats) -> str:
+            p50, p95, p99 = s.percentiles([50, 95, 99]) * 1000
+            return f"{p50:.2f}/{p95:.2f}/{p99:.2f}ms"
+        return " | ".join(f"{name} {_summary(s)}"
+                          for name, s in self.stats.items() if s.count > 0)
+
+
+class Lap:
+    """Records time since 'start' or the previous call of it
+        into LatencyStats of the step. (See 'Timings')
+    """
+    __slots__ = ("_stats", "_last")
+
+    def __init__(self, stats: Dict[str, LatencyStats]) -> None:
+        self._stats = stats
+        self._last = time.perf_counter()
+
+    def start(self) -> None:
+        self._last = time.perf_counter()
+
+    def __call__(self, name: str) -> None:
+        now = time.perf_counter()
+        self._stats[name].add(now - self._last)
+        self._last = now
+
+
+class _NoLap(Lap):
+    """Lap of disabled Timings. FOR INTERNAL USE"""
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        pass
+
+    def start(self) -> None:
+        pass
+
+    def __call__(self, name: str) -> None:
+        pass
+
+
+_noLap = _NoLap()
+# }}}
@@ -0,0 +1,238 @@
+# module transport
+# (Destination, Transport, PacketWindow, parseDestinations) where
+import collections
+import socket
+import threading
+import time
+from logging import getLogger, Logger
+from typing import Deque, List, Optional, Sequence, Tuple
+from .stats import Timings
+from .Types import (defaultPortNumber, FaceData, Packet, MAX_SAMPLES
+                   , FLAG_PREDICTED, FLAG_NO_FACE)
+
+logger: Logger = getLogger('transport')
+
+
+# Destination {{{
+class Destination:
+    """Where packets are sent, and counters of it
+
+        minInterval: Send at most one packet in this seconds.
+                     Packets given meanwhile are coalesced, i.e.
+                     only the newest one is sent.
+    """
+    address: Tuple[str, int]
+    minInterval: float
+    sent: int
+    coalesced: int
+    errors: int
+    lastError: Optional[OSError]
+
+    def __init__(self, address: Tuple[str, int], minInterval: float = 0.0
+                 ) -> None:
+        self.address = address
+        self.minInterval = minInterval
+        self.sent = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.lastError = None
+        self._pending: Optional[bytes] = None
+        self._captured: Optional[float] = None
+        self._nextTime = 0.0
+
+    def __repr__(self) -> str:
+        return f"{self.address[0]}:{self.address[1]}"
+
+    def report(self) -> str:
+        return f"{self}: sent {self.sent}, coalesced {self.coalesced}"\
+               f", errors {self.errors}"
+# }}}
+
+
+# Transport {{{
+class Transport(threading.Thread):
+    """Send packets to several destinations on its own thread
+
+        'send' never blocks: it only leaves the packet to each
+        destination, replacing one which hasn't been sent yet.
+        The socket is non-blocking too, so a slow or unreachable
+        destination never stalls others nor the caller.
+        Send errors are counted per destination instead of raised.
+
+        If 'timings' is given, time spent in 'sendto' is recorded
+        as "sendto", and time from capture to 'sendto' of packets
+        whose capture time is given is recorded as "total".
+
+        Usage:
+            t = Transport([Destination((defaultGroupAddr, defaultPortNumber))])
+            t.start()
+            t.send(data.toBinary())
+            t.close()
+    """
+    destinations: List[Destination]
+    timings: Optional[Timings]
+
+    def __init__(self, destinations: Sequence[Destination]
+                , interface: str = "0.0.0.0"
+                , timings: Optional[Timings] = None) -> None:
+        super().__init__(name="transport", daemon=True)
+        self.destinations = list(destinations)
+        self.timings = timings
+        self._cond = threading.Condition()
+        self._closed = False
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Some options. See `man setsockopt'
+        self._sock.setsockopt(socket.SOL_SOCKET
+                             , socket.SO_BROADCAST, 1)  # enable BROADCAST
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF
+                             , socket.inet_aton(interface))
+        self._sock.setblocking(False)
+
+    def send(self, packet: bytes, captured: Optional[float] = None) -> None:
+        """Queue 'packet' to all destinations
+
+            'captured' is 'time.monotonic()' when the frame was captured.
+        """
+        with self._cond:
+            for d in self.destinations:
+                if d._pending is not None:
+                    d.coalesced += 1
+                d._pending = packet
+                d._captured = captured
+            self._cond.notify()
+
+    def run(self) -> None:
+        try:
+            while True:
+                with self._cond:
+                    ready, timeout = self._ready()
+                    while len(ready) == 0 and not self._closed:
+                        self._cond.wait(timeout)
+                        ready, timeout = self._ready()
+                    if len(ready) == 0:
+                        return
+                for d, packet, captured in ready:
+                    self._sendTo(d, packet, captured)
+        finally:
+            self._sock.close()
+
+    def _ready(self) -> Tuple[List[Tuple[Destination, bytes
+                                        , Optional[float]]]
+                             , Optional[float]]:
+        """Take packets which can be sent now. FOR INTERNAL USE
+
+            Also return how long to wait for the next one.
+        """
+        now = time.monotonic()
+        ready: List[Tuple[Destination, bytes, Optional[float]]] = []
+        timeout: Optional[float] = None
+        for d in self.destinations:
+            if d._pending is None:
+                continue
+            if d._nextTime <= now:
+                ready.append((d, d._pending, d._captured))
+                d._pending = None
+                d._nextTime = now + d.minInterval
+            else:
+                wait = d._nextTime - now
+                timeout = wait if timeout is None else min(timeout, wait)
+        return (ready, timeout)
+
+    def _sendTo(self, d: Destination, packet: bytes
+               , captured: Optional[float]) -> None:
+        try:
+            start = time.perf_counter()
+            self._sock.sendto(packet, d.address)
+            d.sent += 1
+            if self.timings is not None:
+                self.timings.add("sendto", time.perf_counter() - start)
+                if captured is not None:
+                    self.timings.add("total", time.monotonic() - captured)
+        except OSError as e:
+            # Log only when error changes, not to flood the log
+            if d.lastError is None or str(d.lastError) != str(e):
+                logger.info(f"failed to send to {d}: {e}")
+            d.errors += 1
+            d.lastError = e
+
+    def close(self, timeout: Optional[float] = 1) -> None:
+        """Send packets left, and stop the thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self.ident is not None:  # it has been started
+            self.join(timeout)
+        else:
+            self._sock.close()
+
+    def report(self) -> str:
+        return " | ".join(d.report() for d in self.destinations)
+# }}}
+
+
+# PacketWindow {{{
+class PacketWindow:
+    """Pack the last 'samples' FaceData into version 1.1 packets
+
+        A packet is made every 'every' samples. 'every' less than
+        'samples' sends each sample several times, so that clients can
+        fill lost packets from the next one. 'every' equal to 'samples'
+        sends each sample once, with less packets.
+        'compact' makes version 1.3 packets instead.
+
+        Usage:
+            window = PacketWindow(3)
+            packet = window.add(data, time.time())
+            if packet is not None:
+                transport.send(packet)
+    """
+    samples: int
+    every: int
+    compact: bool
+    seq: int
+
+    def __init__(self, samples: int, every: int = 1
+                , compact: bool = False) -> None:
+        if not 0 < samples <= MAX_SAMPLES:
+            raise ValueError(f"samples should be 1 to {MAX_SAMPLES}")
+        if not 0 < every <= samples:
+            raise ValueError("every should be 1 to samples")
+        self.samples = samples
+        self.every = every
+        self.compact = compact
+        self.seq = -1
+        self._window: Deque[FaceData] = collections.deque(maxlen=samples)
+
+    def add(self, data: FaceData, timestamp: float
+           , predicted: bool = False, hasFace: bool = True
+            ) -> Optional[bytes]:
+        """Add next sample, and return packet if it's time to send
+
+            'predicted' marks the sample as predicted, not measured.
+            'hasFace' False marks it as a frame without face.
+        """
+        self.seq += 1
+        self._window.append(data)
+        if (self.seq + 1) % self.every != 0:
+            return None
+        return Packet(self.seq, timestamp, tuple(self._window)
+                     , (FLAG_PREDICTED if predicted else 0)
+                       | (0 if hasFace else FLAG_NO_FACE)
+                     , self.compact).toBinary()
+# }}}
+
+
+# parseDestinations(s: str, minInterval: float) -> List[Destination] {{{
+def parseDestinations(s: str, minInterval: float = 0.0
+                      ) -> List[Destination]:
+    """Parse comma separated 'host[:port]' list.
+
+        Port is 'defaultPortNumber' if omitted.
+        Raise ValueError if port isn't a number.
+    """
+    def _parse(item: str) -> Destination:
+        host, _, port = item.strip().partition(":")
+        return Destination((host, int(port) if port else defaultPortNumber)
+                          , minInterval)
+    return [_parse(item) for item in s.split(",") if item.strip() != ""]
+# }}}
@@ -0,0 +1,68 @@
+# Process video file or image directory without camera
+#
+# FaceData of each frame is written to stdout (or file) as fast as
+# possible, and a summary is printed to stderr at the end.
+#
+# usage:
+#   pipenv run python batch.py <video or image dir> [-o output]
+#
+import argparse
+import sys
+from FaceDataServer.batch import BatchSetting, runBatch, WRITERS
+from FaceDataServer.faceDetection import useLayout
+from FaceDataServer.landmarkLayout import getLayout
+from FaceDataServer.source import openSource
+from FaceDataServer.Types import FaceDetectionError
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write FaceData of each"
+                                                 " frame of video file"
+                                                 " or image directory")
+    parser.add_argument("input", help="video file or image directory")
+    parser.add_argument("-o", "--output", default="-"
+                       , help="output file. '-' for stdout (default)")
+    parser.add_argument("-f", "--format", choices=WRITERS.keys()
+                       , default="csv"
+                       , help="'binary' is the same format"
+                              " as the server sends")
+    parser.add_argument("-c", "--calibration-frames", type=int, default=30
+                       , help="calibrate from this number of frames"
+                              " which have face")
+    parser.add_argument("-w", "--workers", type=int, default=0
+                       , help="run inference on worker processes")
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--layout", default=None
+                       , help="landmark layout name or JSON file")
+    args = parser.parse_args()
+
+    if args.layout is not None:
+        useLayout(getLayout(args.layout))
+
+    try:
+        source = openSource(args.input)
+    except FaceDetectionError as e:
+        print(e, file=sys.stderr)
+        return e.exitCode
+
+    binary = args.format == "binary"
+    if args.output == "-":
+        out = sys.stdout.buffer if binary else sys.stdout
+    else:
+        out = open(args.output, "wb" if binary else "w")
+
+    try:
+        summary = runBatch(source, WRITERS[args.format](out)
+                          , BatchSetting(args.calibration_frames
+                                        , args.chunk_size, args.workers))
+    finally:
+        source.release()
+        if out not in (sys.stdout, sys.stdout.buffer):
+            out.close()
+
+    print(summary.report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,46 +1,119 @@
+import atexit
 import cv2
-import dlib
-from contextlib import closing
-import secrets
-import socket
-from concurrent import futures
+import getpass
+import time
 from typing import (Optional, List, Tuple)
 
-from FaceDataServer.faceDetection import (faceCalibration, facemark)
-from FaceDataServer.Types import (RawFaceData,
-                                 FaceDetectionError, Face, ExitCode,
-                                 FaceData, Cv2Image, Coord,
+from FaceDataServer.faceDetection import (faceCalibration, FaceTracker
+                                         , autoCalibration
+                                         , TrackingSetting, DetectionSetting
+                                         , FACE_SELECTORS, useLayout
+                                         , currentLayout)
+from FaceDataServer.landmarkLayout import getLayout
+from FaceDataServer.calibration import (CalibrationSetting, CalibrationStore
+                                       , collectCalibration)
+from FaceDataServer.Types import (FaceDetectionError, Face, ExitCode,
+                                 FaceData, Cv2Image,
+                                 CapHasClosedError, LandmarkArray,
                                  defaultPortNumber, defaultGroupAddr
                                   )
+from FaceDataServer.pipeline import Pipeline, DropOldestQueue, Pacer
+from FaceDataServer.inferencePool import InferencePool
+from FaceDataServer.recording import LandmarkRecorder, Recording, replay
+from FaceDataServer.transport import (Transport, PacketWindow
+                                     , parseDestinations)
+from FaceDataServer.deltaStream import DeltaEncoder
+from FaceDataServer.filters import makeFilter
+from FaceDataServer.scheduler import Extrapolator, OutputScheduler
+from FaceDataServer.governor import Governor, GovernorSetting
+from FaceDataServer.presence import Presence, PresenceSetting
+from FaceDataServer.stats import Timings, RateMeter
+from FaceDataServer.metrics import Metrics, MetricsServer
+from FaceDataServer.logSetting import LogSetting, setupLogging
 from logging import getLogger, Logger
-import logging.config as loggingConfig
-import numpy as np
 import os
 from Debug import face2Image
 
 # Loggers {{{
-configuu = {"version": 1
-           , "handlers": {"console": {"class": "logging.StreamHandler"}
-                        , "file": {"class": "logging.FileHandler"
-                            , "filename": "faceDataServer.log"
-                            , "formatter": "simpleFormatter"}}
-           , "loggers": {"Servicer": {}}
-           , "root": {"level": "DEBUG"
-                     , "handlers": ["file"]
-                     , "formatters": ["simpleFormatter"]}
-           , "formatters":
-                {"simpleFormatter":
-                    {"format": "%(asctime)s - %(name)s "
-                               "- %(levelname)s - %(message)s"
-                     }
-                 }
-            }
-loggingConfig.dictConfig(configuu)
+# Records are written on listener thread, not to block the main loop
+logSetting = LogSetting(os.getenv('FDS_LOG_LEVEL', "DEBUG")
+                       , os.getenv('FDS_LOG_FILE', "faceDataServer.log")
+                       , int(os.getenv('FDS_LOG_MAX_BYTES', 10 * 1024 * 1024))
+                       , int(os.getenv('FDS_LOG_BACKUPS', 3))
+                       , os.getenv('FDS_LOG_FORMAT', "text") == "json"
+                       , float(os.getenv('FDS_LOG_DEBUG_RATE', 10)))
+logListener = setupLogging(logSetting)
+atexit.register(logListener.stop)
 logger: Logger = getLogger('main')
 logger_servicer: Logger = getLogger('Servicer')
 # }}}
 
 
+def serverMetrics(pipeline: Pipeline, transport: Transport, timings: Timings
+                 , tracker: Optional[FaceTracker], frameCounts: List[int]
+                 , fps: RateMeter
+                 , governor: Optional[Governor] = None
+                 , presence: Optional[Presence] = None) -> Metrics:
+    """ Return Metrics of the server
+
+        'tracker' is None if it runs on worker processes,
+        as its counters can't be read.
+    """
+    m = Metrics()
+    m.counter("fds_frames_captured_total", "Frames captured"
+             , lambda: pipeline.stages[0].latency.count)
+    for face, i in (("false", 0), ("true", 1)):
+        m.counter("fds_frames_total", "Frames processed"
+                 , lambda i=i: frameCounts[i], {"face": face})
+    m.gauge("fds_fps", "Frames processed per second in the latest"
+                       f" {fps.window:g} seconds", fps.rate)
+    if tracker is not None:
+        m.counter("fds_detector_invocations_total", "Face detector runs"
+                 , lambda: tracker.detectCount)
+        m.counter("fds_tracker_invocations_total", "Correlation tracker runs"
+                 , lambda: tracker.trackCount)
+    for s in pipeline.stages:
+        m.histogram("fds_stage_latency_seconds", "Latency of pipeline stages"
+                   , s.latency, {"stage": s.name})
+        if s.sink is not None:
+            m.counter("fds_queue_dropped_total", "Items dropped from queues"
+                     , lambda s=s: s.sink.dropped, {"stage": s.name})
+    for name, stats in timings.stats.items():
+        m.histogram("fds_step_latency_seconds"
+                   , "Latency of each step (FDS_TIMINGS)"
+                   , stats, {"step": name})
+    for d in transport.destinations:
+        labels = {"destination": str(d)}
+        m.counter("fds_packets_sent_total", "Packets sent"
+                 , lambda d=d: d.sent, labels)
+        m.counter("fds_packets_coalesced_total"
+                 , "Packets replaced before being sent"
+                 , lambda d=d: d.coalesced, labels)
+        m.counter("fds_send_errors_total", "Send errors"
+                 , lambda d=d: d.errors, labels)
+    if governor is not None:
+        m.gauge("fds_governor_level", "Quality level (0 is the best)"
+               , lambda: governor.level)
+        m.gauge("fds_governor_fps", "FPS frames are captured at"
+               , governor.currentFps)
+        m.gauge("fds_governor_cpu", "CPU seconds used per second"
+               , lambda: governor.cpu)
+    if presence is not None:
+        m.gauge("fds_presence_state", "0: face found, 1: lost, 2: idle"
+               , lambda: int(presence.state))
+        m.counter("fds_samples_suppressed_total"
+                 , "Samples not sent while idle"
+                 , lambda: presence.suppressed)
+        m.counter("fds_heartbeats_total", "Samples sent as heartbeats"
+                 , lambda: presence.heartbeats)
+    return m
+
+
+# Steps recorded in Timings. "total" is from capture to 'sendto'
+TIMING_STEPS = ("read", "facemark", "filter", "fromDPoints", "fixWithRatio"
+               , "get", "toBinary", "sendto", "total")
+
+
 def main():
     # Server setting
     server_address = "0.0.0.0"
@@ -50,63 +123,395 @@ def main():
     DEBUG = True if os.getenv('DEBUG', "NOTSET") != "NOTSET"\
                  else False
 
-    # Preparing camera
-    cap: cv2.VideoCapture = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        cap.release()
-    videoSize = (cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-                , cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-                 )
+    # Replay landmarks recorded with 'FDS_RECORD' instead of camera
+    # if 'FDS_REPLAY' is set. 'FDS_REPLAY_SPEED' 0 replays as fast as possible
+    recording: Optional[Recording] = None
+    if os.getenv('FDS_REPLAY') is not None:
+        recording = Recording(os.environ['FDS_REPLAY'])
+        replaySpeed = float(os.getenv('FDS_REPLAY_SPEED', 1.0))
 
-    # ========== calibration ==========
-    try:
-        calib, initialRatio = faceCalibration(cap)
-    except FaceDetectionError as e:
-        cap.release()
-        logger_servicer.info(f"ERROR: Unexpected things are happened: {e}")
-        logger_servicer.info("Aborting")
-        return
+    # 'FDS_LANDMARK_LAYOUT' is layout name or path to layout JSON file
+    if recording is not None:
+        # shape predictor isn't used
+        layout = getLayout(recording.layoutName)
+    else:
+        if os.getenv('FDS_LANDMARK_LAYOUT') is not None:
+            useLayout(getLayout(os.environ['FDS_LANDMARK_LAYOUT']))
+        layout = currentLayout()
+
+    # Setting 'FDS_REDETECT_INTERVAL' to 1 disables tracking
+    tracking = TrackingSetting(int(os.getenv('FDS_REDETECT_INTERVAL', 30))
+                              , float(os.getenv('FDS_TRACKING_CONFIDENCE'
+                                               , 7.0)))
+    detection = DetectionSetting(float(os.getenv('FDS_DETECT_SCALE', 0.5))
+                                , float(os.getenv('FDS_ROI_PADDING', 0.5)))
+    selector = FACE_SELECTORS[os.getenv('FDS_FACE_SELECTOR', "biggest")]()
+    tracker = FaceTracker(tracking, detection, selector)
+
+    # Smooth landmarks with 'FDS_FILTER' before converting them.
+    # e.g. "oneeuro:minCutoff=0.5,beta=0.1" (See 'filters.makeFilter')
+    landmarkFilter = makeFilter(os.getenv('FDS_FILTER', "none"))
+
+    if recording is not None:
+        cap = None
+        videoSize = recording.frameSize
+        calib, initialRatio = autoCalibration(recording.faces(30), layout)
+        replaying = replay(recording, replaySpeed or None)
+    else:
+        # Preparing camera
+        cap: cv2.VideoCapture = cv2.VideoCapture(0)
+        if not cap.isOpened():
+            cap.release()
+        videoSize = (cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+                    , cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+                     )
+
+        # ========== calibration ==========
+        # Result is saved for 'FDS_CALIBRATION_PROFILE' (user name by
+        # default) into 'FDS_CALIBRATION_FILE' if it's set, and loaded
+        # at next start unless 'FDS_RECALIBRATE' is set.
+        # 'FDS_CALIBRATION=auto' calibrates from frontal faces
+        # without asking user
+        store: Optional[CalibrationStore] = None
+        profile = os.getenv('FDS_CALIBRATION_PROFILE', getpass.getuser())
+        if os.getenv('FDS_CALIBRATION_FILE') is not None:
+            store = CalibrationStore(os.environ['FDS_CALIBRATION_FILE'])
+        saved = None
+        if store is not None\
+                and os.getenv('FDS_RECALIBRATE', "0") in ("", "0"):
+            saved = store.load(profile, layout.name)
+        try:
+            if saved is not None:
+                calib, initialRatio = saved
+                logger_servicer.info(f"Calibration of '{profile}' is loaded")
+            elif os.getenv('FDS_CALIBRATION', "manual") == "auto":
+                frames = int(os.getenv('FDS_CALIBRATION_FRAMES', 30))
+                timeout = float(os.getenv('FDS_CALIBRATION_TIMEOUT', 10))
+                calib, initialRatio = collectCalibration(
+                    cap, tracker, CalibrationSetting(frames, timeout))
+            else:
+                calib, initialRatio = faceCalibration(cap, tracker.detection)
+        except FaceDetectionError as e:
+            cap.release()
+            logger_servicer.info(f"ERROR: Unexpected things are happened: {e}")
+            logger_servicer.info("Aborting")
+            return
+        if store is not None and saved is None:
+            store.save(profile, layout.name, calib, initialRatio)
+
+    # Record landmarks into 'FDS_RECORD' if it's set
+    recorder: Optional[LandmarkRecorder] = None
+    if os.getenv('FDS_RECORD') is not None:
+        recorder = LandmarkRecorder(os.environ['FDS_RECORD'], layout.pointNum
+                                   , (round(videoSize[0])
+                                     , round(videoSize[1]))
+                                   , layout.name)
 
     logger_servicer.debug("Calibrated.")
     logger_servicer.debug(f"cap: {cap}")
 
+    # Time spent on each step is recorded if 'FDS_TIMINGS' is set,
+    # and logged every 'FDS_STATS_INTERVAL'
+    timings = Timings(TIMING_STEPS, enabled=os.getenv('FDS_TIMINGS', "0")
+                                             not in ("", "0"))
+    # one for each stage thread, reused for every frame
+    captureLap = timings.lap()
+    inferenceLap = timings.lap()
+    emitLap = timings.lap()
+
+    frameCounts = [0, 0]
+    fps = RateMeter()
+
+    # Frames are passed with 'time.monotonic()' they are captured at.
+    # UNIX time of it is sent with version 1.1 packets
+    clockOffset = time.time() - time.monotonic()
+
+    def capture() -> Optional[Tuple[float, Cv2Image]]:
+        if cap.isOpened() is not True:
+            raise CapHasClosedError(ExitCode.FILE_MAIN)
+        if pacer is not None:
+            pacer.pace()
+        captureLap.start()
+        ok, frame = cap.read()
+        captureLap("read")
+        return (time.monotonic(), frame) if ok else None
+
+    def toFaceData(landmark: Optional[LandmarkArray]
+                  , frame: Optional[Cv2Image], captured: float) -> FaceData:
+        if recorder is not None:
+            recorder.write(landmark, captured)
+        # [without face, with face]
+        frameCounts[landmark is not None] += 1
+        fps.tick()
+        inferenceLap.start()
+        if landmark is None:
+            # rate limited by 'FDS_LOG_DEBUG_RATE'
+            logger_servicer.debug("no face in frame")
+            landmarkFilter.reset()
+        else:
+            landmark = landmarkFilter.filter(landmark, captured)
+        inferenceLap("filter")
+        if landmark is None and not DEBUG:
+            # default Face is only for debug window
+            return FaceData.default()
+        face, ratio = Face.defaultWithRatio(initialRatio)\
+                       if landmark is None\
+                       else Face.fromDPointsWithRatio(landmark
+                                                     , layout.landmarkNum)
+        inferenceLap("fromDPoints")
+        face.fixWithRatio(initialRatio, ratio)
+        inferenceLap("fixWithRatio")
+
+        data: FaceData = FaceData.default()\
+                                if landmark is None\
+                                else FaceData.get(face, calib)
+        inferenceLap("get")
+
+        if DEBUG:
+            preview.put((face, frame))
+        return data
+
+    def convert(landmark: LandmarkArray) -> FaceData:
+        """ FaceData of predicted 'landmark', as 'toFaceData' does """
+        face, ratio = Face.fromDPointsWithRatio(landmark, layout.landmarkNum)
+        face.fixWithRatio(initialRatio, ratio)
+        return FaceData.get(face, calib)
+
+    def inference(captured: Tuple[float, Cv2Image]
+                  ) -> Tuple[float, FaceData, bool]:
+        timestamp, frame = captured
+        inferenceLap.start()
+        landmark = tracker.facemarkArray(frame)
+        inferenceLap("facemark")
+        return (timestamp, toFaceData(landmark, frame, timestamp)
+               , landmark is not None)
+
+    def captureToPool() -> None:
+        # frames are read into shared memory directly, and never copied
+        if cap.isOpened() is not True:
+            raise CapHasClosedError(ExitCode.FILE_MAIN)
+        if pacer is not None:
+            pacer.pace()
+        captureLap.start()
+        seq = pool.captureFrom(cap)
+        captureLap("read")
+        if seq is not None:
+            # indexed like ring slots, as results of overwritten
+            # frames are never returned
+            captureTimes[seq % len(captureTimes)] = time.monotonic()
+
+    def collect() -> Optional[Tuple[float, FaceData, bool]]:
+        result = pool.get(timeout=0.1)
+        if result is None:
+            return None
+        seq, landmark = result
+        # None if the frame has been overwritten already
+        frame = pool.ring.copy(seq) if DEBUG else None
+        captured = captureTimes[seq % len(captureTimes)]
+        return (captured, toFaceData(landmark, frame, captured)
+               , landmark is not None)
+
+    def replayed() -> Tuple[float, Optional[LandmarkArray]]:
+        # 'StopIteration' at the end of recording stops pipeline
+        _, landmark = next(replaying)
+        return (time.monotonic(), landmark)
+
+    # Each stage runs on its own thread. Stages are joined by queues
+    # which drop the oldest item, so that we always process
+    # the freshest frame.
+    pipeline = Pipeline(int(os.getenv('FDS_QUEUE_SIZE', 1)))
+    preview = DropOldestQueue(1)
+    statsInterval = float(os.getenv('FDS_STATS_INTERVAL', 10))
+    # Use process pool for inference if 'FDS_WORKERS' is set
+    workers = int(os.getenv('FDS_WORKERS', 0))
+    pool: Optional[InferencePool] = None
+    metricsServer: Optional[MetricsServer] = None
+
+    # 'FDS_IDLE_AFTER' > 0 stops sending every frame when no face has
+    # been seen for this seconds. Then frames are captured at
+    # 'FDS_IDLE_FPS', and sent every 'FDS_HEARTBEAT_INTERVAL' seconds
+    presence: Optional[Presence] = None
+    if float(os.getenv('FDS_IDLE_AFTER', 0)) > 0:
+        presence = Presence(
+            PresenceSetting(float(os.environ['FDS_IDLE_AFTER'])
+                          , float(os.getenv('FDS_HEARTBEAT_INTERVAL', 1.0))
+                          , float(os.getenv('FDS_IDLE_FPS', 2))))
+
+    # 'FDS_GOVERNOR' adjusts detection quality and FPS to keep
+    # latency and CPU usage inside budgets. Not for replay
+    governor: Optional[Governor] = None
+    if os.getenv('FDS_GOVERNOR', "0") not in ("", "0")\
+            and recording is None:
+        setting = GovernorSetting(float(os.getenv('FDS_LATENCY_BUDGET', 0.1))
+                                 , float(os.getenv('FDS_CPU_BUDGET', 1.0))
+                                 , float(os.getenv('FDS_MIN_FPS', 5))
+                                 , float(os.getenv('FDS_MAX_FPS', 30)))
+        # detection settings are fixed on worker processes
+        governor = Governor(setting, None if workers > 0 else tracker
+                           , presence)
+
+    # capture stage keeps to FPS of them
+    pacer: Optional[Pacer] = None
+    if governor is not None:
+        pacer = Pacer(governor.currentFps)
+    elif presence is not None:
+        pacer = Pacer(lambda: presence.limit(0))
+
+    # Packets are sent on transport thread to all of 'FDS_DESTINATIONS'.
+    # 'FDS_SEND_RATE' limits packets per second for each destination
+    sendRate = float(os.getenv('FDS_SEND_RATE', 0))
+    destinations = os.getenv('FDS_DESTINATIONS'
+                            , f"{multicast_group}:{server_port}")
+    transport = Transport(parseDestinations(destinations
+                                           , 1 / sendRate if sendRate > 0
+                                                          else 0.0)
+                         , server_address
+                         , timings if timings.enabled else None)
+
+    # 'FDS_PACKET_SAMPLES' > 0 sends version 1.1 packets, which carry
+    # this number of the latest samples. A packet is made every
+    # 'FDS_PACKET_EVERY' samples.
+    # 'FDS_PACKET_COMPACT' sends angles as 16-bit fixed-point
+    packetSamples = int(os.getenv('FDS_PACKET_SAMPLES', 0))
+    compact = os.getenv('FDS_PACKET_COMPACT', "0") not in ("", "0")
+    window: Optional[PacketWindow] = None
+    if packetSamples > 0:
+        window = PacketWindow(packetSamples
+                             , int(os.getenv('FDS_PACKET_EVERY', 1))
+                             , compact)
+
+    # 'FDS_DELTA' sends keyframes and deltas instead of them.
+    # Nothing is sent while nothing changes more than epsilons
+    encoder: Optional[DeltaEncoder] = None
+    if os.getenv('FDS_DELTA', "0") not in ("", "0"):
+        keyframeInterval = float(os.getenv('FDS_DELTA_KEYFRAME_INTERVAL', 1.0))
+        encoder = DeltaEncoder(keyframeInterval
+                              , float(os.getenv('FDS_DELTA_EPSILON', 0.001))
+                              , int(os.getenv('FDS_DELTA_PERCENT_EPSILON', 0)))
+
+    def emit(data: FaceData, captured: float, predicted: bool
+            , hasFace: bool) -> None:
+        emitLap.start()
+        if encoder is not None:
+            packet = encoder.encode(data, captured + clockOffset)
+        elif window is None:
+            packet = data.toBinary(compact)
+        else:
+            packet = window.add(data, captured + clockOffset, predicted
+                               , hasFace)
+        emitLap("toBinary")
+        if packet is not None:
+            transport.send(packet, None if predicted else captured)
+
+    # 'FDS_OUTPUT_RATE' > 0 sends packets at this rate, filling frames
+    # between results of inference with predictions of 'landmarkFilter'
+    # up to 'FDS_MAX_EXTRAPOLATION' seconds.
+    # Version 1.1 packets are used to flag predictions.
+    scheduler: Optional[OutputScheduler] = None
+    outputRate = float(os.getenv('FDS_OUTPUT_RATE', 0))
+    if outputRate > 0:
+        if encoder is not None:
+            raise ValueError("FDS_OUTPUT_RATE can't be used with FDS_DELTA")
+        if window is None:
+            window = PacketWindow(1, compact=compact)
+        maxExtrapolation = float(os.getenv('FDS_MAX_EXTRAPOLATION', 0.1))
+        scheduler = OutputScheduler(outputRate, emit
+                                   , Extrapolator(landmarkFilter, convert
+                                                 , maxExtrapolation))
+
+    def send(result: Tuple[float, FaceData, bool]) -> None:
+        captured, data, hasFace = result
+        if governor is not None:
+            governor.frame(time.monotonic() - captured)
+        if presence is not None and not presence.update(hasFace, captured):
+            return
+        if scheduler is not None:
+            scheduler.update(data, captured, hasFace)
+        else:
+            emit(data, captured, False, hasFace)
+
     try:
-        # Preparing socket
-        with closing(socket.socket(socket.AF_INET, socket.SOCK_DGRAM)) as sock:
-            # Some options. See `man setsockopt'
-            sock.setsockopt(socket.SOL_SOCKET
-                           , socket.SO_BROADCAST, 1)  # enable BROADCAST
-            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF
-                           , socket.inet_aton(server_address))
-
-            # ========== Main loop ==========
-            while True:
-                if cap.isOpened() is not True:
-                    break
-
-                _, frame = cap.read()
-                landmark: Optional[dlib.points] = facemark(frame)
-
-                face, ratio = Face.defaultWithRatio(initialRatio)\
-                               if landmark is None\
-                               else Face.fromDPointsWithRatio(landmark)
-                face.fixWithRatio(initialRatio, ratio)
-
-                data: FaceData = FaceData.default()\
-                                        if landmark is None\
-                                        else FaceData.get(face, calib)
-
-                sock.sendto(data.toBinary(), (multicast_group, server_port))
-
-                if DEBUG:
+        if recording is not None:
+            # every recorded frame is processed, however fast it's replayed
+            pipeline.stage("replay", replayed, block=True)
+            pipeline.stage("inference"
+                          , lambda r: (r[0], toFaceData(r[1], None, r[0])
+                                      , r[1] is not None)
+                          , block=True)
+        elif workers > 0:
+            pool = InferencePool(workers
+                                , (round(videoSize[0])
+                                  , round(videoSize[1]), 3)
+                                , tracker.detection
+                                , layout=layout)
+            captureTimes = [0.0] * pool.ring.slots
+            pipeline.stage("capture", captureToPool, sink=False)
+            pipeline.stage("inference", collect, source=False)
+        else:
+            pipeline.stage("capture", capture)
+            pipeline.stage("inference", inference)
+        pipeline.stage("send", send, sink=False)
+
+        # Serve metrics at 'http://*:FDS_METRICS_PORT/metrics' if it's set
+        if os.getenv('FDS_METRICS_PORT') is not None:
+            metrics = serverMetrics(pipeline, transport, timings
+                                   , None if pool is not None else tracker
+                                   , frameCounts, fps, governor, presence)
+            metricsServer = MetricsServer(metrics
+                                         , int(os.environ['FDS_METRICS_PORT']))
+            metricsServer.start()
+
+        # ========== Main loop ==========
+        transport.start()
+        if scheduler is not None:
+            scheduler.start()
+        pipeline.start()
+        lastReport = time.monotonic()
+        while pipeline.isRunning():
+            if DEBUG:
+                shown = preview.get(timeout=0.1)
+                if shown is not None:
+                    face, frame = shown
                     cv2.imshow('face wire test'
                               , face2Image(videoSize, face, frame))
                     cv2.waitKey(1)
+            else:
+                pipeline.wait(0.1)
+
+            if time.monotonic() - lastReport > statsInterval:
+                logger_servicer.info(pipeline.report())
+                logger_servicer.info(transport.report())
+                if encoder is not None:
+                    logger_servicer.info(encoder.report())
+                if scheduler is not None:
+                    logger_servicer.info(scheduler.report())
+                if governor is not None:
+                    logger_servicer.info(governor.report())
+                if presence is not None:
+                    logger_servicer.info(presence.report())
+                if timings.enabled:
+                    logger_servicer.info(timings.report())
+                lastReport = time.monotonic()
+
+        if pipeline.error() is not None:
+            logger_servicer.info(f"Pipeline stopped: {pipeline.error()}")
 
     except KeyboardInterrupt:
         pass
     finally:
-        cap.release()
+        pipeline.stop()
+        pipeline.join(1)
+        if scheduler is not None:
+            scheduler.close()
+        transport.close()
+        if metricsServer is not None:
+            metricsServer.close()
+        if pool is not None:
+            pool.close()
+        if cap is not None:
+            cap.release()
+        if recorder is not None:
+            recorder.close()
         cv2.destroyAllWindows()
 
 
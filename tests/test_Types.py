@@ -4,10 +4,14 @@ from hypothesis import given, assume
 import hypothesis.strategies as st
 import dlib
 import math
+import numpy
 
-from FaceDataServer.Types import (RawFaceData, FaceRotations, Part, Coord
+import baselineTypes
+import FaceDataServer.Types as Types
+from FaceDataServer.Types import (RawFaceData, Part, Coord
                                  , AbsoluteCoord, RelativeCoord
-                                 , Face, Eye, Mouth, Nose, EyeBrow)
+                                 , Face, Eye, Mouth, Nose, EyeBrow
+                                 , FaceData, Packet, ANGLE_SCALE)
 from conftest import (face_front, face_right, face_left
                      , face_upside, face_bottom
                      , face_lean_left, face_lean_right
@@ -240,6 +244,52 @@ def test_Face_fromDPoints():
     assert Face.fromDPoints(points) == correct
 
 
+def test_Face_fromDPoints_array():
+    points = dlib.dpoints([dlib.dpoint(x, x * 2) for x in range(194)])
+    array = numpy.array([(x, x * 2) for x in range(194)], numpy.float64)
+
+    assert Face.fromDPoints(array) == Face.fromDPoints(points)
+    assert Face.fromDPointsWithRatio(array)[1]\
+        == Face.fromDPointsWithRatio(points)[1]
+
+
+def _perFrame(module, points, calib, initialRatio):
+    """ Per-frame conversion of 'main': landmarks to FaceData """
+    face, ratio = module.Face.fromDPointsWithRatio(points)
+    face.fixWithRatio(initialRatio, ratio)
+    return module.FaceData.get(face, calib)
+
+
+def _perFrameInput(module):
+    """ '(points, calib, initialRatio)' of the same frame for 'module' """
+    rng = numpy.random.default_rng(0)
+    calibPoints = rng.random((194, 2)) * 480
+    points = calibPoints + rng.normal(0, 5, calibPoints.shape)
+    if module is baselineTypes:
+        # it took 'facemark' result as it is
+        calibPoints, points = [dlib.dpoints([dlib.dpoint(x, y)
+                                             for x, y in p.tolist()])
+                               for p in (calibPoints, points)]
+    face, initialRatio = module.Face.fromDPointsWithRatio(calibPoints)
+    return (points, module.RawFaceData.get(face), initialRatio)
+
+
+def _values(d) -> Tuple:
+    return (d.face_x_radian, d.face_y_radian, d.face_z_radian
+           , d.mouth_height_percent, d.mouth_width_percent
+           , d.left_eye_percent, d.right_eye_percent)
+
+
+@pytest.mark.benchmark(group="per-frame conversion")
+@pytest.mark.parametrize("module", [baselineTypes, Types]
+                        , ids=["baseline", "current"])
+def test_perFrame_benchmark(benchmark, module):
+    result = benchmark(_perFrame, module, *_perFrameInput(module))
+    expected = _perFrame(baselineTypes, *_perFrameInput(baselineTypes))
+
+    assert _values(result) == pytest.approx(_values(expected))
+
+
 # is this good test?
 @given(FaceStrategies, finiteFloatCallable)
 def test_Face_mul_and_div(f, d):
@@ -303,3 +353,131 @@ def test_RawFaceData_get(face, eD, fH, fC):
             " correctRawFaceData.faceCenter.y:"\
             " [{correctRawFaceData.faceCenter.y}]"
 # }}}
+
+
+# FaceData {{{
+@pytest.mark.parametrize("initialRatio", [None, 1.3])
+def test_FaceData_getBatch(initialRatio):
+    rng = numpy.random.default_rng(0)
+    base = rng.random((194, 2)) * 200 + 100
+    frames = base[None] + rng.normal(0, 8, (50, 194, 2))
+    calib = RawFaceData.get(Face.fromDPoints(base))
+
+    result = FaceData.getBatch(frames, calib, initialRatio)
+
+    assert result.shape == (50, 7)
+    for frame, row in zip(frames, result):
+        face, ratio = Face.fromDPointsWithRatio(frame)
+        if initialRatio is not None:
+            face.fixWithRatio(initialRatio, ratio)
+        expected = FaceData.get(face, calib)
+        assert numpy.allclose(row, expected.toRow(), rtol=0, atol=1e-12)
+        assert numpy.array_equal(FaceData.fromRow(row).toRow(), row)
+
+
+def test_FaceData_getBatch_noFace():
+    frames = numpy.random.default_rng(0).random((2, 194, 2)) * 200
+    frames[1, 10] = numpy.nan
+    calib = RawFaceData.get(Face.fromDPoints(frames[0]))
+
+    result = FaceData.getBatch(frames, calib)
+
+    assert numpy.array_equal(result[1], FaceData.default().toRow())
+# }}}
+
+
+# Packet {{{
+FaceDataStrategy = st.builds(FaceData
+                            , st.floats(allow_nan=False)
+                            , st.floats(allow_nan=False)
+                            , st.floats(allow_nan=False)
+                            , st.integers(0, 255), st.integers(0, 255)
+                            , st.integers(0, 255), st.integers(0, 255))
+
+
+@given(st.integers(0, (1 << 32) - 1), st.floats(allow_nan=False)
+      , st.lists(FaceDataStrategy, min_size=1, max_size=255))
+def test_Packet_roundTrip(seq, timestamp, samples):
+    packet = Packet(seq, timestamp, tuple(samples))
+    result = Packet.fromBinary(packet.toBinary())
+
+    assert (result.seq, result.timestamp, result.flags) == (seq, timestamp, 0)
+    assert [d.toRow().tolist() for d in result.samples]\
+            == [d.toRow().tolist() for d in samples]
+
+
+@given(FaceDataStrategy)
+def test_Packet_fromBinary_v1_0(data):
+    result = Packet.fromBinary(data.toBinary())
+
+    assert (result.seq, result.timestamp) == (None, None)
+    assert len(result.samples) == 1
+    assert result.samples[0].toRow().tolist() == data.toRow().tolist()
+
+
+AngleStrategy = st.floats(-math.pi / 2, math.pi / 2)
+CompactFaceDataStrategy = st.builds(FaceData
+                                   , AngleStrategy, AngleStrategy
+                                   , AngleStrategy
+                                   , st.integers(0, 255), st.integers(0, 255)
+                                   , st.integers(0, 255), st.integers(0, 255))
+
+
+def assert_quantized(result, data):
+    """ 'result' is 'data' through compact encoding """
+    legacy = FaceData.fromBinary(data.toBinary())
+    for r, l in zip(result.toRow()[:3], legacy.toRow()[:3]):
+        assert abs(r - l) <= 0.5 / ANGLE_SCALE + 1e-12
+    assert result.toRow()[3:].tolist() == legacy.toRow()[3:].tolist()
+
+
+@given(CompactFaceDataStrategy)
+def test_FaceData_toBinary_compact(data):
+    b = data.toBinary(compact=True)
+
+    assert len(b) == 11
+    assert_quantized(FaceData.fromBinary(b), data)
+
+
+@given(st.integers(0, (1 << 32) - 1), st.floats(allow_nan=False)
+      , st.lists(CompactFaceDataStrategy, min_size=1, max_size=255))
+def test_Packet_roundTrip_compact(seq, timestamp, samples):
+    b = Packet(seq, timestamp, tuple(samples), compact=True).toBinary()
+    result = Packet.fromBinary(b)
+
+    assert len(b) == 15 + 10 * len(samples)
+    assert (result.seq, result.timestamp, result.compact)\
+            == (seq, timestamp, True)
+    for r, d in zip(result.samples, samples):
+        assert_quantized(r, d)
+
+
+@pytest.mark.parametrize("radian, expected", [(math.inf, math.pi / 2)
+                                             , (-4.0, -math.pi / 2)
+                                             , (0.0, 0.0)])
+def test_FaceData_toBinary_compact_saturate(radian, expected):
+    data = FaceData(radian, 0.0, 0.0, 100, 100, 100, 100)
+    result = FaceData.fromBinary(data.toBinary(compact=True))
+    assert math.isclose(result.face_x_radian, expected, abs_tol=1e-12)
+
+
+def test_Packet_seqWrapsAround():
+    packet = Packet(1 << 32, 0.0, (FaceData.default(),))
+    assert Packet.fromBinary(packet.toBinary()).seq == 0
+
+
+@pytest.mark.parametrize("b", [b"", b"\x20" + bytes(30), b"\x11" + bytes(10)
+                              , b"\x11" + bytes(14) + b"\x02" + bytes(29)
+                              , b"\x12" + bytes(30), b"\x10" + bytes(10)
+                              , b"\x13" + bytes(14) + b"\x02" + bytes(30)])
+def test_Packet_fromBinary_invalid(b):
+    with pytest.raises(ValueError):
+        Packet.fromBinary(b)
+
+
+def test_Packet_toBinary_invalid():
+    with pytest.raises(ValueError):
+        Packet(0, 0.0, ()).toBinary()
+    with pytest.raises(ValueError):
+        Packet(None, None, (FaceData.default(),)).toBinary()
+# }}}
@@ -0,0 +1,69 @@
+import io
+import pytest
+import cv2
+from FaceDataServer.batch import (BatchSetting, runBatch
+                                 , CsvWriter, BinaryWriter)
+from FaceDataServer.source import ImageDirSource
+from FaceDataServer.Types import FaceData
+from conftest import faceFrame, noFaceFrame
+
+
+@pytest.fixture
+def imageDir(tmp_path):
+    noface = cv2.resize(noFaceFrame, (faceFrame.shape[1], faceFrame.shape[0]))
+    for i in range(6):
+        cv2.imwrite(str(tmp_path / f"{i}.png")
+                   , noface if i == 0 else faceFrame)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_runBatch_csv(imageDir, workers):
+    out = io.StringIO()
+    summary = runBatch(ImageDirSource(imageDir), CsvWriter(out)
+                      , BatchSetting(calibrationFrames=2, chunkSize=4
+                                    , workers=workers))
+    lines = out.getvalue().splitlines()
+
+    assert summary.frames == 6
+    assert summary.noFace == 1
+    assert len(lines) == 7
+    assert lines[0].startswith("frame,face,face_x_radian")
+    # no face
+    assert lines[1] == "0,0,0.0,0.0,0.0,100,100,100,100"
+    assert all(line.split(",")[1] == "1" for line in lines[2:])
+    assert summary.stats["inference"].count == 6
+
+
+def test_runBatch_binary(imageDir):
+    out = io.BytesIO()
+    summary = runBatch(ImageDirSource(imageDir), BinaryWriter(out)
+                      , BatchSetting(calibrationFrames=100))
+    packet = len(FaceData.default().toBinary())
+
+    # calibration is done with all faces when there're
+    # less faces than 'calibrationFrames'
+    assert summary.frames == 6
+    assert len(out.getvalue()) == packet * 6
+    assert out.getvalue()[:packet] == FaceData.default().toBinary()
+
+
+def test_runBatch_unreadable(imageDir):
+    with open(f"{imageDir}/3a.png", "wb") as f:
+        f.write(b"broken")
+    out = io.BytesIO()
+    summary = runBatch(ImageDirSource(imageDir), BinaryWriter(out)
+                      , BatchSetting(calibrationFrames=2))
+
+    # frames after it are processed
+    assert (summary.frames, summary.skipped) == (6, 1)
+    assert "skipped: 1" in summary.report()
+
+
+def test_runBatch_noFace(tmp_path):
+    cv2.imwrite(str(tmp_path / "0.png"), noFaceFrame)
+    out = io.BytesIO()
+    summary = runBatch(ImageDirSource(str(tmp_path)), BinaryWriter(out))
+
+    assert summary.noFace == 1
+    assert out.getvalue() == FaceData.default().toBinary()
@@ -0,0 +1,187 @@
+import dlib
+import numpy
+import pytest
+from unittest import mock
+from FaceDataServer.calibration import (CalibrationSetting, isFrontal
+                                       , robustCalibration
+                                       , collectCalibration
+                                       , CalibrationStore)
+from FaceDataServer.faceDetection import (FaceTracker, TrackingSetting
+                                         , DetectionSetting, autoCalibration
+                                         , currentLayout, _normalizeArray)
+from FaceDataServer.Types import CalibrationTimeoutError, CapHasClosedError
+from conftest import faceFrame, MockedCap
+
+
+def absoluteFace():
+    """ Frontal face of 200px width in absolute coordinates, sorted.
+        Unnamed points are on nose
+    """
+    points = {"TEMPLE_LEFT": (100, 200), "TEMPLE_RIGHT": (300, 200)
+             , "CHIN_CENTER": (200, 380), "NOSE_BOTTOM": (200, 260)
+             , "NOSE_R": (185, 255), "NOSE_L": (215, 255)
+             , "MOUSE_R": (170, 310), "MOUSE_L": (230, 310)
+             , "MOUSE_TOP": (200, 300), "MOUSE_BOTTOM": (200, 320)
+             , "LEFT_EYE_R": (170, 200), "LEFT_EYE_L": (130, 200)
+             , "LEFT_EYE_TOP": (150, 192), "LEFT_EYE_BOTTOM": (150, 208)
+             , "RIGHT_EYE_L": (230, 200), "RIGHT_EYE_R": (270, 200)
+             , "RIGHT_EYE_TOP": (250, 192), "RIGHT_EYE_BOTTOM": (250, 208)
+             , "EYEBROW_LEFT_R": (175, 175), "EYEBROW_LEFT_L": (125, 175)
+             , "EYEBROW_LEFT_TOP": (150, 165)
+             , "EYEBROW_LEFT_BOTTOM": (150, 180)
+             , "EYEBROW_RIGHT_L": (225, 175), "EYEBROW_RIGHT_R": (275, 175)
+             , "EYEBROW_RIGHT_TOP": (250, 165)
+             , "EYEBROW_RIGHT_BOTTOM": (250, 180)}
+    layout = currentLayout()
+    lm = numpy.tile(numpy.array(points["NOSE_BOTTOM"], numpy.float64)
+                   , (layout.pointNum, 1))
+    for name, xy in points.items():
+        lm[layout.landmarkNum[name]] = xy
+    return lm
+
+
+def predictorOrder(lm):
+    """ Unsort 'lm' into order of shape predictor output """
+    raw = numpy.empty_like(lm)
+    raw[currentLayout().sortOrder] = lm
+    return raw
+
+
+def normalized(lm):
+    """ 'facemarkArray' style landmark of absolute 'lm' """
+    return _normalizeArray(predictorOrder(lm))
+
+
+class FakeTracker:
+    def __init__(self, landmark):
+        self.landmark = landmark
+        self.calls = 0
+
+    def facemarkArray(self, frame):
+        self.calls += 1
+        return self.landmark
+
+
+absolute = absoluteFace()
+landmark = normalized(absolute)
+
+
+def rotate(lm, radian):
+    """ Rotate absolute 'lm' and return it normalized """
+    c, s = numpy.cos(radian), numpy.sin(radian)
+    center = lm.mean(axis=0)
+    return normalized((lm - center) @ numpy.array([[c, s], [-s, c]])
+                      + center)
+
+
+# isFrontal {{{
+def test_isFrontal():
+    assert isFrontal(landmark)
+    assert not isFrontal(rotate(absolute, 0.3))
+    assert isFrontal(rotate(absolute, 0.3), CalibrationSetting(maxRoll=0.4))
+    # only relative positions matter
+    moved = landmark.copy()
+    moved[currentLayout().centerIndex] += (1000, 500)
+    assert isFrontal(moved)
+
+    # nose moved to a side
+    turned = absolute.copy()
+    n = currentLayout().landmarkNum
+    width = abs(turned[n["TEMPLE_RIGHT"], 0] - turned[n["TEMPLE_LEFT"], 0])
+    turned[n["NOSE_BOTTOM"], 0] += width * 0.3
+    assert not isFrontal(normalized(turned))
+# }}}
+
+
+# robustCalibration {{{
+def test_robustCalibration():
+    rng = numpy.random.default_rng(0)
+    good = [landmark + rng.normal(0, 0.5, landmark.shape) for _ in range(9)]
+    # mouth wide open
+    bad = landmark.copy()
+    bad[currentLayout().landmarkNum["MOUSE_BOTTOM"], 1] += 30
+
+    result, ratio = robustCalibration(good + [bad])
+    expected, expectedRatio = autoCalibration(good)
+    assert abs(result.mouthHeight - expected.mouthHeight) < 0.5
+    assert abs(result.eyeDistance - expected.eyeDistance) < 0.5
+    assert abs(ratio - expectedRatio) < 0.005
+    # plain mean is pulled by it
+    assert autoCalibration(good + [bad])[0].mouthHeight\
+        > expected.mouthHeight + 2
+
+
+def test_robustCalibration_same():
+    result, ratio = robustCalibration([landmark, landmark])
+    expected, expectedRatio = autoCalibration([landmark])
+    assert numpy.isclose(result.faceHeigh, expected.faceHeigh)
+    assert numpy.isclose(ratio, expectedRatio)
+
+
+def test_robustCalibration_empty():
+    with pytest.raises(ValueError):
+        robustCalibration([])
+# }}}
+
+
+# collectCalibration {{{
+def test_collectCalibration():
+    tracker = FakeTracker(landmark)
+    result, ratio = collectCalibration(MockedCap(True, faceFrame), tracker
+                                      , CalibrationSetting(frames=3))
+    expected, expectedRatio = autoCalibration([landmark])
+    assert numpy.isclose(result.eyeDistance, expected.eyeDistance)
+    assert numpy.isclose(ratio, expectedRatio)
+    # each frame goes through tracker once
+    assert tracker.calls == 3
+
+
+def test_collectCalibration_tracker():
+    """ Frontal face goes through 'FaceTracker' and is accepted """
+    shape = mock.Mock()
+    shape.parts.return_value = dlib.dpoints(
+        [dlib.dpoint(x, y) for x, y in predictorOrder(absolute).tolist()])
+    tracker = FaceTracker(TrackingSetting(1), DetectionSetting())
+    with mock.patch("FaceDataServer.faceDetection._predictor"
+                   , return_value=shape):
+        result, ratio = collectCalibration(MockedCap(True, faceFrame)
+                                          , tracker
+                                          , CalibrationSetting(frames=3))
+    expected, expectedRatio = autoCalibration([landmark])
+    assert numpy.isclose(result.eyeDistance, expected.eyeDistance)
+    assert numpy.isclose(ratio, expectedRatio)
+
+
+@pytest.mark.parametrize("found", [None, rotate(absolute, 0.5)])
+def test_collectCalibration_timeout(found):
+    tracker = FakeTracker(found)
+    with pytest.raises(CalibrationTimeoutError):
+        collectCalibration(MockedCap(True, faceFrame), tracker
+                          , CalibrationSetting(frames=3, timeout=0.2))
+    assert tracker.calls > 0
+
+
+def test_collectCalibration_closed():
+    with pytest.raises(CapHasClosedError):
+        collectCalibration(MockedCap(False, faceFrame)
+                          , FakeTracker(landmark))
+# }}}
+
+
+# CalibrationStore {{{
+def test_CalibrationStore(tmp_path):
+    calib, ratio = autoCalibration([landmark])
+    store = CalibrationStore(str(tmp_path / "dir" / "calibration.json"))
+    assert store.load("alice", "helen") is None
+
+    store.save("alice", "helen", calib, ratio)
+    store.save("bob", "ibug68", calib, ratio * 2)
+    loaded, loadedRatio = store.load("alice", "helen")
+    assert loaded.eyeDistance == calib.eyeDistance
+    assert loaded.faceCenter.x == calib.faceCenter.x
+    assert loaded.rightEyeHeight == calib.rightEyeHeight
+    assert loadedRatio == ratio
+    assert store.load("bob", "ibug68")[1] == ratio * 2
+    # saved for other layout
+    assert store.load("bob", "helen") is None
+# }}}
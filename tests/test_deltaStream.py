@@ -0,0 +1,100 @@
+import math
+import pytest
+from hypothesis import given
+import hypothesis.strategies as st
+
+from FaceDataServer.deltaStream import DeltaEncoder, DeltaDecoder
+from FaceDataServer.Types import FaceData, ANGLE_SCALE
+
+AngleStrategy = st.floats(-math.pi / 2, math.pi / 2)
+FaceDataStrategy = st.builds(FaceData
+                            , AngleStrategy, AngleStrategy, AngleStrategy
+                            , st.integers(0, 150), st.integers(0, 150)
+                            , st.integers(0, 150), st.integers(0, 150))
+
+
+def frame(x=0.0, mouth=100):
+    return FaceData(x, 0.0, 0.0, mouth, 100, 100, 100)
+
+
+def assert_close(result, data, angleEpsilon, percentEpsilon):
+    r, d = result.toRow(), data.toRow()
+    for i in range(3):
+        assert abs(r[i] - d[i]) <= angleEpsilon + 0.5 / ANGLE_SCALE + 1e-12
+    for i in range(3, 7):
+        assert abs(r[i] - d[i]) <= percentEpsilon
+
+
+@given(st.lists(FaceDataStrategy, min_size=1, max_size=50)
+      , st.floats(0, 0.1), st.integers(0, 10))
+def test_roundTrip(frames, angleEpsilon, percentEpsilon):
+    encoder = DeltaEncoder(0.5, angleEpsilon, percentEpsilon)
+    decoder = DeltaDecoder()
+    for i, data in enumerate(frames):
+        packet = encoder.encode(data, 1000.0 + i * 0.03)
+        if packet is not None:
+            seq, timestamp, _ = decoder.decode(packet)
+            assert seq == encoder.seq
+            assert math.isclose(timestamp, 1000.0 + i * 0.03, abs_tol=1e-3)
+        # what receiver has is always close to the latest frame
+        assert_close(decoder.current(), data
+                    , angleEpsilon, percentEpsilon)
+    assert decoder.lost == 0
+
+
+def test_skip():
+    encoder = DeltaEncoder(1.0, angleEpsilon=0.01)
+    assert encoder.encode(frame(), 0.0) is not None
+    assert encoder.encode(frame(0.005), 0.1) is None
+    assert encoder.encode(frame(0.005), 0.2) is None
+    delta = encoder.encode(frame(0.02), 0.3)
+    # header and one int16
+    assert len(delta) == 10
+    # keyframe even if nothing has changed
+    assert len(encoder.encode(frame(0.02), 1.0)) == 23
+    assert (encoder.keyframes, encoder.deltas, encoder.skipped) == (2, 1, 2)
+
+
+def test_tooBigDelta():
+    encoder = DeltaEncoder()
+    encoder.encode(frame(mouth=0), 0.0)
+    # percentage diff doesn't fit in int8
+    assert len(encoder.encode(frame(mouth=150), 0.1)) == 23
+
+
+def test_resync():
+    encoder = DeltaEncoder(1.0)
+    decoder = DeltaDecoder()
+    packets = [encoder.encode(frame(i * 0.1), i * 0.25) for i in range(6)]
+
+    assert decoder.decode(packets[0]) is not None
+    assert decoder.decode(packets[1]) is not None
+    # packets[2] is lost
+    assert decoder.decode(packets[3]) is None
+    assert decoder.lost == 1
+    # duplicated
+    assert decoder.decode(packets[3]) is None
+    # packets[4] is keyframe
+    seq, timestamp, data = decoder.decode(packets[4])
+    assert (seq, timestamp) == (4, 1.0)
+    assert math.isclose(data.face_x_radian, 0.4, abs_tol=1e-4)
+    seq, _, data = decoder.decode(packets[5])
+    assert math.isclose(data.face_x_radian, 0.5, abs_tol=1e-4)
+
+
+def test_restart():
+    decoder = DeltaDecoder()
+    encoder = DeltaEncoder()
+    for i in range(5):
+        decoder.decode(encoder.encode(frame(i * 0.1), i * 0.1))
+    # new encoder starts from seq 0 with keyframe
+    assert decoder.decode(DeltaEncoder().encode(frame(), 10.0)) is not None
+
+
+@pytest.mark.parametrize("b", [b"", b"\x10" + bytes(30), b"\x14" + bytes(10)
+                              , b"\x15" + bytes(5)
+                              , b"\x15" + bytes(6) + b"\x01"
+                              , b"\x15" + bytes(6) + b"\x80"])
+def test_decode_invalid(b):
+    with pytest.raises(ValueError):
+        DeltaDecoder().decode(b)
@@ -1,102 +1,70 @@
 import pytest
 from unittest import mock
-from hypothesis import given
-import hypothesis.strategies as st
-from timeout_decorator import timeout, TimeoutError
-from typing import Tuple
-from FaceDataServer.faceDetection import (_isFaceExist, _getBiggestFace
-                                         , _normalization
-                                         , facemark, _waitUntilFaceDetect
-                                         , faceCalibration, _toRelative)
-from conftest import (faceFrame, noFaceFrame, MockedCap, finiteFloatCallable)
-from FaceDataServer.Types import RawFaceData, CapHasClosedError
+from FaceDataServer.faceDetection import (facemark, _waitUntilFacemark
+                                         , faceCalibration
+                                         , autoCalibration
+                                         , FaceTracker, TrackingSetting
+                                         , DetectionSetting, _detectFaces
+                                         , BiggestFace, ClosestFace
+                                         , LockedFace, facemarkArray
+                                         , _normalizeArray, _landmarkArray
+                                         , currentLayout)
+from conftest import faceFrame, noFaceFrame, MockedCap
+from FaceDataServer.Types import RawFaceData, CapHasClosedError, Face
 import dlib
 import numpy
 
 
-# isFaceExist {{{
-@pytest.mark.parametrize("faceNum,expected", [(0, False), (1, True)])
-def check_isFaceExist(faceNum: int, expected: bool):
-    with mock.patch('FaceDataServer.faceDetection._detector',
-                    return_value=dlib.rectangles(faceNum)):
-        assert _isFaceExist(numpy.ndarray(0)) == expected
-# }}}
-
-
-# waitUntilFaceDetect {{{
-@pytest.mark.parametrize("frame", [faceFrame, noFaceFrame])
-def test_waitUntilFaceDetect_CapHasClosedError(frame):
-    cap = MockedCap(False, frame)
-
+# waitUntilFacemark {{{
+def test_waitUntilFacemark_CapHasClosedError():
     with pytest.raises(CapHasClosedError):
-        _waitUntilFaceDetect(cap)
+        _waitUntilFacemark(MockedCap(False, faceFrame))
 
 
-def test_waitUntilFaceDetect_faceFound():
-    cap = MockedCap(True, faceFrame)
+def test_waitUntilFacemark_faceFound():
+    landmark = _waitUntilFacemark(MockedCap(True, faceFrame))
 
-    assert _waitUntilFaceDetect(cap).all() == faceFrame.all()
+    assert numpy.array_equal(landmark, facemarkArray(faceFrame))
+# }}}
 
 
-def test_waitUntilFaceDetect_faceNotFound():
-    cap = MockedCap(True, noFaceFrame)
+# Face selection policies {{{
+def _rect(x: int, y: int, width: int) -> dlib.rectangle:
+    return dlib.rectangle(x, y, x + width, y + width)
 
-    @timeout(10)
-    def _run():
-        _waitUntilFaceDetect(cap)
 
-    with pytest.raises(TimeoutError):
-        _run()
-# }}}
+faces = dlib.rectangles([_rect(0, 0, 50), _rect(200, 0, 100)
+                        , _rect(0, 200, 80)])
 
 
-# getBiggestFace {{{
-def test_getBiggestFace():
-    emptyPoints = dlib.dpoints(194)
+def test_BiggestFace():
+    assert BiggestFace().select(faces, None) == _rect(200, 0, 100)
+    assert BiggestFace().select(dlib.rectangles(), None) is None
 
-    biggest = dlib.dpoints(40)
-    biggest.append(dlib.dpoint(100, 100))
-    biggest.resize(194 + 1)
-    faces = ([emptyPoints] * 5) + [biggest]
 
-    assert _getBiggestFace(faces) == biggest
+def test_ClosestFace():
+    assert ClosestFace().select(faces, _rect(10, 190, 60))\
+        == _rect(0, 200, 80)
+    # fallback to biggest
+    assert ClosestFace().select(faces, None) == _rect(200, 0, 100)
+    assert ClosestFace().select(dlib.rectangles(), _rect(0, 0, 10)) is None
 
 
-def test_getBiggestFace_noface():
-    assert _getBiggestFace([]) == dlib.dpoints(194)
-# }}}
+def test_LockedFace():
+    selector = LockedFace()
+    assert selector.select(faces, None) == _rect(200, 0, 100)
+    # The locked face is lost, but others shouldn't be selected
+    others = dlib.rectangles([_rect(0, 0, 50), _rect(0, 200, 80)])
+    assert selector.select(others, None) is None
+    # It comes back
+    assert selector.select(faces, None) == _rect(200, 0, 100)
+
+    selector.unlock()
+    assert selector.select(others, None) == _rect(0, 200, 80)
 
 
-# _normalization {{{
-def test_normalization():
-    # inList {{{
-    inList = [0, 1, 10, 86, 87, 88, 89, 90, 91, 92,
-              93, 94, 95, 11, 96, 97, 98, 99, 114, 115,
-              116, 117, 118, 119, 12, 120, 121, 122, 123, 124,
-              125, 126, 127, 128, 129, 13, 130, 131, 132, 133,
-              134, 135, 136, 137, 138, 139, 14, 140, 141, 142,
-              143, 144, 145, 146, 147, 148, 149, 15, 150, 151,
-              152, 153, 154, 155, 156, 157, 158, 159, 16, 160,
-              161, 162, 163, 164, 165, 166, 167, 168, 169, 17,
-              170, 171, 172, 173, 174, 175, 176, 177, 178, 179,
-              18, 180, 181, 182, 183, 184, 185, 186, 187, 188,
-              189, 19, 190, 191, 192, 193, 2, 20, 21, 22,
-              23, 24, 25, 26, 27, 28, 29, 3, 30, 31,
-              32, 33, 34, 35, 36, 37, 38, 39, 4, 40,
-              41, 42, 43, 44, 45, 46, 47, 48, 49, 5,
-              50, 51, 52, 53, 54, 55, 56, 57, 58, 59,
-              6, 60, 61, 62, 63, 64, 65, 66, 67, 68,
-              69, 7, 70, 71, 72, 73, 74, 75, 76, 77,
-              78, 79, 8, 80, 81, 82, 83, 84, 85, 100,
-              101, 102, 103, 9, 104, 105, 106, 107, 108, 109,
-              110 , 111 , 112 , 113]
-    # }}}
-
-    testPoints = dlib.dpoints(list(map(lambda n: dlib.dpoint(n, n),
-                              inList)))
-    correct = dlib.dpoints(list(map(lambda n: dlib.dpoint(n, n),
-                                    list(range(0, 194)))))
-    assert _normalization(testPoints) == correct
+def test_facemark_selector():
+    assert facemark(faceFrame, LockedFace()) == facemark(faceFrame)
 # }}}
 
 
@@ -115,6 +83,27 @@ def test_faceCalibration():
 # }}}
 
 
+# autoCalibration {{{
+def test_autoCalibration():
+    landmark = facemarkArray(faceFrame)
+    face, ratio = Face.fromDPointsWithRatio(landmark)
+    expected = RawFaceData.get(face)
+
+    result, resultRatio = autoCalibration([landmark, landmark])
+
+    assert numpy.isclose(result.eyeDistance, expected.eyeDistance)
+    assert numpy.isclose(result.faceHeigh, expected.faceHeigh)
+    assert numpy.isclose(result.faceCenter.x, expected.faceCenter.x)
+    assert numpy.isclose(result.mouthWidth, expected.mouthWidth)
+    assert numpy.isclose(resultRatio, ratio)
+
+
+def test_autoCalibration_empty():
+    with pytest.raises(ValueError):
+        autoCalibration([])
+# }}}
+
+
 # facemark {{{
 def test_facemark():
     # definition of correct_points {{{
@@ -181,18 +170,137 @@ def test_facemark_noface():
 # }}}
 
 
-# _toRelative {{{
-@given(st.tuples(finiteFloatCallable, finiteFloatCallable)
-      , st.tuples(finiteFloatCallable, finiteFloatCallable)
-      , st.tuples(finiteFloatCallable, finiteFloatCallable))
-def test__toRelative(a, b, c):
-    def _mkp(t: Tuple[float, float]) -> dlib.dpoint:
-        """ make dlib.dpoint from Tuple"""
-        return dlib.dpoint(t[0], t[1])
+# FaceTracker {{{
+def test_FaceTracker_detectOnce():
+    tracker = FaceTracker(TrackingSetting(redetectInterval=10
+                                         , minConfidence=0))
+    for _ in range(5):
+        assert tracker.facemark(faceFrame) is not None
+
+    assert tracker.detectCount == 1
+    assert tracker.trackCount == 4
+
+
+def test_FaceTracker_redetectInterval():
+    tracker = FaceTracker(TrackingSetting(redetectInterval=2
+                                         , minConfidence=0))
+    for _ in range(5):
+        tracker.facemark(faceFrame)
+
+    assert tracker.detectCount == 3
+    assert tracker.trackCount == 2
+
+
+def test_FaceTracker_lowConfidence():
+    tracker = FaceTracker(TrackingSetting(redetectInterval=10
+                                         , minConfidence=float('inf')))
+    for _ in range(3):
+        tracker.facemark(faceFrame)
+
+    assert tracker.detectCount == 3
+    assert tracker.trackCount == 0
+
+
+def test_FaceTracker_noface():
+    tracker = FaceTracker()
+    assert tracker.facemark(noFaceFrame) is None
+    assert tracker.facemark(noFaceFrame) is None
+    assert tracker.detectCount == 2
+
+
+def test_FaceTracker_sameAsFacemark():
+    tracker = FaceTracker(TrackingSetting(redetectInterval=1)
+                         , DetectionSetting(scale=1.0))
+    assert tracker.facemark(faceFrame) == facemark(faceFrame)
+# }}}
+
+
+# _detectFaces {{{
+def _isNear(a: dlib.rectangle, b: dlib.rectangle) -> bool:
+    tolerance = b.width() * 0.1
+    return abs(a.center().x - b.center().x) < tolerance\
+        and abs(a.center().y - b.center().y) < tolerance\
+        and abs(a.width() - b.width()) < tolerance
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.5, 0.25])
+def test_detectFaces_mappedBack(scale):
+    full = _detectFaces(faceFrame, DetectionSetting(scale=1.0))
+    rects = _detectFaces(faceFrame, DetectionSetting(scale=scale))
+
+    assert len(rects) == 1
+    assert _isNear(rects[0], full[0])
+
+
+def test_detectFaces_roi():
+    full = _detectFaces(faceFrame, DetectionSetting(scale=1.0))
+    rects = _detectFaces(faceFrame, DetectionSetting(scale=0.5)
+                        , around=full[0])
+
+    assert len(rects) == 1
+    assert _isNear(rects[0], full[0])
+
+
+def test_detectFaces_roiOutside():
+    assert len(_detectFaces(faceFrame, DetectionSetting()
+                           , around=dlib.rectangle(0, 0, 10, 10))) == 0
+
+
+def test_detectFaces_noface():
+    assert len(_detectFaces(noFaceFrame, DetectionSetting())) == 0
+# }}}
+
+
+# facemarkArray {{{
+def test_facemarkArray():
+    landmark = facemarkArray(faceFrame)
+
+    assert landmark.shape == (194, 2)
+    assert landmark.dtype == numpy.float64
+    assert dlib.dpoints([dlib.dpoint(x, y) for x, y in landmark.tolist()])\
+        == facemark(faceFrame)
+
+
+def test_facemarkArray_noface():
+    assert facemarkArray(noFaceFrame) is None
+
+
+@pytest.mark.parametrize("upsample", [0, 2])
+def test_facemarkArray_detection(upsample):
+    detection = DetectionSetting(0.5, 0.5, upsample)
+    with mock.patch("FaceDataServer.faceDetection._detector"
+                   , return_value=dlib.rectangles()) as detector:
+        assert facemarkArray(faceFrame, detection=detection) is None
+        with pytest.raises(CapHasClosedError):
+            _waitUntilFacemark(MockedCap(False, faceFrame), detection)
+
+    # on downscaled copy, as 'FaceTracker' does
+    image, given = detector.call_args[0]
+    assert given == upsample
+    assert image.shape[0] == pytest.approx(faceFrame.shape[0] / 2, abs=1)
+
+
+def test_normalizeArray():
+    face = numpy.array([(n, n * 2) for n in range(194)], dtype=numpy.float64)
+    layout = currentLayout()
+    correct = face[list(layout.order)]
+    center = correct[layout.centerIndex].copy()
+    correct -= center
+    correct[layout.centerIndex] = center
+
+    assert numpy.array_equal(_normalizeArray(face), correct)
+
 
-    def _pSub(t: Tuple[float, float], c: Tuple[float, float]) -> dlib.dpoint:
-        return dlib.dpoint(t[0] - c[0], t[1] - c[1])
+def test_landmarkArray():
+    face = [(n, n * 2) for n in range(194)]
+    shape = mock.Mock()
+    shape.parts.return_value = dlib.points([dlib.point(x, y)
+                                            for x, y in face])
+    with mock.patch('FaceDataServer.faceDetection._predictor'
+                   , return_value=shape):
+        result = _landmarkArray(faceFrame, dlib.rectangle(0, 0, 1, 1))
 
-    assert _toRelative(dlib.dpoints([_mkp(a), _mkp(b)]), _mkp(c)) \
-               == dlib.dpoints([_pSub(a, c), _pSub(b, c)])
+    assert numpy.array_equal(result
+                            , _normalizeArray(numpy.array(face
+                                                         , numpy.float64)))
 # }}}
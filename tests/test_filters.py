@@ -0,0 +1,82 @@
+import numpy
+import pytest
+from FaceDataServer.filters import (NoFilter, OneEuroFilter, KalmanFilter
+                                   , FILTERS, makeFilter)
+
+BASE = numpy.random.default_rng(0).random((194, 2)) * 200 + 100
+
+
+def run(f, truth, noise=2.0, fps=30, frames=300):
+    """Return mean absolute error of the last 2/3 frames"""
+    rng = numpy.random.default_rng(1)
+    errors = []
+    for i in range(frames):
+        t = i / fps
+        out = f.filter(truth(t) + rng.normal(0, noise, BASE.shape), t)
+        errors.append(numpy.abs(out - truth(t)).mean())
+    return numpy.mean(errors[frames // 3:])
+
+
+@pytest.mark.parametrize("f", [OneEuroFilter(), KalmanFilter()])
+def test_smoothsJitter(f):
+    assert run(f, lambda t: BASE) < run(NoFilter(), lambda t: BASE) * 0.7
+
+
+def test_Kalman_followsConstantVelocity():
+    def moving(t):
+        return BASE + numpy.array([300.0, -100.0]) * t
+    assert run(KalmanFilter(), moving) < run(NoFilter(), moving)
+
+
+@pytest.mark.parametrize("name", ["oneeuro", "kalman"])
+def test_filter_doesntModifyInput(name):
+    f = FILTERS[name]()
+    landmark = BASE.copy()
+    f.filter(landmark, 0.0)
+    out = f.filter(landmark + 1, 0.1)
+    out += 100
+    assert numpy.array_equal(landmark, BASE)
+    assert not numpy.shares_memory(out, f.predict(0.1))
+
+
+@pytest.mark.parametrize("name", FILTERS.keys())
+def test_predict_reset(name):
+    f = FILTERS[name]()
+    assert f.predict(0.0) is None
+    for i in range(10):
+        f.filter(BASE + i, i / 10)
+    assert f.predict(1.0).shape == BASE.shape
+    f.reset()
+    assert f.predict(1.0) is None
+    # starts from the first landmark again
+    assert numpy.array_equal(f.filter(BASE, 2.0), BASE)
+
+
+def test_Kalman_predict():
+    f = KalmanFilter()
+    for i in range(30):
+        f.filter(BASE + numpy.array([30.0, 0]) * i, i / 30)
+    # 900 px/s
+    assert numpy.allclose(f.predict(1.0)[:, 0], BASE[:, 0] + 900, atol=5)
+
+
+def test_makeFilter():
+    f = makeFilter("oneeuro:minCutoff=0.5, beta=0.1")
+    assert isinstance(f, OneEuroFilter)
+    assert (f.minCutoff, f.beta, f.dCutoff) == (0.5, 0.1, 1.0)
+    assert isinstance(makeFilter("kalman"), KalmanFilter)
+    for spec in ("unknown", "kalman:foo=1", "kalman:noise"):
+        with pytest.raises(ValueError):
+            makeFilter(spec)
+
+
+@pytest.mark.parametrize("name", ["oneeuro", "kalman"])
+def test_filter_benchmark(benchmark, name):
+    f = FILTERS[name]()
+    f.filter(BASE, 0.0)
+    t = [0.0]
+
+    def step():
+        t[0] += 1 / 30
+        f.filter(BASE, t[0])
+    benchmark(step)
@@ -0,0 +1,88 @@
+import pickle
+import pytest
+import numpy
+from FaceDataServer.frameRing import FrameRing
+
+
+@pytest.fixture
+def ring():
+    r = FrameRing(3, (4, 5, 3))
+    yield r
+    r.close()
+
+
+def _frame(n: int) -> numpy.ndarray:
+    return numpy.full((4, 5, 3), n, numpy.uint8)
+
+
+def test_FrameRing_write(ring):
+    assert ring.latest() == -1
+    assert [ring.write(_frame(i)) for i in range(4)] == [0, 1, 2, 3]
+
+    assert ring.latest() == 3
+    # 0 is overwritten by 3
+    assert not ring.isValid(0)
+    assert ring.view(0) is None
+    assert numpy.array_equal(ring.view(1), _frame(1))
+    assert numpy.array_equal(ring.view(3), _frame(3))
+
+
+def test_FrameRing_zeroCopy(ring):
+    seq = ring.write(_frame(1))
+    view = ring.view(seq)
+    copied = ring.copy(seq)
+    ring.write(_frame(2))
+    ring.write(_frame(3))
+    ring.write(_frame(4))
+
+    # the view shows new frame, and it's told by 'isValid'
+    assert numpy.array_equal(view, _frame(4))
+    assert not ring.isValid(seq)
+    assert numpy.array_equal(copied, _frame(1))
+
+
+def test_FrameRing_writeFrom(ring):
+    def readInPlace(out):
+        out[...] = 7
+        return (True, out)
+
+    assert ring.writeFrom(readInPlace) == 0
+    # 'read' which returns new array
+    assert ring.writeFrom(lambda out: (True, _frame(8))) == 1
+    # failed read doesn't consume sequence number
+    assert ring.writeFrom(lambda out: (False, None)) is None
+    assert ring.write(_frame(9)) == 2
+
+    assert numpy.array_equal(ring.view(0), _frame(7))
+    assert numpy.array_equal(ring.view(1), _frame(8))
+
+
+def test_FrameRing_writeShapeMismatch(ring):
+    with pytest.raises(ValueError):
+        ring.write(numpy.zeros((1, 1, 3), numpy.uint8))
+
+
+def test_FrameRing_attach(ring):
+    attached = pickle.loads(pickle.dumps(ring))
+    try:
+        ring.write(_frame(5))
+        assert numpy.array_equal(attached.view(0), _frame(5))
+        attached.write(_frame(6))
+        assert ring.latest() == 1
+    finally:
+        attached.close()
+
+
+def test_RingReader(ring):
+    reader = ring.reader()
+    other = ring.reader()
+    assert reader.next() is None
+
+    for i in range(5):
+        ring.write(_frame(i))
+
+    # 0 and 1 are overwritten
+    assert [reader.next()[0] for _ in range(3)] == [2, 3, 4]
+    assert reader.next() is None
+    assert reader.skipped == 2
+    assert other.next(latest=True)[0] == 4
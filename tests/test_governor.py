@@ -0,0 +1,108 @@
+import pytest
+import time
+from FaceDataServer.governor import Governor, GovernorSetting, qualityLevels
+from FaceDataServer.faceDetection import (FaceTracker, DetectionSetting
+                                         , TrackingSetting)
+from FaceDataServer.presence import Presence, PresenceSetting
+
+
+class FakeCpu:
+    def __init__(self) -> None:
+        self.time = 0.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+def run(governor, cpu, seconds, latency, hasFace=True, cpuUsage=0.1):
+    """ Feed frames at 10 FPS for 'seconds' """
+    for _ in range(round(seconds * 10)):
+        cpu.time += cpuUsage / 10
+        run.now += 0.1
+        if governor.presence is not None:
+            governor.presence.update(hasFace, run.now)
+        governor.frame(latency, run.now)
+
+
+@pytest.fixture
+def setup():
+    run.now = time.monotonic()
+    cpu = FakeCpu()
+    tracker = FaceTracker(TrackingSetting(30), DetectionSetting(0.5, 0.5, 1))
+    setting = GovernorSetting(latencyBudget=0.1, cpuBudget=1.0, minFps=5
+                             , maxFps=30, interval=1)
+    presence = Presence(PresenceSetting(grace=5, scanFps=2), run.now)
+    return Governor(setting, tracker, presence, cpu), tracker, cpu
+
+
+def test_qualityLevels():
+    levels = qualityLevels(DetectionSetting(0.5, 0.5, 1), TrackingSetting(30))
+    assert [lv.detection.upsample for lv in levels] == [1, 0, 0, 0, 0]
+    assert [lv.detection.scale for lv in levels]\
+        == [0.5, 0.5, 0.375, 0.375, 0.28125]
+    assert [lv.tracking.redetectInterval for lv in levels]\
+        == [30, 30, 30, 60, 60]
+
+    # without tracking and upsample, those steps are skipped
+    levels = qualityLevels(DetectionSetting(0.5, 0.5, 0), TrackingSetting(1))
+    assert len(levels) == 3
+
+
+def test_Governor_overBudget(setup):
+    governor, tracker, cpu = setup
+    run(governor, cpu, 10, latency=0.2)
+    # quality is lowered first, and then FPS
+    assert governor.level == len(governor.levels) - 1
+    assert tracker.detection == governor.levels[-1].detection
+    assert tracker.setting.redetectInterval == 60
+    assert governor.fps < 30
+
+    run(governor, cpu, 30, latency=0.2)
+    assert governor.fps == 5
+
+
+def test_Governor_cpuBudget(setup):
+    governor, tracker, cpu = setup
+    run(governor, cpu, 3, latency=0.01, cpuUsage=1.5)
+    assert governor.level > 0
+    assert governor.cpu == pytest.approx(1.5)
+
+
+def test_Governor_recover(setup):
+    governor, tracker, cpu = setup
+    run(governor, cpu, 10, latency=0.2)
+    run(governor, cpu, 30, latency=0.01)
+    assert (governor.level, governor.fps) == (0, 30)
+    assert tracker.detection == DetectionSetting(0.5, 0.5, 1)
+
+
+def test_Governor_withinBudget(setup):
+    governor, tracker, cpu = setup
+    # between 'budget * headroom' and budget, nothing changes
+    run(governor, cpu, 10, latency=0.08)
+    assert (governor.level, governor.fps) == (0, 30)
+
+
+def test_Governor_idle(setup):
+    governor, tracker, cpu = setup
+    run(governor, cpu, 4.5, latency=0.01, hasFace=False)
+    assert not governor.idle
+    run(governor, cpu, 1, latency=0.01, hasFace=False)
+    assert governor.idle
+    run(governor, cpu, 3, latency=0.2, hasFace=False)
+    assert governor.currentFps() == 2
+    # budget isn't checked while idle
+    assert governor.level == 0
+
+    run(governor, cpu, 0.1, latency=0.01)
+    assert not governor.idle
+    assert governor.currentFps() == 30
+
+
+def test_Governor_withoutTracker():
+    cpu = FakeCpu()
+    run.now = time.monotonic()
+    governor = Governor(GovernorSetting(interval=1), None, cpuTime=cpu)
+    run(governor, cpu, 5, latency=0.2)
+    assert governor.level == 0
+    assert governor.fps < 30
@@ -0,0 +1,89 @@
+import pytest
+from FaceDataServer.inferencePool import InferencePool
+from FaceDataServer.faceDetection import (facemarkArray, DetectionSetting
+                                         , currentLayout)
+from FaceDataServer.landmarkLayout import LandmarkLayout
+from FaceDataServer.Types import WorkerDiedError
+import numpy
+from conftest import faceFrame, noFaceFrame
+
+
+@pytest.fixture
+def pool():
+    p = InferencePool(2, faceFrame.shape, DetectionSetting(scale=1.0)
+                     , slots=4)
+    yield p
+    p.close()
+
+
+def test_InferencePool_inOrder(pool):
+    seqs = [pool.submit(faceFrame) for _ in range(4)]
+    results = [pool.get(timeout=30) for _ in range(4)]
+
+    assert seqs == [0, 1, 2, 3]
+    assert [r[0] for r in results] == seqs
+    assert numpy.array_equal(results[0][1], facemarkArray(faceFrame))
+
+
+def test_InferencePool_dropWhenFull(pool):
+    seqs = [pool.submit(faceFrame) for _ in range(6)]
+
+    assert seqs[4:] == [None, None]
+    assert pool.dropped == 2
+
+
+def test_InferencePool_noface():
+    p = InferencePool(1, noFaceFrame.shape)
+    try:
+        assert p.submit(noFaceFrame) == 0
+        assert p.get(timeout=30) == (0, None)
+    finally:
+        p.close()
+
+
+def test_InferencePool_facemarkFails():
+    # 'order' longer than the model output makes every frame fail
+    layout = currentLayout()
+    broken = LandmarkLayout("broken", layout.modelFile
+                           , tuple(range(layout.pointNum + 1))
+                           , layout.landmarkNum)
+    p = InferencePool(1, faceFrame.shape, layout=broken)
+    try:
+        assert [p.submit(faceFrame) for _ in range(2)] == [0, 1]
+        # worker survives, and the frames are misses
+        assert [p.get(timeout=30) for _ in range(2)] == [(0, None), (1, None)]
+    finally:
+        p.close()
+
+
+def test_InferencePool_workerDied():
+    p = InferencePool(1, faceFrame.shape)
+    try:
+        p._workers[0].terminate()
+        p._workers[0].join()
+        p.submit(faceFrame)
+        with pytest.raises(WorkerDiedError):
+            p.get()
+    finally:
+        p.close()
+
+
+def test_InferencePool_shapeMismatch(pool):
+    with pytest.raises(ValueError):
+        pool.submit(noFaceFrame)
+
+
+def test_InferencePool_getTimeout(pool):
+    assert pool.get(timeout=0.01) is None
+
+
+def test_InferencePool_captureFrom(pool):
+    class Cap:
+        def read(self, image=None):
+            image[...] = faceFrame
+            return (True, image)
+
+    assert pool.captureFrom(Cap()) == 0
+    seq, landmark = pool.get(timeout=30)
+    assert numpy.array_equal(landmark, facemarkArray(faceFrame))
+    assert numpy.array_equal(pool.ring.view(seq), faceFrame)
@@ -0,0 +1,121 @@
+import pytest
+import numpy
+from FaceDataServer.landmarkLayout import (LandmarkLayout, HELEN, IBUG68
+                                          , getLayout, _helenOrder)
+from FaceDataServer.Types import LANDMARK_NUM, Face, RawFaceData
+
+
+@pytest.mark.parametrize("layout", [HELEN, IBUG68])
+def test_LandmarkLayout_isPermutation(layout):
+    assert sorted(layout.order) == list(range(layout.pointNum))
+    assert set(layout.landmarkNum.keys()) == set(LANDMARK_NUM.keys())
+    assert all(0 <= i < layout.pointNum for i in layout.landmarkNum.values())
+
+
+def test_LandmarkLayout_helen():
+    assert HELEN.pointNum == 194
+    assert HELEN.landmarkNum == LANDMARK_NUM
+    assert HELEN.centerIndex == LANDMARK_NUM["NOSE_BOTTOM"]
+
+
+def test_LandmarkLayout_sort():
+    face = numpy.arange(194 * 2, dtype=numpy.float64).reshape(194, 2)
+    expected = numpy.array([face[i] for i in _helenOrder()])
+
+    assert numpy.array_equal(HELEN.sort(face), expected)
+    assert numpy.array_equal(IBUG68.sort(face[:68]), face[:68])
+
+
+def test_LandmarkLayout_file(tmp_path):
+    path = str(tmp_path / "layout.json")
+    IBUG68.toFile(path)
+    loaded = LandmarkLayout.fromFile(path)
+
+    assert loaded == IBUG68
+    assert numpy.array_equal(loaded.sortOrder, IBUG68.sortOrder)
+    assert getLayout(path) == IBUG68
+
+
+def test_getLayout():
+    assert getLayout("helen") is HELEN
+    assert getLayout("ibug68") is IBUG68
+    with pytest.raises(ValueError):
+        getLayout("no-such-layout")
+
+
+def ibugFace() -> numpy.ndarray:
+    """ 68 points of a frontal face in image coordinates (y is down) """
+    t = numpy.linspace(0, numpy.pi, 17)
+    jaw = numpy.stack([100 - 80 * numpy.cos(t), 80 + 80 * numpy.sin(t)], 1)
+    arc = 60 - 10 * numpy.sin(numpy.linspace(0, numpy.pi, 5))
+    eyebrows = [(40 + 12.5 * i, arc[i]) for i in range(5)]\
+        + [(110 + 12.5 * i, arc[4 - i]) for i in range(5)]
+    nose = [(100, 70 + 10 * i) for i in range(4)]\
+        + [(85 + 7.5 * i, 110) for i in range(5)]
+    # from the outer (left one) or inner (right one) corner, clockwise
+    eyes = [(50, 80), (60, 75), (70, 75), (80, 80), (70, 85), (60, 85)
+           , (120, 80), (130, 75), (140, 75), (150, 80), (140, 85)
+           , (130, 85)]
+    mouth = [(75, 140), (83, 134), (92, 131), (100, 130), (108, 131)
+            , (117, 134), (125, 140), (117, 146), (108, 149), (100, 150)
+            , (92, 149), (83, 146)
+            , (80, 140), (90, 137), (100, 136), (110, 137), (120, 140)
+            , (110, 143), (100, 144), (90, 143)]
+    return numpy.concatenate([jaw, eyebrows, nose, eyes, mouth])
+
+
+def helenFace() -> numpy.ndarray:
+    """ Named landmarks of 'test_facemark' result (helen-dataset.dat) """
+    points = {"TEMPLE_LEFT": (-301, -48), "TEMPLE_RIGHT": (90, -66)
+             , "NOSE_R": (-56, -28), "NOSE_L": (53, -31)
+             , "MOUSE_R": (-91, 67), "MOUSE_L": (43, 47)
+             , "LEFT_EYE_R": (20, -136), "LEFT_EYE_L": (76, -148)
+             , "LEFT_EYE_TOP": (52, -158)
+             , "RIGHT_EYE_L": (-93, -136), "RIGHT_EYE_R": (-161, -123)
+             , "RIGHT_EYE_TOP": (-136, -144)
+             , "EYEBROW_LEFT_R": (19, -171), "EYEBROW_LEFT_L": (94, -186)
+             , "EYEBROW_LEFT_TOP": (54, -199)
+             , "EYEBROW_RIGHT_L": (-49, -179), "EYEBROW_RIGHT_R": (-197, -156)
+             , "EYEBROW_RIGHT_TOP": (-133, -197)}
+    face = numpy.zeros((HELEN.pointNum, 2))
+    for name, xy in points.items():
+        face[HELEN.landmarkNum[name]] = xy
+    return face
+
+
+@pytest.mark.parametrize("left, right"
+                        , [("TEMPLE_LEFT", "TEMPLE_RIGHT")
+                          , ("LEFT_EYE_TOP", "RIGHT_EYE_TOP")
+                          , ("EYEBROW_LEFT_TOP", "EYEBROW_RIGHT_TOP")
+                          , ("NOSE_L", "NOSE_R"), ("MOUSE_L", "MOUSE_R")
+                          , ("LEFT_EYE_L", "LEFT_EYE_R")
+                          , ("RIGHT_EYE_L", "RIGHT_EYE_R")
+                          , ("EYEBROW_LEFT_L", "EYEBROW_LEFT_R")
+                          , ("EYEBROW_RIGHT_L", "EYEBROW_RIGHT_R")])
+def test_LandmarkLayout_ibug68Orientation(left, right):
+    # the same face gives the same side for each pair in both layouts
+    def side(layout, face):
+        n = layout.landmarkNum
+        return numpy.sign(face[n[left], 0] - face[n[right], 0])
+    assert side(IBUG68, IBUG68.sort(ibugFace())) == side(HELEN, helenFace())
+
+
+def test_LandmarkLayout_ibug68Face():
+    # Face is upward, so top of each part should be bigger
+    face = Face.fromDPoints(IBUG68.sort(ibugFace()), IBUG68.landmarkNum)
+    for part in (face.leftEye, face.rightEye, face.mouth
+                , face.leftEyeBrow, face.rightEyeBrow):
+        assert part.top.y > part.bottom.y
+
+    raw = RawFaceData.get(face)
+    # between inner corners of eyes
+    assert raw.eyeDistance == pytest.approx(40 / 160 * 200)
+    assert raw.mouthWidth == pytest.approx(50 / 160 * 200)
+    assert min(raw.mouthHeight, raw.leftEyeHeight, raw.rightEyeHeight) > 0
+
+
+def test_LandmarkLayout_sort_benchmark(benchmark):
+    face = numpy.random.rand(194, 2)
+    result = benchmark(HELEN.sort, face)
+
+    assert result.shape == (194, 2)
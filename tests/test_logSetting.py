@@ -0,0 +1,69 @@
+import json
+import logging
+import pytest
+from FaceDataServer.logSetting import (LogSetting, JsonFormatter
+                                      , RateLimitFilter, setupLogging)
+
+
+def record(level=logging.DEBUG, lineno=1, msg="frame"):
+    return logging.LogRecord("test", level, "test.py", lineno, msg, None
+                            , None)
+
+
+@pytest.fixture
+def rootLogger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    for h in handlers:
+        root.addHandler(h)
+    root.setLevel(level)
+
+
+def test_RateLimitFilter():
+    f = RateLimitFilter(1 / 60)
+    assert f.filter(record())
+    assert not f.filter(record())
+    assert not f.filter(record())
+    # other line and other level aren't limited
+    assert f.filter(record(lineno=2))
+    assert f.filter(record(logging.INFO))
+
+    f._sites[("test", "test.py", 1)][0] = 0.0
+    r = record()
+    assert f.filter(r)
+    assert r.suppressed == 2
+    assert r.getMessage() == "frame (2 suppressed)"
+
+
+def test_RateLimitFilter_disabled():
+    f = RateLimitFilter(0)
+    assert all(f.filter(record()) for _ in range(10))
+
+
+def test_JsonFormatter():
+    d = json.loads(JsonFormatter().format(record(msg="hello")))
+    assert (d["level"], d["name"], d["message"]) == ("DEBUG", "test", "hello")
+    assert "suppressed" not in d
+
+
+@pytest.mark.parametrize("asJson", [False, True])
+def test_setupLogging(tmp_path, rootLogger, asJson):
+    path = tmp_path / "fds.log"
+    listener = setupLogging(LogSetting("INFO", str(path), maxBytes=200
+                                      , backupCount=1, json=asJson))
+    logger = logging.getLogger("test")
+    logger.debug("not written")
+    for i in range(10):
+        logger.info(f"message {i}")
+    listener.stop()
+
+    lines = path.read_text().splitlines()
+    assert "message 9" in lines[-1]
+    assert all("not written" not in line for line in lines)
+    # rotated
+    assert (tmp_path / "fds.log.1").exists()
+    if asJson:
+        assert json.loads(lines[-1])["message"] == "message 9"
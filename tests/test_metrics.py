@@ -0,0 +1,61 @@
+import urllib.error
+import urllib.request
+import pytest
+from FaceDataServer.metrics import Metrics, MetricsServer
+from FaceDataServer.stats import LatencyStats
+
+
+def test_Metrics_render():
+    counts = [3]
+    m = Metrics()
+    m.counter("fds_test_total", "Test counter", lambda: counts[0]
+             , {"a": "b"})
+    m.gauge("fds_test", "Test gauge", lambda: 1.5)
+    counts[0] = 4
+
+    lines = m.render().splitlines()
+    assert lines == ["# HELP fds_test_total Test counter"
+                    , "# TYPE fds_test_total counter"
+                    , 'fds_test_total{a="b"} 4'
+                    , "# HELP fds_test Test gauge"
+                    , "# TYPE fds_test gauge"
+                    , "fds_test 1.5"]
+
+
+def test_Metrics_histogram():
+    stats = LatencyStats(2)
+    for sec in (0.0001, 0.003, 0.003, 2.0):
+        stats.add(sec)
+    m = Metrics()
+    m.histogram("fds_latency_seconds", "Latency", stats, {"stage": "s"})
+
+    text = m.render()
+    assert 'fds_latency_seconds_bucket{stage="s",le="0.0005"} 1' in text
+    assert 'fds_latency_seconds_bucket{stage="s",le="0.0025"} 1' in text
+    assert 'fds_latency_seconds_bucket{stage="s",le="0.005"} 3' in text
+    assert 'fds_latency_seconds_bucket{stage="s",le="1.0"} 3' in text
+    assert 'fds_latency_seconds_bucket{stage="s",le="+Inf"} 4' in text
+    assert 'fds_latency_seconds_count{stage="s"} 4' in text
+
+
+def test_Metrics_typeMismatch():
+    m = Metrics()
+    m.counter("fds_x", "x", lambda: 0)
+    with pytest.raises(ValueError):
+        m.gauge("fds_x", "x", lambda: 0)
+
+
+def test_MetricsServer():
+    m = Metrics()
+    m.counter("fds_test_total", "Test counter", lambda: 7)
+    server = MetricsServer(m, 0, "127.0.0.1")
+    server.start()
+    url = f"http://127.0.0.1:{server.address[1]}"
+    try:
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as res:
+            assert res.status == 200
+            assert "fds_test_total 7" in res.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/", timeout=5)
+    finally:
+        server.close()
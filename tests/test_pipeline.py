@@ -0,0 +1,174 @@
+import threading
+import time
+from FaceDataServer.pipeline import (DropOldestQueue, BlockingQueue, Pipeline
+                                     , Pacer)
+
+
+# DropOldestQueue {{{
+def test_DropOldestQueue_dropOldest():
+    q = DropOldestQueue(2)
+    for i in range(5):
+        q.put(i)
+
+    assert len(q) == 2
+    assert q.dropped == 3
+    assert q.get() == 3
+    assert q.get() == 4
+
+
+def test_DropOldestQueue_getTimeout():
+    assert DropOldestQueue(1).get(timeout=0.01) is None
+
+
+def test_DropOldestQueue_close():
+    q = DropOldestQueue(1)
+    result = []
+    t = threading.Thread(target=lambda: result.append(q.get()))
+    t.start()
+    q.close()
+    t.join(1)
+
+    assert not t.is_alive()
+    assert result == [None]
+# }}}
+
+
+# BlockingQueue {{{
+def test_BlockingQueue_waitsForRoom():
+    q = BlockingQueue(1)
+    q.put(0)
+    t = threading.Thread(target=lambda: q.put(1))
+    t.start()
+    t.join(0.05)
+    assert t.is_alive()
+
+    assert q.get() == 0
+    t.join(1)
+    assert q.get(timeout=0.1) == 1
+    assert q.dropped == 0
+
+
+def test_BlockingQueue_close():
+    q = BlockingQueue(1)
+    q.put(0)
+    t = threading.Thread(target=lambda: q.put(1))
+    t.start()
+    q.close()
+    t.join(1)
+
+    assert not t.is_alive()
+    # items put before closing are kept
+    assert q.get() == 0
+    assert q.get() is None
+# }}}
+
+
+# Pipeline {{{
+def test_Pipeline_stages():
+    counter = iter(range(1000))
+    results = []
+
+    def source():
+        time.sleep(0.001)
+        return next(counter)
+
+    p = Pipeline()
+    p.stage("source", source)
+    p.stage("double", lambda n: n * 2)
+    p.stage("sink", results.append, sink=False)
+    p.start()
+    time.sleep(0.2)
+    p.stop()
+    p.join(1)
+
+    assert len(results) != 0
+    assert all(n % 2 == 0 for n in results)
+    # results keep order even if some are dropped
+    assert results == sorted(results)
+
+
+def test_Pipeline_errorStopsPipeline():
+    def source():
+        raise RuntimeError("closed")
+
+    p = Pipeline()
+    p.stage("source", source)
+    p.stage("sink", lambda n: n, sink=False)
+    p.start()
+
+    assert p.wait(1)
+    p.join(1)
+    assert not p.isRunning()
+    assert isinstance(p.error(), RuntimeError)
+
+
+def test_Pipeline_report():
+    p = Pipeline(queueSize=3)
+    p.stage("a", lambda: None)
+    p.stage("b", lambda n: n, sink=False)
+
+    report = p.report()
+    assert "a: " in report
+    assert "queue 0/3" in report
+    assert "b: " in report
+# }}}
+
+
+def test_Pipeline_stopIteration():
+    items = iter(range(3))
+    results = []
+    p = Pipeline()
+    p.stage("source", lambda: next(items))
+    p.stage("sink", results.append, sink=False)
+    p.start()
+
+    assert p.wait(1)
+    p.join(1)
+    assert p.error() is None
+
+
+def test_Pipeline_block():
+    items = iter(range(100))
+    results = []
+
+    def slow(n):
+        time.sleep(0.001)
+        return n
+
+    p = Pipeline()
+    p.stage("source", lambda: next(items), block=True)
+    p.stage("slow", slow, block=True)
+    p.stage("sink", results.append, sink=False)
+    p.start()
+
+    assert p.wait(5)
+    p.join(1)
+    # nothing is dropped, even after the source ends
+    assert results == list(range(100))
+    assert p.error() is None
+
+
+# Pacer {{{
+def test_Pacer():
+    pacer = Pacer(lambda: 50)
+    start = time.monotonic()
+    for _ in range(6):
+        pacer.pace()
+    # the first one doesn't wait
+    assert 0.09 <= time.monotonic() - start < 0.15
+
+
+def test_Pacer_unlimited():
+    fps = [0]
+    pacer = Pacer(lambda: fps[0])
+    start = time.monotonic()
+    for _ in range(100):
+        pacer.pace()
+    assert time.monotonic() - start < 0.05
+
+    # fps is read on each call
+    fps[0] = 20
+    pacer.pace()
+    pacer.pace()
+    assert time.monotonic() - start >= 0.05
+# }}}
@@ -0,0 +1,49 @@
+from FaceDataServer.presence import Presence, PresenceSetting, State
+
+
+def feed(presence, start, seconds, hasFace, fps=10):
+    """ Return the number of frames to send in 'seconds' """
+    sent = 0
+    for i in range(1, round(seconds * fps) + 1):
+        sent += presence.update(hasFace, start + i / fps)
+    return sent
+
+
+def test_Presence():
+    p = Presence(PresenceSetting(grace=1.0, heartbeat=0.5), now=0.0)
+    assert p.state is State.LOST
+
+    assert feed(p, 0.0, 1, True) == 10
+    assert p.state is State.FOUND
+
+    # everything is sent during grace period
+    assert feed(p, 1.0, 0.9, False) == 9
+    assert p.state is State.LOST
+
+    # then only heartbeats
+    sent = feed(p, 1.9, 3.1, False)
+    assert p.state is State.IDLE
+    assert sent == 1 + 6
+    assert p.heartbeats == 6
+    assert p.suppressed == 31 - sent
+
+    # face comes back at once
+    assert p.update(True, 5.05)
+    assert p.state is State.FOUND
+
+
+def test_Presence_startsLost():
+    p = Presence(PresenceSetting(grace=1.0, heartbeat=10), now=0.0)
+    assert feed(p, 0.0, 2, False) == 9
+    assert p.state is State.IDLE
+
+
+def test_Presence_limit():
+    p = Presence(PresenceSetting(grace=0.0, scanFps=2), now=0.0)
+    assert p.limit(30) == 30
+    assert p.limit(0) == 0
+    p.update(False, 1.0)
+    assert p.state is State.IDLE
+    assert p.limit(30) == 2
+    assert p.limit(1) == 1
+    assert p.limit(0) == 2
@@ -0,0 +1,174 @@
+import asyncio
+import socket
+import time
+import pytest
+from FaceDataServer.deltaStream import DeltaEncoder
+from FaceDataServer.receiver import Receiver
+from FaceDataServer.transport import Destination, Transport, PacketWindow
+from FaceDataServer.Types import FaceData, Packet, MAX_SAMPLES
+
+
+def frame(x=0.0):
+    return FaceData(x, 0.0, 0.0, 100, 100, 100, 100)
+
+
+@pytest.fixture
+def receiver():
+    r = Receiver("127.0.0.1", 0)
+    yield r
+    r.close()
+
+
+@pytest.fixture
+def sender(receiver):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(*packets):
+        for p in packets:
+            s.sendto(p, receiver.address)
+        # let them arrive
+        time.sleep(0.05)
+    yield _send
+    s.close()
+
+
+def test_Receiver_latest(receiver, sender):
+    assert receiver.latest() is None
+    sender(frame(0.1).toBinary(), frame(0.2).toBinary(compact=True))
+
+    sample = receiver.latest()
+    assert sample.data.face_x_radian == pytest.approx(0.2, abs=1e-4)
+    assert (sample.seq, sample.timestamp, sample.latency()) == (None, None
+                                                                , None)
+    # nothing new
+    assert receiver.latest() is sample
+    assert receiver.poll() == []
+
+
+def test_Receiver_reuse():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    with Receiver("127.0.0.1", 0, maxPending=2) as receiver:
+        def _send(xs):
+            for x in xs:
+                s.sendto(frame(x).toBinary(), receiver.address)
+            time.sleep(0.05)
+            return receiver.latest()
+
+        sample = _send([0.0, 0.1, 0.2])
+        kept = sample.copy()
+        # samples are decoded into the same 'maxPending + 1' objects
+        assert _send([0.3, 0.4, 0.5]) is sample
+        assert sample.data.face_x_radian == 0.5
+        assert kept.data.face_x_radian == 0.2
+    s.close()
+
+
+def test_Receiver_window(receiver, sender):
+    window = PacketWindow(3)
+    packets = [window.add(frame(i * 0.1), 100.0 + i) for i in range(6)]
+    # packet 3 is lost, and packet 1 comes again
+    sender(*packets[:3], packets[1], *packets[4:])
+
+    samples = receiver.poll()
+    # samples are returned once each even if they're in several packets
+    assert [s.seq for s in samples] == [0, 1, 2, 3, 4, 5]
+    assert [s.data.face_x_radian for s in samples]\
+            == pytest.approx([i * 0.1 for i in range(6)])
+    assert samples[-1].timestamp == 105.0
+    assert [s.predicted for s in samples[:3]] == [False, False, False]
+    assert receiver.lost == 0
+
+
+def test_Receiver_predicted(receiver, sender):
+    window = PacketWindow(2)
+    sender(window.add(frame(), 0.0), window.add(frame(), 1.0, True))
+
+    samples = receiver.poll()
+    assert [s.predicted for s in samples] == [False, True]
+    assert receiver.latest().predicted
+
+
+def test_Receiver_hasFace(receiver, sender):
+    window = PacketWindow(1)
+    sender(window.add(frame(), 0.0), window.add(frame(), 1.0, hasFace=False))
+
+    assert [s.hasFace for s in receiver.poll()] == [True, False]
+    # version 1.0 doesn't tell
+    sender(frame().toBinary())
+    assert receiver.poll()[0].hasFace is None
+
+
+def test_Receiver_lost(receiver, sender):
+    packets = [Packet(i, 0.0, (frame(),)).toBinary() for i in range(5)]
+    sender(packets[0], packets[3], packets[4])
+
+    assert [s.seq for s in receiver.poll()] == [0, 3, 4]
+    assert receiver.lost == 2
+
+
+def test_Receiver_delta(receiver, sender):
+    encoder = DeltaEncoder()
+    sender(*[encoder.encode(frame(i * 0.1), 100.0 + i * 0.1)
+             for i in range(3)])
+
+    samples = receiver.poll()
+    assert [s.seq for s in samples] == [0, 1, 2]
+    assert samples[-1].data.face_x_radian == pytest.approx(0.2, abs=1e-4)
+
+
+def test_Receiver_invalid(receiver, sender):
+    sender(b"", b"\x70abc", frame().toBinary())
+
+    assert len(receiver.poll()) == 1
+    assert (receiver.received, receiver.invalid) == (3, 2)
+
+
+def test_Receiver_biggestPacket(receiver, sender):
+    sender(Packet(MAX_SAMPLES - 1, 0.0
+                 , tuple(frame() for _ in range(MAX_SAMPLES))).toBinary())
+
+    assert len(receiver.poll()) == MAX_SAMPLES
+    assert receiver.invalid == 0
+
+
+def test_Receiver_otherMajorVersion(receiver, sender):
+    keyframe = bytearray(DeltaEncoder().encode(frame(), 100.0))
+    # version 2.x of the same minor version
+    keyframe[0] += 1 << 4
+    sender(bytes(keyframe))
+
+    assert receiver.poll() == []
+    assert receiver.invalid == 1
+
+
+def test_Receiver_recv(receiver, sender):
+    assert receiver.recv(0.05) is None
+    sender(frame(0.3).toBinary())
+    assert receiver.recv(1).data.face_x_radian == 0.3
+
+
+def test_Receiver_async(receiver, sender):
+    async def _collect():
+        samples = []
+        async for s in receiver:
+            samples.append(s)
+            if len(samples) == 3:
+                return samples
+
+    sender(*[frame(i * 0.1).toBinary() for i in range(3)])
+    samples = asyncio.run(asyncio.wait_for(_collect(), 1))
+    assert [s.data.face_x_radian for s in samples] == [0.0, 0.1, 0.2]
+
+
+def test_endToEnd_latency(receiver):
+    t = Transport([Destination(receiver.address)])
+    t.start()
+    window = PacketWindow(1)
+    for i in range(20):
+        t.send(window.add(frame(), time.time()))
+        time.sleep(0.002)
+    t.close()
+
+    latencies = [s.latency() for s in receiver.poll()]
+    assert len(latencies) > 0
+    assert all(0 <= lat < 0.5 for lat in latencies)
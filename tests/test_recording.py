@@ -0,0 +1,75 @@
+import time
+import pytest
+import numpy
+from FaceDataServer.recording import LandmarkRecorder, Recording, replay
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    path = str(tmp_path / "session.fdsl")
+    landmarks = [numpy.random.default_rng(i).random((194, 2)) * 100
+                 for i in range(3)]
+    with LandmarkRecorder(path, 194, (480, 640)) as r:
+        r.write(landmarks[0], timestamp=10.0)
+        r.write(None, timestamp=10.02)
+        r.write(landmarks[1], timestamp=10.04)
+        r.write(landmarks[2], timestamp=10.06)
+    return path, landmarks
+
+
+def test_Recording(recorded):
+    path, landmarks = recorded
+    recording = Recording(path)
+
+    assert len(recording) == 4
+    assert recording.pointNum == 194
+    assert recording.frameSize == (480, 640)
+    assert recording.layoutName == "helen"
+    assert numpy.allclose(recording.timestamps, [0, 0.02, 0.04, 0.06])
+    assert recording.landmark(1) is None
+    # landmarks are stored as float32
+    assert numpy.allclose(recording.landmark(0), landmarks[0], atol=1e-4)
+    assert recording.landmark(0).dtype == numpy.float64
+    assert len(recording.faces(2)) == 2
+    assert len(recording.faces(10)) == 3
+
+
+def test_Recording_layoutPath(tmp_path):
+    path = str(tmp_path / "session.fdsl")
+    layout = str(tmp_path / "layouts" / "my-68-points-model.json")
+    with LandmarkRecorder(path, 68, layoutName=layout) as r:
+        r.write(numpy.ones((68, 2)), timestamp=0.0)
+    recording = Recording(path)
+
+    assert recording.layoutName == layout
+    assert numpy.array_equal(recording.landmark(0), numpy.ones((68, 2)))
+
+
+def test_LandmarkRecorder_longName(tmp_path):
+    with pytest.raises(ValueError):
+        LandmarkRecorder(str(tmp_path / "session.fdsl"), 68
+                        , layoutName="x" * 0x10000)
+
+
+def test_Recording_notRecording(tmp_path):
+    path = tmp_path / "broken.fdsl"
+    path.write_bytes(b"\0" * 64)
+
+    with pytest.raises(ValueError):
+        Recording(str(path))
+
+
+def test_replay_unlimited(recorded):
+    recording = Recording(recorded[0])
+    result = list(replay(recording, None))
+
+    assert [r[1] is None for r in result] == [False, True, False, False]
+    assert result[3][0] == pytest.approx(0.06)
+
+
+def test_replay_realtime(recorded):
+    recording = Recording(recorded[0])
+    start = time.monotonic()
+    list(replay(recording, 1.0))
+
+    assert time.monotonic() - start >= 0.06
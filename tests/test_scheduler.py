@@ -0,0 +1,109 @@
+import time
+import numpy
+import pytest
+from FaceDataServer.filters import NoFilter, KalmanFilter
+from FaceDataServer.scheduler import Extrapolator, OutputScheduler
+from FaceDataServer.Types import FaceData
+
+
+def frame(x=0.0, mouth=100):
+    return FaceData(x, 0.0, 0.0, mouth, 100, 100, 100)
+
+
+def convert(landmark):
+    """ x of the first landmark as face_x_radian """
+    return frame(landmark[0, 0])
+
+
+def extrapolator(f, maxHorizon=0.1):
+    return Extrapolator(f, convert, maxHorizon)
+
+
+def measure(e, x, timestamp):
+    """ Filter landmark of 'x' and tell it to 'e' """
+    e.landmarkFilter.filter(numpy.full((194, 2), x), timestamp)
+    e.add(timestamp)
+
+
+def test_Extrapolator():
+    e = extrapolator(NoFilter())
+    assert e.predict(0.0) is None
+    measure(e, 0.0, 1.0)
+    # no velocity yet
+    assert e.predict(1.05).face_x_radian == 0.0
+    measure(e, 0.01, 1.1)
+
+    assert e.predict(1.15).face_x_radian == pytest.approx(0.015)
+    # no further than maxHorizon
+    assert e.predict(5.0).face_x_radian == pytest.approx(0.02)
+
+
+def test_Extrapolator_filter():
+    # predictions come from the motion model of the filter
+    f = KalmanFilter()
+    e = extrapolator(f, maxHorizon=1)
+    for i in range(30):
+        measure(e, i / 30, i / 30)
+    assert e.predict(1.5).face_x_radian\
+        == pytest.approx(f.predict(1.5)[0, 0])
+    assert e.predict(1.5).face_x_radian == pytest.approx(1.5, abs=0.05)
+
+
+def test_Extrapolator_noFace():
+    e = extrapolator(NoFilter())
+    measure(e, 0.0, 0.0)
+    measure(e, 0.1, 0.1)
+    e.landmarkFilter.reset()
+    e.add(0.2, hasFace=False)
+    assert e.predict(0.25) is None
+    # velocity starts over
+    measure(e, 0.2, 0.3)
+    assert e.predict(0.35).face_x_radian == 0.2
+
+
+def test_OutputScheduler():
+    emitted = []
+    e = extrapolator(NoFilter())
+    s = OutputScheduler(100, lambda d, t, p, f: emitted.append((d, t, p)), e)
+    s.start()
+    start = time.monotonic()
+    e.landmarkFilter.filter(numpy.full((194, 2), 0.0), start)
+    s.update(frame(0.0), start)
+    time.sleep(0.05)
+    e.landmarkFilter.filter(numpy.full((194, 2), 0.05), start + 0.05)
+    s.update(frame(0.05), start + 0.05)
+    time.sleep(0.05)
+    s.close()
+
+    predicted = [p for _, _, p in emitted]
+    assert predicted[0] is False
+    assert predicted.count(False) == 2
+    # about 100 per second
+    assert 5 <= len(emitted) <= 12
+    assert (s.measured, s.predicted) == (2, len(emitted) - 2)
+    # predictions after the second measurement extrapolate
+    after = emitted[predicted.index(False, 1) + 1:]
+    assert all(d.face_x_radian > 0.05 for d, _, _ in after)
+
+
+def test_OutputScheduler_nothingToEmit():
+    emitted = []
+    s = OutputScheduler(100, lambda d, t, p, f: emitted.append((p, f))
+                       , extrapolator(NoFilter()))
+    s.start()
+    time.sleep(0.05)
+    s.update(FaceData.default(), time.monotonic(), hasFace=False)
+    time.sleep(0.05)
+    s.close()
+    # only the measurement without face
+    assert emitted == [(False, False)]
+
+
+def test_OutputScheduler_withoutExtrapolator():
+    emitted = []
+    s = OutputScheduler(100, lambda d, t, p, f: emitted.append(p))
+    s.start()
+    s.update(frame(0.0), time.monotonic())
+    time.sleep(0.05)
+    s.close()
+    assert emitted == [False]
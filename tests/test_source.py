@@ -0,0 +1,44 @@
+import pytest
+import cv2
+from FaceDataServer.source import ImageDirSource, openSource, frames
+from FaceDataServer.Types import SourceOpenError
+from conftest import faceFrame, noFaceFrame
+
+
+@pytest.fixture
+def imageDir(tmp_path):
+    cv2.imwrite(str(tmp_path / "1.png"), faceFrame)
+    cv2.imwrite(str(tmp_path / "0.png"), noFaceFrame)
+    (tmp_path / "note.txt").write_text("not an image")
+    return str(tmp_path)
+
+
+def test_ImageDirSource(imageDir):
+    source = ImageDirSource(imageDir)
+
+    assert source.get(cv2.CAP_PROP_FRAME_COUNT) == 2
+    result = list(frames(source))
+    assert [f.shape for f in result] == [noFaceFrame.shape, faceFrame.shape]
+    assert not source.isOpened()
+    assert source.read() == (False, None)
+
+
+def test_ImageDirSource_unreadable(imageDir, tmp_path):
+    (tmp_path / "0a.png").write_bytes(b"broken")
+    source = ImageDirSource(imageDir)
+
+    assert len(list(frames(source))) == 2
+    assert source.skipped == 1
+
+
+def test_ImageDirSource_release(imageDir):
+    source = ImageDirSource(imageDir)
+    source.release()
+
+    assert list(frames(source)) == []
+
+
+def test_openSource(imageDir):
+    assert isinstance(openSource(imageDir), ImageDirSource)
+    with pytest.raises(SourceOpenError):
+        openSource(imageDir + "/no-such-video.mp4")
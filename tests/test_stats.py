@@ -0,0 +1,85 @@
+import time
+import numpy
+import pytest
+from FaceDataServer.stats import LatencyStats, RateMeter, Timings
+
+
+def test_LatencyStats_window():
+    s = LatencyStats(4)
+    for i in range(10):
+        s.add(i)
+
+    assert s.count == 10
+    assert sorted(s.samples().tolist()) == [6, 7, 8, 9]
+
+
+def test_LatencyStats_unbounded():
+    s = LatencyStats(None)
+    for i in range(2000):
+        s.add(i)
+
+    assert len(s.samples()) == 2000
+    assert s.percentile(50) == pytest.approx(999.5)
+
+
+def test_LatencyStats_percentiles():
+    s = LatencyStats(101)
+    assert s.percentiles([50, 99]).tolist() == [0, 0]
+    for i in range(101):
+        s.add(i / 1000)
+
+    assert numpy.allclose(s.percentiles([50, 95, 99]), [0.05, 0.095, 0.099])
+
+
+def test_RateMeter():
+    meter = RateMeter(window=1.0, slots=10)
+    assert meter.rate(100.0) == 0.0
+    # 20 events per second for 3 seconds
+    for i in range(60):
+        meter.tick(now=100.0 + i * 0.05)
+
+    assert meter.count == 60
+    assert meter.rate(103.0) == pytest.approx(20, rel=0.1)
+    # reading doesn't reset the window
+    assert meter.rate(103.0) == meter.rate(103.0)
+    # events leave the window
+    assert meter.rate(103.5) == pytest.approx(10, rel=0.2)
+    assert meter.rate(110.0) == 0.0
+
+
+def test_RateMeter_start():
+    meter = RateMeter(window=5.0)
+    for i in range(10):
+        meter.tick(now=100.0 + i * 0.1)
+    # before the window is filled, only the time since the first event
+    assert meter.rate(101.0) == pytest.approx(10)
+
+
+def test_Timings_lap():
+    timings = Timings(["a", "b"])
+    lap = timings.lap()
+    time.sleep(0.01)
+    lap("a")
+    lap("b")
+
+    assert timings.stats["a"].samples()[0] >= 0.01
+    assert timings.stats["b"].samples()[0] < 0.01
+    assert timings.report().startswith("a ")
+    assert " | b " in timings.report()
+
+    # reused for the next frame
+    time.sleep(0.01)
+    lap.start()
+    lap("a")
+    assert timings.stats["a"].samples()[1] < 0.01
+
+
+def test_Timings_disabled():
+    timings = Timings(["a"], enabled=False)
+    lap = timings.lap()
+    lap.start()
+    lap("a")
+    timings.add("a", 1.0)
+
+    assert timings.stats == {}
+    assert timings.report() == ""
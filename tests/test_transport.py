@@ -0,0 +1,148 @@
+import socket
+import time
+import pytest
+from FaceDataServer.transport import (Destination, Transport, PacketWindow
+                                     , parseDestinations)
+from FaceDataServer.stats import Timings
+from FaceDataServer.Types import (defaultPortNumber, FaceData, Packet
+                                 , FLAG_PREDICTED, FLAG_NO_FACE)
+
+
+@pytest.fixture
+def receivers():
+    socks = []
+    for _ in range(2):
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.bind(("127.0.0.1", 0))
+        s.settimeout(1)
+        socks.append(s)
+    yield socks
+    for s in socks:
+        s.close()
+
+
+def _receiveAll(sock: socket.socket) -> list:
+    packets = []
+    sock.settimeout(0.2)
+    try:
+        while True:
+            packets.append(sock.recv(64))
+    except socket.timeout:
+        return packets
+
+
+def test_Transport_fanOut(receivers):
+    t = Transport([Destination(r.getsockname()) for r in receivers])
+    t.start()
+    for i in range(3):
+        t.send(bytes([i]))
+        # wait until it's sent, so that nothing is coalesced
+        deadline = time.monotonic() + 1
+        while t.destinations[1].sent <= i and time.monotonic() < deadline:
+            time.sleep(0.001)
+    t.close()
+
+    for r, d in zip(receivers, t.destinations):
+        assert _receiveAll(r) == [b"\x00", b"\x01", b"\x02"]
+        assert d.sent == 3
+        assert d.errors == 0
+
+
+def test_Transport_pacing(receivers):
+    t = Transport([Destination(receivers[0].getsockname(), 0.2)
+                  , Destination(receivers[1].getsockname())])
+    t.start()
+    for i in range(10):
+        t.send(bytes([i]))
+        time.sleep(0.01)
+    time.sleep(0.3)
+    t.close()
+
+    paced = _receiveAll(receivers[0])
+    # the first one is sent immediately, and others are coalesced
+    assert paced == [b"\x00", b"\x09"]
+    assert t.destinations[0].coalesced == 8
+    # pacing of a destination doesn't affect others
+    assert len(_receiveAll(receivers[1])) == 10
+
+
+def test_Transport_error(receivers):
+    t = Transport([Destination(("256.0.0.1", 5032))
+                  , Destination(receivers[0].getsockname())])
+    t.start()
+    t.send(b"a")
+    t.send(b"b")
+    time.sleep(0.1)
+    t.send(b"c")
+    t.close()
+
+    assert t.destinations[0].errors >= 1
+    assert t.destinations[0].lastError is not None
+    assert _receiveAll(receivers[0])[-1] == b"c"
+
+
+def test_Transport_timings(receivers):
+    timings = Timings(["sendto", "total"])
+    t = Transport([Destination(receivers[0].getsockname())], timings=timings)
+    t.start()
+    t.send(b"\x00", time.monotonic() - 0.05)
+    t.close()
+
+    assert timings.stats["sendto"].count == 1
+    assert timings.stats["total"].samples()[0] >= 0.05
+
+
+def test_parseDestinations():
+    result = parseDestinations("226.70.68.83, 127.0.0.1:6000,", 0.5)
+
+    assert [d.address for d in result] == [("226.70.68.83", defaultPortNumber)
+                                           , ("127.0.0.1", 6000)]
+    assert all(d.minInterval == 0.5 for d in result)
+    with pytest.raises(ValueError):
+        parseDestinations("127.0.0.1:port")
+
+
+@pytest.mark.parametrize("samples, every, sent", [(3, 1, [0, 1, 2, 3, 4, 5])
+                                                 , (3, 3, [2, 5])
+                                                 , (1, 1, [0, 1, 2, 3, 4, 5])])
+def test_PacketWindow(samples, every, sent):
+    window = PacketWindow(samples, every)
+    packets = []
+    for i in range(6):
+        data = FaceData(float(i), 0.0, 0.0, i, 0, 0, 0)
+        packet = window.add(data, 100.0 + i)
+        if packet is not None:
+            packets.append(Packet.fromBinary(packet))
+
+    assert [p.seq for p in packets] == sent
+    for p in packets:
+        assert p.timestamp == 100.0 + p.seq
+        # samples are the latest ones, oldest first
+        first = max(0, p.seq - samples + 1)
+        assert [d.face_x_radian for d in p.samples]\
+                == [float(i) for i in range(first, p.seq + 1)]
+
+
+def test_PacketWindow_compact():
+    window = PacketWindow(2, compact=True)
+    window.add(FaceData.default(), 0.0)
+    packet = window.add(FaceData.default(), 1.0)
+
+    assert packet[0] == 0x13
+    assert Packet.fromBinary(packet).compact
+
+
+def test_PacketWindow_predicted():
+    window = PacketWindow(1)
+    assert Packet.fromBinary(window.add(FaceData.default(), 0.0)).flags == 0
+    predicted = window.add(FaceData.default(), 0.0, True)
+    assert Packet.fromBinary(predicted).flags == FLAG_PREDICTED
+    noFace = window.add(FaceData.default(), 0.0, hasFace=False)
+    assert Packet.fromBinary(noFace).flags == FLAG_NO_FACE
+
+
+def test_PacketWindow_invalid():
+    with pytest.raises(ValueError):
+        PacketWindow(0)
+    with pytest.raises(ValueError):
+        PacketWindow(3, 4)
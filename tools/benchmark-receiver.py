@@ -0,0 +1,89 @@
+# Measure receiver side: decoding throughput and end-to-end latency
+#
+# Packets of each format are sent to a Receiver on localhost through
+# Transport, and the receiver reads them as fast as possible.
+# Latency is from the timestamp in packets to the time they are
+# decoded, so it's only reported for formats which carry timestamps.
+#
+# usage:
+#   pipenv run python tools/benchmark-receiver.py [packets]
+#
+import sys
+import os
+import random
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+from FaceDataServer.deltaStream import DeltaEncoder  # noqa: E402
+from FaceDataServer.receiver import Receiver  # noqa: E402
+from FaceDataServer.stats import LatencyStats  # noqa: E402
+from FaceDataServer.transport import (Destination, Transport  # noqa: E402
+                                     , PacketWindow)
+from FaceDataServer.Types import FaceData  # noqa: E402
+
+
+def _packers():
+    window = PacketWindow(1)
+    compactWindow = PacketWindow(1, compact=True)
+    redundant = PacketWindow(3)
+    delta = DeltaEncoder(angleEpsilon=0)
+    return {"1.0": lambda d, t: d.toBinary()
+           , "1.2": lambda d, t: d.toBinary(compact=True)
+           , "1.1": window.add
+           , "1.3": compactWindow.add
+           , "1.1 x3": redundant.add
+           , "delta": delta.encode}
+
+
+def run(name, pack, packets):
+    receiver = Receiver("127.0.0.1", 0)
+    transport = Transport([Destination(receiver.address)])
+    latency = LatencyStats(packets)
+    samples = 0
+    done = threading.Event()
+
+    def _send():
+        for i in range(packets):
+            data = FaceData(random.uniform(-0.3, 0.3), 0.0, 0.0
+                           , 100, 100, 100, 100)
+            packet = pack(data, time.time())
+            if packet is not None:
+                transport.send(packet)
+            # don't let transport coalesce packets
+            while transport.destinations[0]._pending is not None:
+                time.sleep(0)
+        done.set()
+
+    transport.start()
+    sender = threading.Thread(target=_send)
+    start = time.perf_counter()
+    sender.start()
+    while not done.is_set() or samples < packets:
+        got = receiver.poll()
+        for s in got:
+            if s.latency() is not None:
+                latency.add(s.latency())
+        samples += len(got)
+        if done.is_set() and len(got) == 0:
+            break
+    elapsed = time.perf_counter() - start
+    sender.join()
+    transport.close()
+    receiver.close()
+
+    print(f"{name:>7}: {samples} samples in {elapsed:.2f}s"
+          f" ({samples / elapsed:.0f} samples/s), lost {receiver.lost}"
+          f", invalid {receiver.invalid}")
+    if latency.count > 0:
+        print(f"{'':>7}  latency {latency.summary()}")
+
+
+def main():
+    packets = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for name, pack in _packers().items():
+        run(name, pack, packets)
+
+
+if __name__ == '__main__':
+    main()
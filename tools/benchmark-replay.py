@@ -0,0 +1,71 @@
+# Measure post-inference path with recorded landmarks
+#
+# Landmarks recorded with 'FDS_RECORD' are replayed as fast as possible
+# through 'Face.fromDPointsWithRatio' -> 'FaceData.get' -> 'toBinary'
+# -> 'sendto', so neither camera nor dlib is involved.
+# Packets are sent to localhost. The recording is replayed 'repeat'
+# times to get enough frames.
+#
+# usage:
+#   pipenv run python tools/benchmark-replay.py <recording> [repeat]
+#
+import sys
+import os
+import socket
+import time
+from contextlib import closing
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+from FaceDataServer.faceDetection import autoCalibration  # noqa: E402
+from FaceDataServer.landmarkLayout import getLayout  # noqa: E402
+from FaceDataServer.recording import Recording, replay  # noqa: E402
+from FaceDataServer.stats import LatencyStats  # noqa: E402
+from FaceDataServer.Types import (Face, FaceData  # noqa: E402
+                                 , defaultPortNumber)
+
+STAGES = ("fromDPoints", "get", "toBinary", "sendto")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("usage: benchmark-replay.py <recording> [repeat]")
+        sys.exit(1)
+    recording = Recording(sys.argv[1])
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    landmarkNum = getLayout(recording.layoutName).landmarkNum
+    calib, initialRatio = autoCalibration(recording.faces(30)
+                                         , getLayout(recording.layoutName))
+    stats = {name: LatencyStats(1 << 16) for name in STAGES}
+
+    frames = 0
+    start = time.perf_counter()
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_DGRAM)) as sock:
+        for _ in range(repeat):
+            for _, landmark in replay(recording, None):
+                frames += 1
+                if landmark is None:
+                    continue
+                t0 = time.perf_counter()
+                face, ratio = Face.fromDPointsWithRatio(landmark
+                                                       , landmarkNum)
+                face.fixWithRatio(initialRatio, ratio)
+                t1 = time.perf_counter()
+                data = FaceData.get(face, calib)
+                t2 = time.perf_counter()
+                packet = data.toBinary()
+                t3 = time.perf_counter()
+                sock.sendto(packet, ("127.0.0.1", defaultPortNumber))
+                t4 = time.perf_counter()
+                for name, a, b in zip(STAGES, (t0, t1, t2, t3)
+                                     , (t1, t2, t3, t4)):
+                    stats[name].add(b - a)
+    elapsed = time.perf_counter() - start
+
+    print(f"{frames} frames in {elapsed:.2f}s"
+          f" ({frames / elapsed:.0f} frames/s)")
+    for name in STAGES:
+        print(f"{name:>12}: {stats[name].summary()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Show per-frame cost of facemark as the number of faces grows
+#
+# Synthetic frames are made by placing copies of a face image on
+# a fixed 3x3 grid, so that frame size and face size stay the same
+# and only the number of faces changes.
+# 'landmark all' emulates the old behaviour, which ran '_predictor'
+# for every face before picking the biggest one.
+#
+# usage:
+#   pipenv run python tools/benchmark-selection.py [image] [repeat]
+#
+import sys
+import os
+import time
+import cv2
+import numpy as np
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+from FaceDataServer.faceDetection import (facemark, _detector  # noqa: E402
+                                         , _predictor)
+from FaceDataServer.Types import Cv2Image  # noqa: E402
+
+GRID = 3
+CELL = (360, 320)  # (height, width)
+
+
+def syntheticFrame(face: Cv2Image, n: int) -> Cv2Image:
+    """Return frame which has 'n' faces on 3x3 grid"""
+    h, w = CELL
+    frame = np.full((h * GRID, w * GRID, 3), 60, np.uint8)
+    small = cv2.resize(face, (w, h))
+    for i in range(n):
+        y, x = divmod(i, GRID)
+        frame[y * h:(y + 1) * h, x * w:(x + 1) * w] = small
+    return frame
+
+
+def landmarkAll(frame: Cv2Image):
+    return [_predictor(frame, r) for r in _detector(frame, 1)]
+
+
+def measure(f: Callable, frame: Cv2Image, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        f(frame)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "tests/src/face.jpg"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    face = cv2.imread(path)
+    if face is None:
+        print(f"could not read {path}")
+        sys.exit(1)
+
+    print(f"{'faces':>5} {'detected':>8} {'landmark all(ms)':>17}"
+          f" {'selected(ms)':>13}")
+    for n in range(1, GRID * GRID + 1):
+        frame = syntheticFrame(face, n)
+        detected = len(_detector(frame, 1))
+        old = measure(landmarkAll, frame, repeat)
+        new = measure(facemark, frame, repeat)
+        print(f"{n:>5} {detected:>8} {old:>17.2f} {new:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
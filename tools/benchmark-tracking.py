@@ -0,0 +1,65 @@
+# Compare frames/sec of full-detect 'facemark' and tracked 'FaceTracker'
+#
+# usage:
+#   pipenv run python tools/benchmark-tracking.py <recorded clip> [interval]
+#
+import sys
+import os
+import time
+import cv2
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+from FaceDataServer.faceDetection import (facemark, FaceTracker  # noqa: E402
+                                         , TrackingSetting)
+from FaceDataServer.Types import Cv2Image  # noqa: E402
+
+
+def readClip(path: str) -> List[Cv2Image]:
+    """Read all frames beforehand so that we don't measure decoding"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while cap.isOpened():
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def measure(name: str, frames: List[Cv2Image], f: Callable) -> float:
+    found = 0
+    start = time.perf_counter()
+    for frame in frames:
+        if f(frame) is not None:
+            found += 1
+    elapsed = time.perf_counter() - start
+    fps = len(frames) / elapsed
+    print(f"{name:>12}: {fps:8.2f} fps"
+          f" ({found}/{len(frames)} frames with face)")
+    return fps
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"usage: {sys.argv[0]} <recorded clip> [redetect interval]")
+        sys.exit(1)
+
+    frames = readClip(sys.argv[1])
+    if len(frames) == 0:
+        print(f"no frames could be read from {sys.argv[1]}")
+        sys.exit(1)
+
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    tracker = FaceTracker(TrackingSetting(redetectInterval=interval))
+
+    full = measure("full-detect", frames, facemark)
+    tracked = measure("tracked", frames, tracker.facemark)
+    print(f"detector calls: {tracker.detectCount}"
+          f", tracker calls: {tracker.trackCount}")
+    print(f"speed up: x{tracked / full:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Accuracy versus speed report of downscaled / ROI detection
+#
+# For each scale, this measures time spent in '_detectFaces' and
+# how far the resulting landmarks are from the ones detected
+# on full resolution frame.
+#
+# usage:
+#   pipenv run python tools/detection-report.py [image] [repeat]
+#
+import sys
+import os
+import time
+import cv2
+import numpy as np
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+from FaceDataServer.faceDetection import (DetectionSetting  # noqa: E402
+                                         , _detectFaces, _landmarkArray)
+
+SCALES = [1.0, 0.75, 0.5, 0.35, 0.25]
+PADDING = 0.5
+
+
+def timeit(f: Callable, repeat: int) -> float:
+    """Return mean time of 'f()' in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        f()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def landmarkError(img, rect, reference) -> float:
+    """Mean distance (in pixels) between landmarks and 'reference'"""
+    points = _landmarkArray(img, rect)
+    return float(np.mean(np.linalg.norm(points - reference, axis=1)))
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "tests/src/face.jpg"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    img = cv2.imread(path)
+    if img is None:
+        print(f"could not read {path}")
+        sys.exit(1)
+
+    full = _detectFaces(img, DetectionSetting(scale=1.0))
+    if len(full) == 0:
+        print(f"no face is found in {path}")
+        sys.exit(1)
+    reference = _landmarkArray(img, full[0])
+
+    print(f"image: {path} ({img.shape[1]}x{img.shape[0]})"
+          f", roiPadding: {PADDING}")
+    print(f"{'scale':>6} {'whole(ms)':>10} {'roi(ms)':>10}"
+          f" {'speed up':>9} {'error(px)':>10}")
+    baseline = None
+    for scale in SCALES:
+        setting = DetectionSetting(scale=scale, roiPadding=PADDING)
+        rects = _detectFaces(img, setting)
+        whole = timeit(lambda: _detectFaces(img, setting), repeat)
+        roi = timeit(lambda: _detectFaces(img, setting, full[0]), repeat)
+        baseline = baseline or whole
+        error = "not found" if len(rects) == 0\
+                else f"{landmarkError(img, rects[0], reference):.2f}"
+        print(f"{scale:>6} {whole:>10.2f} {roi:>10.2f}"
+              f" {baseline / min(whole, roi):>8.1f}x {error:>10}")
+
+
+if __name__ == '__main__':
+    main()